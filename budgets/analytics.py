@@ -0,0 +1,82 @@
+"""
+Family-level aggregates shared by the analytics views and the dashboard.
+"""
+
+from django.db.models import Sum, Q
+from .models import Budget, SavingsGoal
+
+BUDGET_TYPES = ('income', 'expense')
+
+
+def family_totals(family_id):
+    """Budgeted and actual amounts per budget type, in a single query.
+
+    Actual amounts come from the budget ledgers, so no transaction is read.
+    Returns ``{'income': (budget_amount, actual_amount), 'expense': (...)}``.
+    """
+    aggregates = {}
+    for budget_type in BUDGET_TYPES:
+        condition = Q(budget_type=budget_type)
+        aggregates[f'{budget_type}_budget'] = Sum('amount', filter=condition)
+        aggregates[f'{budget_type}_actual'] = Sum('ledger__spent_amount', filter=condition)
+    totals = Budget.objects.filter(family_id=family_id).aggregate(**aggregates)
+    return {
+        budget_type: (totals[f'{budget_type}_budget'] or 0, totals[f'{budget_type}_actual'] or 0)
+        for budget_type in BUDGET_TYPES
+    }
+
+
+def budget_utilization(totals):
+    utilization = {}
+    for budget_type in BUDGET_TYPES:
+        budget_amount, transaction_amount = totals[budget_type]
+        utilization[budget_type] = {
+            'budget_amount': budget_amount,
+            'transaction_amount': transaction_amount,
+            'utilization_percentage': (transaction_amount / budget_amount) * 100 if budget_amount > 0 else 0
+        }
+    return utilization
+
+
+def budget_vs_actual(totals):
+    income_budgets, income_transactions = totals['income']
+    expense_budgets, expense_transactions = totals['expense']
+
+    # Net amounts (income - expense)
+    net_budget = income_budgets - expense_budgets
+    net_transactions = income_transactions - expense_transactions
+
+    return {
+        'income': {
+            'budget': income_budgets,
+            'actual': income_transactions,
+            'difference': income_transactions - income_budgets,
+            'percentage': (income_transactions / income_budgets * 100) if income_budgets > 0 else 0
+        },
+        'expense': {
+            'budget': expense_budgets,
+            'actual': expense_transactions,
+            'difference': expense_transactions - expense_budgets,
+            'percentage': (expense_transactions / expense_budgets * 100) if expense_budgets > 0 else 0
+        },
+        'net': {
+            'budget': net_budget,
+            'actual': net_transactions,
+            'difference': net_transactions - net_budget,
+            'percentage': (net_transactions / net_budget * 100) if net_budget > 0 else 0
+        }
+    }
+
+
+def savings_progress(family_id):
+    return [
+        {
+            'goal_id': goal.id,
+            'name': goal.name,
+            'target_amount': goal.target_amount,
+            'current_amount': goal.current_amount,
+            'progress_percentage': (goal.current_amount / goal.target_amount) * 100 if goal.target_amount > 0 else 0,
+            'target_date': goal.target_date
+        }
+        for goal in SavingsGoal.objects.filter(family_id=family_id)
+    ]
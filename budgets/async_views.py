@@ -0,0 +1,76 @@
+"""
+Async versions of the family analytics views and the dashboard.
+
+They share the parts (independent queries) of the sync views in
+budgets.views and run them concurrently with ``gather_parts``, so under an
+ASGI server a response costs about as much as its slowest query. budgets.urls
+serves them instead of the sync views when ``ASYNC_ANALYTICS`` is set.
+
+The budget comparison and the savings forecast have a single part, so they
+stay sync: under ASGI Django already runs a sync view in a worker thread,
+which is all an async version would do with them.
+"""
+
+import asyncio
+from rest_framework.response import Response
+from families.access import require_membership
+from family_budget_2.async_views import AsyncViewMixin, gather_parts, run_in_worker
+from .data_version import acached_family_result
+from .views import FamilyBudgetAnalyticsView, TransactionAnalyticsView, DashboardView
+
+
+class AsyncCachedFamilyAnalyticsMixin(AsyncViewMixin):
+    async def get(self, request, family_id):
+        # Check if user is a member of the family
+        await run_in_worker(require_membership, request.user, family_id)
+
+        data = await acached_family_result(
+            family_id, self.get_cache_name(request), request.query_params,
+            lambda: self.aget_data(request, family_id)
+        )
+        return Response(data)
+
+    async def aget_data(self, request, family_id):
+        parts = self.get_parts(request, family_id)
+        return self.combine(request, await gather_parts(parts))
+
+
+class AsyncFamilyBudgetAnalyticsView(AsyncCachedFamilyAnalyticsMixin, FamilyBudgetAnalyticsView):
+    pass
+
+
+class AsyncTransactionAnalyticsView(AsyncCachedFamilyAnalyticsMixin, TransactionAnalyticsView):
+    pass
+
+
+class AsyncDashboardView(AsyncViewMixin, DashboardView):
+    async def get(self, request):
+        count = self.get_transaction_count(request)
+        family_id = await run_in_worker(self.get_family_id, request)
+
+        if family_id is None:
+            # The first family is the default: it is known once the families are loaded
+            families = await run_in_worker(self.get_families, request)
+            family_id = self.get_family_id(request, families)
+            family_data = await self.aget_cached_family_data(request, family_id, count)
+        else:
+            families, family_data = await asyncio.gather(
+                run_in_worker(self.get_families, request),
+                self.aget_cached_family_data(request, family_id, count)
+            )
+
+        data = {'families': families, 'family_id': family_id}
+        data.update(family_data)
+        return Response(data)
+
+    async def aget_cached_family_data(self, request, family_id, count):
+        if family_id is None:
+            return {}
+        return await acached_family_result(
+            family_id, DashboardView.__name__, request.query_params,
+            lambda: self.aget_family_data(request, family_id, count)
+        )
+
+    async def aget_family_data(self, request, family_id, count):
+        parts = self.get_family_parts(request, family_id, count)
+        return self.combine_family(await gather_parts(parts))
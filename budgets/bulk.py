@@ -0,0 +1,33 @@
+from django.db import transaction as db_transaction
+from . import ledger, rollups
+from .models import Budget, Transaction
+from .data_version import bump_data_version
+
+
+def bulk_create_transactions(transactions, batch_size=None, budgets=None):
+    """Insert ``transactions`` with batched INSERTs and add them to the derived tables.
+
+    ``bulk_create`` sends no ``post_save`` signals, so the new rows are added
+    to their budgets' ledgers and week, month and year rollups here with a
+    few set-based queries, whatever the number of rows, and the families'
+    data versions are bumped once. ``budgets`` maps the budget ids to
+    ``(family_id, budget_type)``; it is read from the database when not given.
+    """
+    # Part of the caller's transaction when there is one
+    with db_transaction.atomic(savepoint=False):
+        created = Transaction.objects.bulk_create(transactions, batch_size=batch_size)
+        budget_ids = {obj.budget_id for obj in created}
+        if not budget_ids:
+            return created
+        if budgets is None:
+            budgets = {
+                budget_id: (family_id, budget_type)
+                for budget_id, family_id, budget_type in Budget.objects.filter(
+                    id__in=budget_ids
+                ).values_list('id', 'family_id', 'budget_type')
+            }
+        ledger.add_transactions(created)
+        rollups.add_transactions(created, budgets)
+        bump_data_version(*{budgets[budget_id][0] for budget_id in budget_ids})
+
+    return created
@@ -0,0 +1,18 @@
+def iter_id_chunks(queryset, ids=None, chunk_size=1000):
+    """Yield lists of the primary keys of ``queryset`` (only ``ids`` if
+    given), ``chunk_size`` at a time in primary key order.
+
+    Each chunk starts after the last key of the previous one, so the
+    thousandth chunk costs the same index range scan as the first.
+    """
+    queryset = queryset.order_by('pk')
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_id).values_list('pk', flat=True)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
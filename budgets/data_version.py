@@ -0,0 +1,120 @@
+"""
+Per-family data versions and the result cache built on them.
+
+Every write to a family, its memberships, categories, budgets,
+transactions, savings goals or contributions, or to one of its members,
+replaces the family's version token (see budgets.signals).
+Cached results are stored together with the version they were computed
+for, so a result is served only while the family's data is unchanged; no
+TTL is involved in correctness. Tokens are random rather than counters so
+that a version evicted from the cache can never be re-created with an old
+value.
+"""
+
+import hashlib
+import uuid
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from families.access import get_family_ids
+from .models import Budget, SavingsGoal
+
+VERSION_KEY = 'family_data_version:{family_id}'
+RESULT_KEY = 'family_result:{family_id}:{name}:{params}'
+
+
+def _version_key(family_id):
+    return VERSION_KEY.format(family_id=family_id)
+
+
+def _new_version():
+    return uuid.uuid4().hex
+
+
+def get_data_version(family_id):
+    key = _version_key(family_id)
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_data_versions(family_ids):
+    """``{family_id: version}`` for ``family_ids``, read with a single cache call."""
+    keys = {family_id: _version_key(family_id) for family_id in family_ids}
+    found = cache.get_many(keys.values())
+    return {
+        family_id: found[key] if key in found else get_data_version(family_id)
+        for family_id, key in keys.items()
+    }
+
+
+def bump_data_version(*family_ids):
+    family_ids = {family_id for family_id in family_ids if family_id is not None}
+    if family_ids:
+        cache.set_many({_version_key(family_id): _new_version() for family_id in family_ids}, None)
+
+
+def bump_budget_families(budget_ids):
+    bump_data_version(*Budget.objects.filter(id__in=budget_ids).values_list('family_id', flat=True))
+
+
+def bump_savings_goal_families(goal_ids):
+    bump_data_version(*SavingsGoal.objects.filter(id__in=goal_ids).values_list('family_id', flat=True))
+
+
+def bump_member_families(user):
+    bump_data_version(*get_family_ids(user))
+
+
+def params_digest(query_params):
+    encoded = '&'.join(
+        f'{name}={value}'
+        for name in sorted(query_params)
+        for value in query_params.getlist(name)
+    )
+    return hashlib.md5(encoded.encode(), usedforsecurity=False).hexdigest()
+
+
+def _read_result(family_id, name, query_params):
+    """Return ``(cached, result, version, result_key)``; the version and the
+    cached result are fetched with a single cache read.
+    """
+    version_key = _version_key(family_id)
+    result_key = RESULT_KEY.format(family_id=family_id, name=name, params=params_digest(query_params))
+
+    values = cache.get_many([version_key, result_key])
+    version = values.get(version_key)
+    cached = values.get(result_key)
+    if version is not None and cached is not None and cached[0] == version:
+        return True, cached[1], version, result_key
+
+    if version is None:
+        version = get_data_version(family_id)
+    return False, None, version, result_key
+
+
+def cached_family_result(family_id, name, query_params, compute):
+    """Return ``compute()`` for the family, cached until its data version changes."""
+    cached, result, version, result_key = _read_result(family_id, name, query_params)
+    if cached:
+        return result
+
+    # The version is read before computing: a concurrent write bumps it and
+    # makes the stored result stale right away
+    result = compute()
+    cache.set(result_key, (version, result), settings.FAMILY_RESULT_CACHE_TIMEOUT)
+    return result
+
+
+async def acached_family_result(family_id, name, query_params, compute):
+    """``cached_family_result`` for async views; ``compute`` is a coroutine function."""
+    cached, result, version, result_key = await sync_to_async(_read_result)(family_id, name, query_params)
+    if cached:
+        return result
+
+    result = await compute()
+    await sync_to_async(cache.set)(result_key, (version, result), settings.FAMILY_RESULT_CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,230 @@
+"""
+Chunked deletion of families and budgets.
+
+``Model.delete()`` has Django's collector load every dependent row (budgets,
+transactions, savings goals, contributions) into memory and send a signal
+for each of them before anything is deleted. Here the dependency tree is
+deleted bottom-up instead: children before the rows they reference, so every
+intermediate state satisfies the foreign keys, with one
+``DELETE ... WHERE id IN (SELECT id ... LIMIT n)`` per chunk of
+``DELETION_CHUNK_SIZE`` rows and one database transaction per chunk.
+
+No signals are sent, so their effects are applied here once per target: the
+members' access caches and access tokens are invalidated and the family's
+data version is bumped. Ledgers and rollups are part of the tree, and the
+SQLite search index follows through its triggers.
+
+``delete_family`` / ``delete_budget`` delete a target with up to
+``DELETION_SYNC_MAX_ROWS`` transactions (according to its ledgers) right
+away, and queue a ``DeletionJob`` for a larger one, which
+``manage.py run_deletion_jobs`` runs, recording its progress after every
+chunk. Every step deletes whatever is left of its table, so an interrupted
+job is simply run again. A family loses its memberships before it is queued,
+so it disappears for its members at once; a queued budget stays visible
+until its job is done.
+"""
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, connection, connections, transaction as db_transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from families.access import invalidate_family_access
+from families.models import Family, FamilyMembership
+from users.authentication import bump_token_versions
+from .data_version import bump_data_version
+from .models import (
+    Budget, BudgetLedger, DeletionJob, RecurringTransaction, SavingsContribution, SavingsGoal,
+    Transaction, TransactionCategory, TransactionRollup
+)
+
+
+def budget_steps(budgets):
+    """``(model, rows)`` to delete, in order, for the budgets in ``budgets``."""
+    return [
+        (Transaction, Transaction.objects.filter(budget__in=budgets)),
+        (RecurringTransaction, RecurringTransaction.objects.filter(budget__in=budgets)),
+        (TransactionRollup, TransactionRollup.objects.filter(budget__in=budgets)),
+        (BudgetLedger, BudgetLedger.objects.filter(budget__in=budgets)),
+        (Budget, budgets),
+    ]
+
+
+def family_steps(family_id, with_budgets=True):
+    """``(model, rows)`` to delete, in order, for a family whose memberships
+    are gone (``revoke_family_access``).
+    """
+    budgets = Budget.objects.filter(family_id=family_id)
+    steps = budget_steps(budgets) if with_budgets else []
+    return steps + [
+        (SavingsContribution, SavingsContribution.objects.filter(savings_goal__family_id=family_id)),
+        (SavingsGoal, SavingsGoal.objects.filter(family_id=family_id)),
+        (TransactionCategory, TransactionCategory.objects.filter(family_id=family_id)),
+        (Family, Family.objects.filter(id=family_id)),
+    ]
+
+
+def delete_chunk(rows, chunk_size=None):
+    """Delete up to ``chunk_size`` of ``rows`` (all of them by default) with a
+    single ``DELETE ... WHERE id IN (SELECT id ...)``. Returns the number of
+    rows deleted.
+
+    ``QuerySet.delete()`` would load the rows to cascade and send signals
+    for them. Neither is needed here: the steps delete every row referencing
+    a table before that table, so there is nothing left to cascade to, and
+    the signal handlers only maintain the ledgers, rollups, access caches
+    and data versions, which are deleted along with the target or updated
+    once by ``run_deletion``.
+    """
+    pks = rows.order_by().values('pk')
+    if chunk_size is not None:
+        pks = pks[:chunk_size]
+    subquery, params = pks.query.sql_with_params()
+    meta = rows.model._meta
+    db_connection = connections[rows.db]
+    table, pk = db_connection.ops.quote_name(meta.db_table), db_connection.ops.quote_name(meta.pk.column)
+    with db_connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({subquery})', params)
+        return cursor.rowcount
+
+
+def detach_occurrences(templates):
+    # Transactions moved to another budget still point to their template
+    Transaction.objects.filter(recurring__in=templates.values('pk')).update(recurring=None)
+
+
+def revoke_family_access(family_id):
+    """Delete the memberships of a family and the access they granted."""
+    memberships = list(FamilyMembership.objects.filter(family_id=family_id).values_list('user_id', 'status'))
+    if not memberships:
+        return
+    # Their signal handlers' work is done below, once for the family
+    delete_chunk(FamilyMembership.objects.filter(family_id=family_id))
+    invalidate_family_access(*(user_id for user_id, _ in memberships))
+    # Access tokens list the accepted families only
+    accepted = [user_id for user_id, status in memberships if status == 'accepted']
+    if accepted:
+        bump_token_versions(*accepted)
+
+
+def estimate(target, target_id):
+    """``(budgets, transactions)`` of a family or budget, from the ledgers."""
+    budgets = Budget.objects.filter(**{'family_id' if target == 'family' else 'id': target_id})
+    counts = budgets.aggregate(budgets=Count('id'), transactions=Sum('ledger__transaction_count'))
+    return counts['budgets'], counts['transactions'] or 0
+
+
+def run_deletion(target, target_id, family_id, chunk_size=None, on_chunk=None, with_budgets=True):
+    """Delete a family or budget and its dependent rows, chunk by chunk.
+
+    ``on_chunk(model, rows)`` is called after each chunk, within its
+    transaction. Returns ``{model label: rows deleted}``.
+    """
+    chunk_size = chunk_size or settings.DELETION_CHUNK_SIZE
+    if target == 'family':
+        revoke_family_access(family_id)
+        steps = family_steps(family_id, with_budgets)
+    else:
+        steps = budget_steps(Budget.objects.filter(id=target_id))
+
+    deleted = {}
+    for model, rows in steps:
+        if model is RecurringTransaction:
+            detach_occurrences(rows)
+        while True:
+            # Commits each chunk unless the caller holds a transaction
+            with db_transaction.atomic(savepoint=False):
+                count = delete_chunk(rows, chunk_size)
+                if count:
+                    deleted[model._meta.label] = deleted.get(model._meta.label, 0) + count
+                    if on_chunk is not None:
+                        on_chunk(model, count)
+            if count < chunk_size:
+                break
+
+    bump_data_version(family_id)
+    return deleted
+
+
+def delete_target(target, target_id, family_id, requested_by=None, counts=None):
+    budgets, transactions = counts or estimate(target, target_id)
+    if transactions <= settings.DELETION_SYNC_MAX_ROWS:
+        # Small enough for the request: all or nothing
+        with db_transaction.atomic():
+            run_deletion(target, target_id, family_id, with_budgets=budgets > 0)
+        return None
+
+    if target == 'family':
+        # Members lose access right away, however long the rest takes
+        revoke_family_access(family_id)
+    try:
+        with db_transaction.atomic():
+            job = DeletionJob.objects.create(
+                target=target, target_id=target_id, family_id=family_id,
+                estimated_rows=transactions, requested_by=requested_by
+            )
+    except IntegrityError:
+        # Already queued
+        return DeletionJob.objects.get(target=target, target_id=target_id, status__in=DeletionJob.ACTIVE_STATUSES)
+    bump_data_version(family_id)
+    return job
+
+
+def delete_family(family, requested_by=None):
+    """Delete ``family`` and everything in it. Returns ``None`` once deleted,
+    or the ``DeletionJob`` that will delete it.
+    """
+    return delete_target('family', family.id, family.id, requested_by)
+
+
+def delete_budget(budget, requested_by=None):
+    """Delete ``budget`` with its transactions, templates, ledger and rollups.
+    Returns ``None`` once deleted, or the ``DeletionJob`` that will delete it.
+    """
+    try:
+        # Loaded along with the budget by the detail view
+        counts = 1, budget.ledger.transaction_count
+    except ObjectDoesNotExist:
+        counts = 1, 0
+    return delete_target('budget', budget.id, budget.family_id, requested_by, counts)
+
+
+def claim_job():
+    """The oldest pending job, marked running, or ``None``."""
+    with db_transaction.atomic():
+        jobs = DeletionJob.objects.filter(status='pending').order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            jobs = jobs.select_for_update(skip_locked=True)
+        job = jobs.first()
+        if job is not None:
+            job.status = 'running'
+            job.started_at = timezone.now()
+            job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def run_job(job, chunk_size=None):
+    """Run ``job`` to the end, recording its progress after every chunk."""
+    def record(model, count):
+        label = model._meta.label
+        job.progress[label] = job.progress.get(label, 0) + count
+        job.deleted_rows += count
+        job.save(update_fields=['progress', 'deleted_rows'])
+
+    if job.status != 'running':
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.error = ''
+        job.save(update_fields=['status', 'started_at', 'error'])
+    try:
+        run_deletion(job.target, job.target_id, job.family_id, chunk_size, on_chunk=record)
+    except Exception as error:
+        job.status = 'failed'
+        job.error = str(error)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        raise
+    job.status = 'done'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at'])
+    return job
@@ -0,0 +1,76 @@
+"""
+Streaming export of a family's transaction history as CSV or NDJSON.
+
+Rows are read with a chunked server-side cursor (``QuerySet.iterator``) and
+encoded one at a time, so memory use does not depend on the history size.
+"""
+
+import csv
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Transaction
+
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('date', 'date'),
+    ('budget_id', 'budget_id'),
+    ('budget', 'budget__name'),
+    ('budget_type', 'budget__budget_type'),
+    ('amount', 'amount'),
+    ('description', 'description'),
+    ('created_by', 'created_by__email'),
+    ('created_at', 'created_at'),
+)
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def export_queryset(family_id, start_date=None, end_date=None, budget_id=None):
+    """Value tuples in ``EXPORT_COLUMNS`` order, oldest first."""
+    transactions = Transaction.objects.filter(budget__family_id=family_id)
+    if start_date:
+        transactions = transactions.filter(date__gte=start_date)
+    if end_date:
+        transactions = transactions.filter(date__lte=end_date)
+    if budget_id:
+        transactions = transactions.filter(budget_id=budget_id)
+
+    return transactions.order_by('date', 'created_at', 'id').values_list(
+        *(lookup for _, lookup in EXPORT_COLUMNS)
+    )
+
+
+def export_rows(family_id, **filters):
+    """Iterate over ``export_queryset`` with a chunked server-side cursor."""
+    return export_queryset(family_id, **filters).iterator(chunk_size=settings.TRANSACTION_EXPORT_CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value, for ``csv.writer``."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+STREAMERS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+}
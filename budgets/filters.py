@@ -0,0 +1,139 @@
+"""
+Query-parameter filters and orderings of the list endpoints.
+
+A filter set is a serializer over ``request.query_params``: every field is
+one parameter and its ``source`` is the lookup it filters on, so
+``start_date = DateField(source='date__gte')`` turns ``?start_date=2024-01-01``
+into ``filter(date__gte=date(2024, 1, 1))``. Invalid values are answered with
+a 400 like any other serializer error.
+
+``?ordering=`` accepts the keys of ``orderings`` only. Each one expands to a
+unique sort key ending in ``id``, which the keyset pagination of the
+transaction lists needs. The filters and orderings are the ones the model
+indexes serve (see the ``Meta.indexes`` of budgets.models); add the index
+along with a new filter.
+"""
+
+from functools import cached_property
+from django.db.models import Q
+from rest_framework import serializers
+from .models import Budget, RecurringTransaction
+
+AMOUNT = {'max_digits': 12, 'decimal_places': 2, 'required': False}
+
+
+def both_directions(*fields):
+    """Ascending and descending orderings by each of ``fields``."""
+    orderings = {}
+    for field in fields:
+        orderings[field] = (field, 'id')
+        orderings[f'-{field}'] = (f'-{field}', '-id')
+    return orderings
+
+
+class FilterSet(serializers.Serializer):
+    # ?ordering= value -> order_by() fields
+    orderings = {}
+    default_ordering = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.orderings:
+            self.fields['ordering'] = serializers.ChoiceField(choices=list(self.orderings), required=False)
+
+    def get_ordering(self):
+        name = self.validated_data.get('ordering', self.default_ordering)
+        return self.orderings[name] if name else None
+
+    def get_filter(self):
+        return Q(**{lookup: value for lookup, value in self.validated_data.items() if lookup != 'ordering'})
+
+    def filter_queryset(self, queryset):
+        queryset = queryset.filter(self.get_filter())
+        ordering = self.get_ordering()
+        return queryset.order_by(*ordering) if ordering else queryset
+
+
+class TransactionFilterSet(FilterSet):
+    orderings = {
+        '-date': ('-date', '-created_at', '-id'),
+        'date': ('date', 'created_at', 'id'),
+        '-amount': ('-amount', '-id'),
+        'amount': ('amount', 'id'),
+    }
+    default_ordering = '-date'
+
+    family = serializers.IntegerField(source='budget__family_id', min_value=1, required=False)
+    budget_id = serializers.IntegerField(min_value=1, required=False)
+    budget_type = serializers.ChoiceField(choices=Budget.TYPE_CHOICES, source='budget__budget_type', required=False)
+    created_by = serializers.IntegerField(source='created_by_id', min_value=1, required=False)
+    start_date = serializers.DateField(source='date__gte', required=False)
+    end_date = serializers.DateField(source='date__lte', required=False)
+    min_amount = serializers.DecimalField(source='amount__gte', **AMOUNT)
+    max_amount = serializers.DecimalField(source='amount__lte', **AMOUNT)
+
+
+class BudgetFilterSet(FilterSet):
+    orderings = both_directions('name', 'amount', 'start_date', 'end_date', 'created_at')
+
+    family = serializers.IntegerField(source='family_id', min_value=1, required=False)
+    budget_type = serializers.ChoiceField(choices=Budget.TYPE_CHOICES, required=False)
+    period = serializers.ChoiceField(choices=Budget.PERIOD_CHOICES, required=False)
+    created_by = serializers.IntegerField(source='created_by_id', min_value=1, required=False)
+    # Budgets running at some point of the date range
+    start_date = serializers.DateField(source='end_date__gte', required=False)
+    end_date = serializers.DateField(source='start_date__lte', required=False)
+    min_amount = serializers.DecimalField(source='amount__gte', **AMOUNT)
+    max_amount = serializers.DecimalField(source='amount__lte', **AMOUNT)
+
+
+class SavingsGoalFilterSet(FilterSet):
+    orderings = both_directions('name', 'target_amount', 'target_date', 'created_at')
+
+    family_id = serializers.IntegerField(min_value=1, required=False)
+    created_by = serializers.IntegerField(source='created_by_id', min_value=1, required=False)
+    start_date = serializers.DateField(source='target_date__gte', required=False)
+    end_date = serializers.DateField(source='target_date__lte', required=False)
+    min_amount = serializers.DecimalField(source='target_amount__gte', **AMOUNT)
+    max_amount = serializers.DecimalField(source='target_amount__lte', **AMOUNT)
+
+
+class SavingsContributionFilterSet(FilterSet):
+    orderings = both_directions('date', 'amount')
+
+    savings_goal_id = serializers.IntegerField(min_value=1, required=False)
+    created_by = serializers.IntegerField(source='created_by_id', min_value=1, required=False)
+    start_date = serializers.DateField(source='date__gte', required=False)
+    end_date = serializers.DateField(source='date__lte', required=False)
+    min_amount = serializers.DecimalField(source='amount__gte', **AMOUNT)
+    max_amount = serializers.DecimalField(source='amount__lte', **AMOUNT)
+
+
+class RecurringTransactionFilterSet(FilterSet):
+    orderings = both_directions('next_date', 'amount', 'start_date')
+
+    budget_id = serializers.IntegerField(min_value=1, required=False)
+    family = serializers.IntegerField(source='budget__family_id', min_value=1, required=False)
+    frequency = serializers.ChoiceField(choices=RecurringTransaction.FREQUENCY_CHOICES, required=False)
+    created_by = serializers.IntegerField(source='created_by_id', min_value=1, required=False)
+
+
+class FilteredListMixin:
+    """Applies ``filterset_class`` to the list of a generic view.
+
+    The keyset pagination asks the view for its ordering through
+    ``get_ordering``.
+    """
+    filterset_class = None
+
+    @cached_property
+    def filterset(self):
+        filterset = self.filterset_class(data=self.request.query_params)
+        filterset.is_valid(raise_exception=True)
+        return filterset
+
+    def filter_queryset(self, queryset):
+        return self.filterset.filter_queryset(super().filter_queryset(queryset))
+
+    def get_ordering(self):
+        return self.filterset.get_ordering()
@@ -0,0 +1,150 @@
+"""
+Savings goal forecasts.
+
+Each goal's contribution history is reduced to a monthly rate (mean of its
+monthly totals) and a monthly standard deviation. The completion date is
+projected from the rate; the probability of reaching the target by
+``target_date`` is the share of simulated outcomes in which the amount saved
+by then covers what is still missing (``None`` for goals without a target
+date). Completion more than ``MAX_FORECAST_MONTHS`` away is reported as
+``None``, like a goal nobody contributes to. The sum of ``n`` months of independent
+contributions has mean ``n * rate`` and deviation ``std * sqrt(n)``, so every
+simulation is a single draw per goal.
+
+All goals of a family are computed together with numpy arrays, from one
+query for the goals and one columnar query for their monthly contribution
+totals.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+import numpy as np
+from django.conf import settings
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .models import SavingsGoal, SavingsContribution
+
+DAYS_PER_MONTH = 365.25 / 12
+# Completion dates further out than this are reported as unknown
+MAX_FORECAST_MONTHS = 100 * 12
+
+
+def _month_index(days):
+    """Months since year 0 of ``datetime64[D]`` values."""
+    return days.astype('datetime64[M]').astype(np.int64)
+
+
+def contribution_statistics(goal_ids, today, history_months=None):
+    """Monthly contribution rate and standard deviation of each goal.
+
+    Months are counted from the goal's first contribution (at most
+    ``history_months`` back) to the current month, months without
+    contributions included. Returns two float arrays aligned with ``goal_ids``,
+    which must be sorted.
+    """
+    history_months = history_months or settings.SAVINGS_FORECAST_HISTORY_MONTHS
+    goal_ids = np.asarray(goal_ids, dtype=np.int64)
+    # Monthly totals are summed by the database: one row per goal and month
+    rows = list(
+        SavingsContribution.objects.filter(
+            savings_goal_id__in=goal_ids.tolist()
+        ).annotate(
+            month=TruncMonth('date')
+        ).values('savings_goal_id', 'month').annotate(
+            total=Sum('amount')
+        ).order_by().values_list('savings_goal_id', 'month', 'total')
+    )
+    rates = np.zeros(len(goal_ids))
+    deviations = np.zeros(len(goal_ids))
+    if not rows:
+        return rates, deviations
+
+    contribution_goals, dates, amounts = zip(*rows)
+    goal_index = np.searchsorted(goal_ids, np.fromiter(contribution_goals, dtype=np.int64, count=len(rows)))
+    months = _month_index(np.array(dates, dtype='datetime64[D]'))
+    amounts = np.array(amounts, dtype=np.float64)
+
+    current_month = _month_index(np.datetime64(today, 'D'))
+    first_month = np.full(len(goal_ids), current_month, dtype=np.int64)
+    np.minimum.at(first_month, goal_index, months)
+    window_start = current_month - history_months + 1
+    observed = current_month - np.maximum(first_month, window_start) + 1
+
+    # goals x months matrix of monthly totals; future contributions count
+    # towards the current month, those before the window are dropped
+    columns = np.minimum(months, current_month) - window_start
+    recent = columns >= 0
+    totals = np.zeros((len(goal_ids), history_months))
+    np.add.at(totals, (goal_index[recent], columns[recent]), amounts[recent])
+
+    rates = totals.sum(axis=1) / observed
+    # Only the observed months of each goal (the last ``observed`` columns) count
+    in_history = np.arange(history_months) >= history_months - observed[:, None]
+    squared = np.where(in_history, (totals - rates[:, None]) ** 2, 0)
+    deviations = np.sqrt(squared.sum(axis=1) / observed)
+    return rates, deviations
+
+
+def forecast_goals(goals, today=None, simulations=None, seed=None):
+    """Forecast ``goals`` (SavingsGoal instances); returns one dict per goal, in order."""
+    goals = sorted(goals, key=lambda goal: goal.id)
+    if not goals:
+        return []
+    today = today or timezone.localdate()
+    simulations = simulations or settings.SAVINGS_FORECAST_SIMULATIONS
+
+    rates, deviations = contribution_statistics([goal.id for goal in goals], today)
+    missing = np.maximum(
+        np.array([goal.target_amount - goal.current_amount for goal in goals], dtype=np.float64), 0
+    )
+    # Goals without a target date have no probability to simulate
+    has_target = np.array([goal.target_date is not None for goal in goals])
+    months_left = np.array(
+        [(goal.target_date - today).days if goal.target_date else 0 for goal in goals], dtype=np.float64
+    ) / DAYS_PER_MONTH
+
+    # simulations x goals amounts saved between today and each target date
+    horizon = np.maximum(months_left, 0)
+    rng = np.random.default_rng(seed)
+    saved = rng.normal(horizon * rates, deviations * np.sqrt(horizon), size=(simulations, len(goals)))
+    probabilities = np.where(missing > 0, (saved >= missing).mean(axis=0), 1.0)
+
+    months_to_complete = np.divide(missing, rates, out=np.full(len(goals), np.inf), where=rates > 0)
+
+    forecasts = []
+    for index, goal in enumerate(goals):
+        if not missing[index]:
+            completion_date = today
+        elif months_to_complete[index] <= MAX_FORECAST_MONTHS:
+            completion_date = today + timedelta(days=int(np.ceil(months_to_complete[index] * DAYS_PER_MONTH)))
+        else:
+            completion_date = None
+        forecasts.append({
+            'goal_id': goal.id,
+            'name': goal.name,
+            'target_amount': goal.target_amount,
+            'current_amount': goal.current_amount,
+            'target_date': goal.target_date,
+            'monthly_rate': Decimal(str(round(rates[index], 2))),
+            'monthly_deviation': Decimal(str(round(deviations[index], 2))),
+            'projected_completion_date': completion_date,
+            'on_track': (
+                completion_date is not None and completion_date <= goal.target_date
+                if has_target[index] else None
+            ),
+            'probability_by_target_date': round(float(probabilities[index]), 4) if has_target[index] else None,
+        })
+    return forecasts
+
+
+def family_savings_forecast(family_id, today=None):
+    today = today or timezone.localdate()
+    return forecast_goals(
+        SavingsGoal.objects.filter(family_id=family_id).only(
+            'id', 'name', 'target_amount', 'current_amount', 'target_date'
+        ),
+        today=today,
+        # Seeded per family and day, so repeated requests agree
+        seed=(int(family_id), today.toordinal())
+    )
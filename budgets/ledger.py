@@ -0,0 +1,137 @@
+from decimal import Decimal
+from django.db.models import Sum, Count, Max, F, Value, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from .chunking import iter_id_chunks
+from .models import Budget, BudgetLedger, Transaction
+
+
+def apply_transaction_delta(budget_id, amount, count, date=None):
+    """Add ``amount``/``count`` to the budget's ledger row.
+
+    ``date`` is the date of a transaction being added; it only ever moves
+    ``last_transaction_date`` forward. Removals call ``refresh_last_date``.
+    """
+    changes = {
+        'spent_amount': F('spent_amount') + amount,
+        'transaction_count': F('transaction_count') + count,
+    }
+    if date is not None:
+        changes['last_transaction_date'] = Greatest(
+            Coalesce(F('last_transaction_date'), Value(date)),
+            Value(date)
+        )
+
+    updated = BudgetLedger.objects.filter(budget_id=budget_id).update(**changes)
+
+    # A missing row is only rebuilt when something is added: removals may come
+    # from a cascade that is deleting the budget itself
+    if not updated and count >= 0:
+        rebuild_ledgers([budget_id])
+
+
+def add_transactions(transactions):
+    """Add new, already inserted ``transactions`` to their budgets' ledgers
+    with one locking read and one upsert, for batches too large for a
+    ``apply_transaction_delta`` per budget. Budgets without a ledger row are
+    rebuilt from the transaction table instead.
+    """
+    totals = {}
+    for obj in transactions:
+        amount, count, last_date = totals.get(obj.budget_id, (Decimal('0.00'), 0, obj.date))
+        totals[obj.budget_id] = (amount + obj.amount, count + 1, max(last_date, obj.date))
+    if not totals:
+        return
+
+    ledgers = list(BudgetLedger.objects.select_for_update().filter(budget_id__in=totals).order_by('budget_id'))
+    missing = set(totals) - {ledger.budget_id for ledger in ledgers}
+    if missing:
+        # The batch totals alone would drop the budget's earlier transactions
+        rebuild_ledgers(missing)
+        for budget_id in missing:
+            del totals[budget_id]
+    for ledger in ledgers:
+        amount, count, last_date = totals[ledger.budget_id]
+        totals[ledger.budget_id] = (
+            ledger.spent_amount + amount,
+            ledger.transaction_count + count,
+            max(last_date, ledger.last_transaction_date or last_date)
+        )
+    BudgetLedger.objects.bulk_create(
+        [
+            BudgetLedger(
+                budget_id=budget_id,
+                spent_amount=spent_amount,
+                transaction_count=transaction_count,
+                last_transaction_date=last_transaction_date
+            )
+            for budget_id, (spent_amount, transaction_count, last_transaction_date) in totals.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['budget'],
+        update_fields=['spent_amount', 'transaction_count', 'last_transaction_date'],
+        batch_size=1000
+    )
+
+
+def refresh_last_date(budget_id):
+    """Recompute ``last_transaction_date`` after a transaction was removed or moved."""
+    latest = Transaction.objects.filter(
+        budget_id=OuterRef('budget_id')
+    ).order_by('-date').values('date')[:1]
+    BudgetLedger.objects.filter(budget_id=budget_id).update(
+        last_transaction_date=Subquery(latest)
+    )
+
+
+def compute_totals(budget_ids):
+    """Return ``{budget_id: (spent_amount, transaction_count, last_transaction_date)}``
+    computed from the transaction table.
+    """
+    rows = Transaction.objects.filter(
+        budget_id__in=budget_ids
+    ).values('budget_id').annotate(
+        total=Sum('amount'),
+        count=Count('id'),
+        last_date=Max('date')
+    ).order_by()
+
+    totals = {budget_id: (Decimal('0.00'), 0, None) for budget_id in budget_ids}
+    for row in rows:
+        totals[row['budget_id']] = (row['total'], row['count'], row['last_date'])
+    return totals
+
+
+def rebuild_ledgers(budget_ids=None, chunk_size=1000):
+    """Recompute ledger rows from scratch. Returns the number of budgets processed."""
+    processed = 0
+    for chunk in iter_id_chunks(Budget.objects.all(), budget_ids, chunk_size):
+        totals = compute_totals(chunk)
+        BudgetLedger.objects.bulk_create(
+            [
+                BudgetLedger(
+                    budget_id=budget_id,
+                    spent_amount=spent_amount,
+                    transaction_count=transaction_count,
+                    last_transaction_date=last_transaction_date
+                )
+                for budget_id, (spent_amount, transaction_count, last_transaction_date) in totals.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['budget'],
+            update_fields=['spent_amount', 'transaction_count', 'last_transaction_date']
+        )
+        processed += len(chunk)
+    return processed
+
+
+def verify_ledgers(budget_ids=None, chunk_size=1000):
+    """Yield ``(budget_id, stored, expected)`` for every ledger that has drifted."""
+    for chunk in iter_id_chunks(Budget.objects.all(), budget_ids, chunk_size):
+        totals = compute_totals(chunk)
+        stored = {
+            ledger.budget_id: (ledger.spent_amount, ledger.transaction_count, ledger.last_transaction_date)
+            for ledger in BudgetLedger.objects.filter(budget_id__in=chunk)
+        }
+        for budget_id, expected in totals.items():
+            if stored.get(budget_id) != expected:
+                yield budget_id, stored.get(budget_id), expected
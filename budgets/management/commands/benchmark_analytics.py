@@ -0,0 +1,184 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, close_old_connections
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from budgets import async_views, views
+from families.models import Family, FamilyMembership
+
+User = get_user_model()
+
+# Results must be computed on every request, not read from the cache
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the latency of the sync analytics views (one thread per request, '
+        'like WSGI workers) with the async views (one event loop, like an ASGI worker) '
+        'under concurrent requests. Results are not cached during the run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--family', type=int, help='Family to query (default: the one with the most budgets).')
+        parser.add_argument(
+            '--seed', type=int, nargs=3, metavar=('FAMILIES', 'BUDGETS', 'TRANSACTIONS'),
+            help='Benchmark a throwaway dataset, deleted afterwards. The data is committed, '
+                 'as the concurrent queries run on their own connections.'
+        )
+        parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at once.')
+        parser.add_argument('--requests', type=int, default=40, help='Requests per endpoint and path.')
+        parser.add_argument(
+            '--latency', type=float, default=0,
+            help='Milliseconds added to every query, to stand in for the round trip to a database server.'
+        )
+
+    def handle(self, *args, **options):
+        if options['latency']:
+            self.add_latency(options['latency'] / 1000)
+
+        seeded_user = None
+        try:
+            if options['seed']:
+                seeded_user = self.seed(*options['seed'])
+                membership = FamilyMembership.objects.filter(user=seeded_user).order_by('family_id').first()
+            else:
+                membership = self.sample_membership(options['family'])
+
+            with override_settings(CACHES=NO_CACHE):
+                for endpoint in self.endpoints(membership.family_id):
+                    self.run(membership.user, *endpoint, options)
+        finally:
+            if seeded_user is not None:
+                user_ids = list(FamilyMembership.objects.filter(
+                    family__created_by=seeded_user
+                ).values_list('user_id', flat=True))
+                Family.objects.filter(created_by=seeded_user).delete()
+                User.objects.filter(id__in=user_ids + [seeded_user.id]).delete()
+
+    @staticmethod
+    def add_latency(seconds):
+        def sleep_then_execute(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+
+        def install(connection, **kwargs):
+            # connection_created fires again each time a closed connection reconnects
+            if sleep_then_execute not in connection.execute_wrappers:
+                connection.execute_wrappers.append(sleep_then_execute)
+
+        # Worker threads open their own connections
+        connection_created.connect(install, weak=False)
+        install(connection)
+
+    def seed(self, families, budgets, transactions):
+        from family_budget_2.testing import create_user, seed_family_data
+
+        if User.objects.filter(email='benchmark.analytics@example.com').exists():
+            raise CommandError('benchmark.analytics@example.com exists: a previous run did not clean up.')
+        user = create_user('benchmark.analytics@example.com', 'Benchmark')
+        self.stdout.write(f'Seeding {families} families x {budgets} budgets x {transactions} transactions...')
+        seed_family_data(user, families=families, budgets=budgets, transactions=transactions, goals=5,
+                         contributions=50, members=2)
+        return user
+
+    def sample_membership(self, family_id):
+        memberships = FamilyMembership.objects.filter(status='accepted').select_related('user')
+        if family_id is None:
+            family = Family.objects.annotate(budget_count=Count('budgets')).order_by('-budget_count').first()
+            family_id = family.id if family else None
+        membership = memberships.filter(family_id=family_id).order_by('id').first()
+        if membership is None:
+            raise CommandError('No family to benchmark: pass --family or --seed.')
+        return membership
+
+    @staticmethod
+    def endpoints(family_id):
+        """``(name, sync view, async view, url, kwargs)`` for each benchmarked endpoint."""
+        family = {'family_id': family_id}
+        return [
+            ('budget analytics', views.FamilyBudgetAnalyticsView, async_views.AsyncFamilyBudgetAnalyticsView,
+             '/', family),
+            ('transaction analytics', views.TransactionAnalyticsView, async_views.AsyncTransactionAnalyticsView,
+             '/?period=week&start_date=2024-01-10&end_date=2024-11-20', family),
+            ('dashboard', views.DashboardView, async_views.AsyncDashboardView, f'/?family={family_id}', {}),
+        ]
+
+    def request(self, user, url):
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, user=user)
+        return request
+
+    def run(self, user, name, sync_view, async_view, url, kwargs, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'== {name}'))
+        concurrency, count = options['concurrency'], options['requests']
+
+        sync_handler = sync_view.as_view()
+
+        def call_sync(_):
+            started = time.perf_counter()
+            try:
+                response = sync_handler(self.request(user, url), **kwargs)
+                response.render()
+            finally:
+                # What request_finished does at the end of a WSGI request
+                close_old_connections()
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            sync_timings = list(executor.map(call_sync, range(count)))
+        sync_wall = time.perf_counter() - started
+
+        async_handler = async_view.as_view()
+
+        async def call_async(semaphore):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await async_handler(self.request(user, url), **kwargs)
+                response.render()
+                return time.perf_counter() - started
+
+        async def load():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(call_async(semaphore) for _ in range(count)))
+
+        started = time.perf_counter()
+        async_timings = asyncio.run(load())
+        async_wall = time.perf_counter() - started
+
+        for label, timings, wall in (('sync', sync_timings, sync_wall), ('async', async_timings, async_wall)):
+            timings = sorted(timings)
+            self.stdout.write(
+                f'{label:<6} p50 {statistics.median(timings) * 1000:8.2f} ms  '
+                f'p95 {timings[int(0.95 * (len(timings) - 1))] * 1000:8.2f} ms  '
+                f'{len(timings) / wall:8.1f} req/s'
+            )
+        self.report_parts(user, sync_view, url, kwargs)
+
+    def report_parts(self, user, view_class, url, kwargs):
+        """Time each independent part alone: the async view's floor is the slowest one."""
+        view = view_class()
+        request = view.initialize_request(self.request(user, url))
+        if 'family_id' in kwargs:
+            parts = view.get_parts(request, kwargs['family_id'])
+        else:
+            family_id = view.get_family_id(request)
+            parts = {'families': lambda: view.get_families(request)}
+            parts.update(view.get_family_parts(request, family_id, view.get_transaction_count(request)))
+
+        timings = {}
+        for part_name, part in parts.items():
+            started = time.perf_counter()
+            part()
+            timings[part_name] = time.perf_counter() - started
+        self.stdout.write(
+            f'parts  {len(timings)}, sum {sum(timings.values()) * 1000:.2f} ms, '
+            f'slowest {max(timings.values()) * 1000:.2f} ms ({max(timings, key=timings.get)})'
+        )
@@ -0,0 +1,137 @@
+import io
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from families.models import FamilyMembership
+from users.serializers import ClaimsTokenObtainPairSerializer
+
+DEFAULT_PATHS = [
+    '/api/families/',
+    '/api/budgets/',
+    '/api/budgets/transactions/',
+    '/api/budgets/dashboard/',
+]
+
+# (label, CONN_MAX_AGE, CONN_HEALTH_CHECKS)
+MODES = [
+    ('per request', 0, False),
+    ('persistent', 60, True),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure API throughput with a new database connection per request against persistent '
+        'connections with health checks. Requests go through the WSGI handler from a pool of '
+        'threads, as in a gthread gunicorn worker, so connections are closed or kept exactly as '
+        'in production. Run it against the compose PostgreSQL: '
+        'docker-compose exec backend python manage.py benchmark_connections'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of the user to authenticate as (default: the first member).')
+        parser.add_argument('--path', action='append', dest='paths', help=f'Path to request, repeatable (default: {", ".join(DEFAULT_PATHS)}).')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent requests, like gunicorn threads.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per mode.')
+        parser.add_argument(
+            '--connect-latency', type=float, default=0,
+            help='Milliseconds added to every new connection, to stand in for the handshake with a remote server.'
+        )
+
+    def handle(self, *args, **options):
+        token = str(ClaimsTokenObtainPairSerializer.get_token(self.get_user(options['user'])).access_token)
+        paths = options['paths'] or DEFAULT_PATHS
+        handler = WSGIHandler()
+
+        connected = []
+
+        def on_connect(connection, **kwargs):
+            connected.append(connection.alias)
+            if options['connect_latency']:
+                time.sleep(options['connect_latency'] / 1000)
+
+        connection_created.connect(on_connect, weak=False)
+        database = connections.settings[DEFAULT_DB_ALIAS]
+        original = database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']
+        try:
+            for label, max_age, health_checks in MODES:
+                database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS'] = max_age, health_checks
+                del connected[:]
+                timings, wall = self.run(handler, paths, token, options['threads'], options['requests'])
+                self.report(label, timings, wall, len(connected))
+        finally:
+            database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS'] = original
+            connection_created.disconnect(on_connect)
+
+    def get_user(self, email):
+        memberships = FamilyMembership.objects.filter(status='accepted').select_related('user').order_by('id')
+        if email:
+            memberships = memberships.filter(user__email=email)
+        membership = memberships.first()
+        if membership is None:
+            raise CommandError('No family member to authenticate as: pass --user or seed some data.')
+        return membership.user
+
+    def run(self, handler, paths, token, threads, count):
+        def call(index):
+            path, _, query = paths[index % len(paths)].partition('?')
+            status = []
+            started = time.perf_counter()
+            result = handler(self.environ(path, query, token), lambda code, headers: status.append(code))
+            try:
+                b''.join(result)
+            finally:
+                # Fires request_finished: the connection is closed or kept per CONN_MAX_AGE
+                result.close()
+            if not status[0].startswith('200'):
+                raise CommandError(f'GET {path} returned {status[0]}')
+            return time.perf_counter() - started
+
+        # Close every worker thread's connection before the pool goes away
+        barrier = threading.Barrier(threads)
+
+        def close_connections(_):
+            barrier.wait()
+            connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            timings = list(executor.map(call, range(count)))
+            wall = time.perf_counter() - started
+            list(executor.map(close_connections, range(threads)))
+        return timings, wall
+
+    @staticmethod
+    def environ(path, query, token):
+        return {
+            'REQUEST_METHOD': 'GET',
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'localhost',
+            'HTTP_AUTHORIZATION': f'Bearer {token}',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+
+    def report(self, label, timings, wall, connection_count):
+        timings = sorted(timings)
+        self.stdout.write(
+            f'{label:<12} p50 {statistics.median(timings) * 1000:8.2f} ms  '
+            f'p95 {timings[int(0.95 * (len(timings) - 1))] * 1000:8.2f} ms  '
+            f'{len(timings) / wall:8.1f} req/s  {connection_count} connections'
+        )
@@ -0,0 +1,157 @@
+import re
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum, Count, Max
+from budgets.export import export_queryset
+from budgets.filters import TransactionFilterSet
+from budgets.models import Budget, Transaction, TransactionRollup, SavingsGoal, SavingsContribution
+from budgets.pagination import KeysetPagination, SearchPagination
+from budgets.recurring import due_templates
+from budgets.search import search_budgets, search_transactions
+from families.models import Family, FamilyMembership
+
+# "Seq Scan on budgets_transaction" (PostgreSQL), "SCAN budgets_transaction" (SQLite);
+# SQLite's "SCAN t USING [COVERING] INDEX i" walks an index and "SCAN t_fts
+# VIRTUAL TABLE INDEX 0:M1" (or "0:=M1", for one rowid) reads the FTS5 matches
+# only: neither is flagged
+SEQUENTIAL_SCAN_PATTERNS = (
+    re.compile(r'Seq Scan on (\w+)'),
+    re.compile(r'\bSCAN (\w+)(?! USING| VIRTUAL TABLE INDEX \d+:=?M)(?:\s|$)'),
+)
+
+
+def sequential_scans(plan):
+    """Return the tables ``plan`` (EXPLAIN output) reads with a full table scan."""
+    tables = []
+    for pattern in SEQUENTIAL_SCAN_PATTERNS:
+        tables.extend(pattern.findall(plan))
+    return tables
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN for the representative queries of the API views against the "
+        "current database and flag sequential scans of large tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--family', type=int,
+            help='Family to build the queries for (default: the family with the most members).'
+        )
+        parser.add_argument(
+            '--min-rows', type=int, default=10000,
+            help='Only flag sequential scans of tables with at least this many rows.'
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        membership = self.sample_membership(options['family'])
+        table_sizes = {}
+        flagged = 0
+
+        for name, queryset in self.queries(membership):
+            plan = queryset.explain()
+            large = []
+            for table in sequential_scans(plan):
+                if table not in table_sizes:
+                    table_sizes[table] = self.table_size(table)
+                if table_sizes[table] >= options['min_rows']:
+                    large.append(f'{table} ({table_sizes[table]} rows)')
+
+            if large:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(f"{name}: sequential scan of {', '.join(large)}"))
+            else:
+                self.stdout.write(f"{name}: ok")
+            if large or self.verbosity > 1:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        if flagged:
+            raise CommandError(f"{flagged} query plan(s) scan large tables sequentially.")
+        self.stdout.write(self.style.SUCCESS('No sequential scans of large tables.'))
+
+    def sample_membership(self, family_id):
+        memberships = FamilyMembership.objects.filter(status='accepted').select_related('user')
+        if family_id is not None:
+            memberships = memberships.filter(family_id=family_id)
+        else:
+            # The busiest family is the one whose plans matter most
+            family = Family.objects.annotate(members=Count('memberships')).order_by('-members').first()
+            memberships = memberships.filter(family=family)
+        membership = memberships.order_by('id').first()
+        if membership is None:
+            raise CommandError('No accepted family membership to build the queries for.')
+        return membership
+
+    def queries(self, membership):
+        """``(name, queryset)`` pairs mirroring the hot queries of the views."""
+        user, family_id = membership.user, membership.family_id
+        budget = Budget.objects.filter(family_id=family_id).order_by('id').first()
+        budget_id = budget.id if budget else 0
+        goal = SavingsGoal.objects.filter(family_id=family_id).order_by('id').first()
+        family_ids = list(
+            FamilyMembership.objects.filter(user=user, status='accepted').values_list('family_id', flat=True)
+        )
+        page = KeysetPagination.page_size + 1
+        ordering = KeysetPagination.ordering
+
+        return [
+            ('family access lookup', FamilyMembership.objects.filter(
+                user_id=user.id, status='accepted'
+            ).values_list('family_id', 'role')),
+            ('user invitations', FamilyMembership.objects.filter(user=user, status='pending')),
+            ('family members', FamilyMembership.objects.filter(family_id=family_id, status='accepted')),
+            ('budget list', Budget.objects.filter(family_id__in=family_ids)),
+            ('transaction list page', Transaction.objects.filter(
+                budget__family_id__in=family_ids
+            ).order_by(*ordering)[:page]),
+            ('budget transaction page', Transaction.objects.filter(budget_id=budget_id).order_by(*ordering)[:page]),
+            ('family history page', Transaction.objects.filter(
+                budget__family_id=family_id
+            ).order_by(*ordering)[:page]),
+            ('member history page', Transaction.objects.filter(
+                budget__family_id=family_id, created_by_id=user.id
+            ).order_by(*ordering)[:page]),
+            ('budget transactions by amount', Transaction.objects.filter(
+                budget_id=budget_id, amount__gte=100
+            ).order_by(*TransactionFilterSet.orderings['-amount'])[:page]),
+            ('budgets in a date range', Budget.objects.filter(
+                family_id=family_id, end_date__gte=date(2024, 1, 1), start_date__lte=date(2024, 12, 31)
+            )),
+            ('goal contributions in a date range', SavingsContribution.objects.filter(
+                savings_goal_id=goal.id if goal else 0, date__gte=date(2024, 1, 1)
+            )),
+            ('family export', export_queryset(family_id)),
+            ('transaction search', search_transactions(family_id, ['payment']).order_by(
+                *SearchPagination.ordering
+            )[:page]),
+            ('budget search', search_budgets(family_id, ['budget']).order_by(*SearchPagination.ordering)[:page]),
+            ('budget totals by type', Budget.objects.filter(
+                family_id=family_id
+            ).values('budget_type').annotate(total=Sum('amount'), spent=Sum('ledger__spent_amount')).order_by()),
+            ('ledger totals', Transaction.objects.filter(
+                budget_id__in=[budget_id]
+            ).values('budget_id').annotate(total=Sum('amount'), count=Count('id'), last=Max('date')).order_by()),
+            ('analytics rollups', TransactionRollup.objects.filter(
+                family_id=family_id, granularity='month'
+            ).values('period_start', 'budget_id', 'budget_type', 'total')),
+            ('due recurring templates', due_templates(date.today())[:1000]),
+            ('savings goals', SavingsGoal.objects.filter(family_id=family_id)),
+            ('contribution totals', SavingsContribution.objects.filter(
+                savings_goal_id__in=[goal.id if goal else 0]
+            ).values('savings_goal_id').annotate(total=Sum('amount')).order_by()),
+        ]
+
+    @staticmethod
+    def table_size(table):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Planner estimate: counting a large table is what we want to avoid
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+            else:
+                cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            row = cursor.fetchone()
+        return max(row[0], 0) if row else 0
@@ -0,0 +1,35 @@
+import time
+from datetime import date
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from budgets.recurring import materialize_due
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the transactions of every recurring transaction template that is due, in batches. '
+        'Safe to re-run and to run from several workers at once: an occurrence is never created twice. '
+        'Schedule it daily, e.g. from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date', dest='today', type=date.fromisoformat,
+            help='Materialize occurrences up to this day, YYYY-MM-DD (default: today).'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Templates per batch and transaction.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        today = options['today'] or timezone.localdate()
+
+        started = time.perf_counter()
+        templates, occurrences = materialize_due(
+            today, batch_size=options['batch_size'], insert_batch_size=settings.TRANSACTION_BULK_BATCH_SIZE
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Materialized {occurrences} occurrence(s) of {templates} template(s) up to {today} "
+            f"in {time.perf_counter() - started:.2f}s."
+        ))
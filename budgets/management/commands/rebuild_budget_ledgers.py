@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from budgets.ledger import rebuild_ledgers, verify_ledgers
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-budget ledger totals from the transaction table, or verify them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'budget_ids', nargs='*', type=int,
+            help='Only process these budgets (default: all budgets).'
+        )
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Only report ledgers that differ from the transactions, do not write.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of budgets processed per query.'
+        )
+
+    def handle(self, *args, **options):
+        budget_ids = options['budget_ids'] or None
+        chunk_size = options['chunk_size']
+
+        if options['verify']:
+            drifted = 0
+            for budget_id, stored, expected in verify_ledgers(budget_ids, chunk_size):
+                drifted += 1
+                self.stdout.write(f"Budget {budget_id}: stored {stored}, expected {expected}")
+            if drifted:
+                raise CommandError(f"{drifted} budget ledger(s) out of sync.")
+            self.stdout.write(self.style.SUCCESS('All budget ledgers are in sync.'))
+            return
+
+        processed = rebuild_ledgers(budget_ids, chunk_size)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {processed} budget ledger(s)."))
@@ -0,0 +1,58 @@
+import multiprocessing
+from django.core.management.base import BaseCommand
+from django.db import connections
+from budgets.rollups import rebuild_rollups
+from families.models import Family
+
+
+def rebuild_family(family_id):
+    try:
+        return family_id, rebuild_rollups(family_ids=[family_id])
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the weekly / monthly / yearly transaction rollups from the '
+        'transaction table, one family per task, in parallel worker processes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'family_ids', nargs='*', type=int,
+            help='Only process these families (default: all families).'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+            help='Number of worker processes; 1 rebuilds in this process.'
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        family_ids = options['family_ids'] or list(Family.objects.order_by('id').values_list('id', flat=True))
+        workers = max(1, min(options['workers'], len(family_ids)))
+
+        if workers == 1:
+            results = (
+                (family_id, rebuild_rollups(family_ids=[family_id]))
+                for family_id in family_ids
+            )
+            written = self.report(results)
+        else:
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                written = self.report(pool.imap_unordered(rebuild_family, family_ids))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} rollup row(s) for {len(family_ids)} family(ies) with {workers} worker(s)."
+        ))
+
+    def report(self, results):
+        written = 0
+        for family_id, rows in results:
+            written += rows
+            if self.verbosity > 1:
+                self.stdout.write(f"Family {family_id}: {rows} rollup row(s)")
+        return written
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from budgets.savings import find_drift, repair_balances
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare every savings goal's current amount with the sum of its "
+        "contributions, and optionally repair the goals that have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'goal_ids', nargs='*', type=int,
+            help='Only process these savings goals (default: all goals).'
+        )
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Reset drifted balances to the sum of their contributions.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of savings goals processed per query.'
+        )
+
+    def handle(self, *args, **options):
+        drifted = []
+        for goal_id, current_amount, expected in find_drift(options['goal_ids'] or None, options['chunk_size']):
+            drifted.append(goal_id)
+            self.stdout.write(f"Savings goal {goal_id}: current amount {current_amount}, contributions {expected}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All savings goal balances match their contributions.'))
+            return
+
+        if not options['fix']:
+            raise CommandError(f"{len(drifted)} savings goal balance(s) out of sync; rerun with --fix to repair.")
+
+        chunk_size = options['chunk_size']
+        repaired = sum(
+            repair_balances(drifted[start:start + chunk_size])
+            for start in range(0, len(drifted), chunk_size)
+        )
+        self.stdout.write(self.style.SUCCESS(f"Repaired {repaired} savings goal balance(s)."))
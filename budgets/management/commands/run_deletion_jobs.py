@@ -0,0 +1,51 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from budgets.deletion import claim_job, run_job
+from budgets.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the families and budgets queued for deletion, in chunks, recording the progress of each job. '
+        'Several workers can run at once. Schedule it frequently, e.g. every minute from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'job_ids', nargs='*', type=int,
+            help='Run these jobs whatever their status, e.g. to resume an interrupted or failed job '
+                 '(default: every pending job).'
+        )
+        parser.add_argument('--chunk-size', type=int, help='Rows per DELETE (default: DELETION_CHUNK_SIZE).')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        failed = 0
+        for job in self.jobs(options['job_ids']):
+            started = time.perf_counter()
+            try:
+                run_job(job, options['chunk_size'])
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f"Deletion job {job.id} ({job.target} {job.target_id}) failed: {error}")
+                continue
+            self.stdout.write(
+                f"Deletion job {job.id}: deleted {job.target} {job.target_id}, {job.deleted_rows} row(s) "
+                f"in {time.perf_counter() - started:.2f}s."
+            )
+
+        if failed:
+            raise CommandError(f"{failed} deletion job(s) failed; rerun them with their ids.")
+        self.stdout.write(self.style.SUCCESS('No deletion jobs pending.'))
+
+    def jobs(self, job_ids):
+        if job_ids:
+            yield from DeletionJob.objects.filter(id__in=job_ids).exclude(status='done').order_by('id')
+            return
+        while True:
+            job = claim_job()
+            if job is None:
+                return
+            yield job
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum, Count, Max
+
+
+def populate_ledgers(apps, schema_editor):
+    Budget = apps.get_model('budgets', 'Budget')
+    BudgetLedger = apps.get_model('budgets', 'BudgetLedger')
+    Transaction = apps.get_model('budgets', 'Transaction')
+
+    totals = {
+        row['budget_id']: row
+        for row in Transaction.objects.values('budget_id').annotate(
+            total=Sum('amount'), count=Count('id'), last_date=Max('date')
+        ).order_by()
+    }
+    ledgers = []
+    for budget_id in Budget.objects.values_list('id', flat=True).iterator():
+        row = totals.get(budget_id, {})
+        ledgers.append(BudgetLedger(
+            budget_id=budget_id,
+            spent_amount=row.get('total') or 0,
+            transaction_count=row.get('count') or 0,
+            last_transaction_date=row.get('last_date')
+        ))
+    BudgetLedger.objects.bulk_create(ledgers, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetLedger',
+            fields=[
+                ('budget', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger', serialize=False, to='budgets.budget')),
+                ('spent_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('last_transaction_date', models.DateField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(populate_ledgers, migrations.RunPython.noop),
+    ]
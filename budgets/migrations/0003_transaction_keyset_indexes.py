@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0002_budgetledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['budget', '-date', '-created_at', '-id'], name='transaction_budget_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-date', '-created_at', '-id'], name='transaction_keyset_idx'),
+        ),
+    ]
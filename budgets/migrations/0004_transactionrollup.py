@@ -0,0 +1,61 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum, Count
+from django.db.models.functions import TruncWeek, TruncMonth, TruncYear
+
+
+def populate_rollups(apps, schema_editor):
+    Transaction = apps.get_model('budgets', 'Transaction')
+    TransactionRollup = apps.get_model('budgets', 'TransactionRollup')
+
+    for granularity, trunc in (('week', TruncWeek), ('month', TruncMonth), ('year', TruncYear)):
+        rows = Transaction.objects.annotate(
+            period=trunc('date')
+        ).values(
+            'period', 'budget_id', 'budget__family_id', 'budget__budget_type'
+        ).annotate(
+            total=Sum('amount'), count=Count('id')
+        ).order_by()
+        TransactionRollup.objects.bulk_create([
+            TransactionRollup(
+                family_id=row['budget__family_id'],
+                budget_id=row['budget_id'],
+                budget_type=row['budget__budget_type'],
+                granularity=granularity,
+                period_start=row['period'],
+                total=row['total'],
+                count=row['count']
+            )
+            for row in rows.iterator()
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0003_transaction_keyset_indexes'),
+        ('families', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('budget_type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=20)),
+                ('granularity', models.CharField(choices=[('week', 'Week'), ('month', 'Month'), ('year', 'Year')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='budgets.budget')),
+                ('family', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_rollups', to='families.family')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['family', 'granularity', 'period_start'], name='transaction_rollup_family_idx')],
+                'constraints': [models.UniqueConstraint(fields=('budget', 'granularity', 'period_start'), name='transaction_rollup_unique_period')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0004_transactionrollup'),
+        ('families', '0002_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budget',
+            index=models.Index(fields=['family', 'budget_type', 'amount'], name='budget_family_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savingscontribution',
+            index=models.Index(fields=['savings_goal', 'amount'], name='contribution_goal_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['budget', 'date', 'amount'], name='transaction_budget_date_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+# (model, searched columns, index name); the expressions must stay the same
+# as the SearchVector built by budgets.search.ranked_matches
+POSTGRES_INDEXES = [
+    ('Transaction', ('description',), 'transaction_search_idx'),
+    ('Budget', ('name', 'description'), 'budget_search_idx'),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+
+        for model_name, fields, name in POSTGRES_INDEXES:
+            schema_editor.add_index(
+                apps.get_model('budgets', model_name),
+                GinIndex(SearchVector(*fields, config='simple'), name=name)
+            )
+    elif vendor == 'sqlite':
+        from budgets.search import install_sqlite_search
+
+        install_sqlite_search(schema_editor.connection, rebuild=True)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for _, _, name in POSTGRES_INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}')
+    elif vendor == 'sqlite':
+        from budgets.search import uninstall_sqlite_search
+
+        uninstall_sqlite_search(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    """Text indexes for budgets.search: GIN indexes on PostgreSQL, FTS5
+    tables on SQLite, nothing elsewhere.
+    """
+
+    dependencies = [
+        ('budgets', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0006_search_indexes'),
+        ('families', '0002_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budget',
+            index=models.Index(fields=['family', 'end_date', 'start_date'], name='budget_family_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savingscontribution',
+            index=models.Index(fields=['savings_goal', 'date'], name='contribution_goal_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['created_by', '-date', '-created_at', '-id'], name='transaction_member_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['budget', 'amount', 'id'], name='transaction_budget_amount_idx'),
+        ),
+    ]
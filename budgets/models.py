@@ -1,9 +1,36 @@
 from django.db import models
 from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
 from families.models import Family
 
 
-class Budget(models.Model):
+class LoadedValuesMixin:
+    """Remembers the values an instance was loaded with in ``_loaded_values``,
+    so that the signal handlers in budgets.signals can tell what a save
+    changed, e.g. the family or budget a row was moved from.
+
+    The values are replaced by the saved ones only once ``save()`` is done,
+    after every ``post_save`` receiver has seen the previous ones, so the
+    receivers do not depend on the order they are connected in.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Deferred fields are left out rather than loaded
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+
+class Budget(LoadedValuesMixin, models.Model):
     PERIOD_CHOICES = (
         ('weekly', 'Weekly'),
         ('monthly', 'Monthly'),
@@ -34,8 +61,44 @@ class Budget(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # Per-type totals of a family (budgets.analytics) without reading the table
+            models.Index(fields=['family', 'budget_type', 'amount'], name='budget_family_type_idx'),
+            # ?start_date= / ?end_date= of the budget list (budgets.filters): budgets overlapping a range
+            models.Index(fields=['family', 'end_date', 'start_date'], name='budget_family_dates_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.name} - {self.get_budget_type_display()} ({self.family.name})"
+    
+    @property
+    def spent_amount(self):
+        """Total of all transactions recorded against the budget."""
+        try:
+            return self.ledger.spent_amount
+        except ObjectDoesNotExist:
+            return 0
+
+
+class BudgetLedger(models.Model):
+    """Running totals of a budget's transactions.
+    
+    Kept in sync by the Transaction signal handlers in budgets.signals, so
+    reading the spent amount never has to scan the transaction history.
+    """
+    budget = models.OneToOneField(
+        Budget,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ledger'
+    )
+    spent_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+    last_transaction_date = models.DateField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.budget_id}: {self.spent_amount} ({self.transaction_count})"
 
 
 class TransactionCategory(models.Model):
@@ -60,7 +123,53 @@ class TransactionCategory(models.Model):
         return f"{self.name} ({self.get_category_type_display()})"
 
 
-class Transaction(models.Model):
+class RecurringTransaction(models.Model):
+    """A transaction repeated on a schedule: rent, a salary, a subscription.
+
+    Occurrences fall every ``interval`` days, weeks, months or years from
+    ``start_date`` until ``end_date``; monthly and yearly ones keep the day of
+    ``start_date``, moved to the last day of shorter months. The
+    ``materialize_recurring`` command turns due occurrences into transactions
+    (budgets.recurring). ``next_date`` is the first occurrence not
+    materialized yet, ``None`` once the schedule has ended.
+    """
+    FREQUENCY_CHOICES = (
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+        ('yearly', 'Yearly'),
+    )
+    
+    budget = models.ForeignKey(
+        Budget,
+        on_delete=models.CASCADE,
+        related_name='recurring_transactions'
+    )
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    description = models.TextField(blank=True, null=True)
+    frequency = models.CharField(max_length=20, choices=FREQUENCY_CHOICES)
+    interval = models.PositiveSmallIntegerField(default=1)
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+    next_date = models.DateField(null=True, blank=True, editable=False)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='recurring_transactions'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            # Due templates in batches (budgets.recurring)
+            models.Index(fields=['next_date', 'id'], name='recurring_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.amount} {self.get_frequency_display().lower()} - {self.budget.name}"
+
+
+class Transaction(LoadedValuesMixin, models.Model):
     budget = models.ForeignKey(
         Budget,
         on_delete=models.CASCADE,
@@ -75,12 +184,83 @@ class Transaction(models.Model):
         related_name='transactions'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # The template and scheduled date of a materialized occurrence
+    recurring = models.ForeignKey(
+        RecurringTransaction,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='occurrences',
+        # Served by the unique constraint below, which starts with it
+        db_index=False
+    )
+    recurring_date = models.DateField(null=True, blank=True, editable=False)
+    
+    class Meta:
+        constraints = [
+            # One transaction per occurrence, however often the generator runs
+            models.UniqueConstraint(fields=['recurring', 'recurring_date'], name='transaction_recurring_occurrence_uniq'),
+        ]
+        indexes = [
+            # Keyset pagination of a budget's / a family's history (see budgets.pagination)
+            models.Index(fields=['budget', '-date', '-created_at', '-id'], name='transaction_budget_keyset_idx'),
+            models.Index(fields=['-date', '-created_at', '-id'], name='transaction_keyset_idx'),
+            # Date ranges of a budget, covering the amount for ledger, rollup and export aggregates
+            models.Index(fields=['budget', 'date', 'amount'], name='transaction_budget_date_idx'),
+            # ?created_by= history pages and ?ordering=amount / amount ranges (budgets.filters)
+            models.Index(fields=['created_by', '-date', '-created_at', '-id'], name='transaction_member_keyset_idx'),
+            models.Index(fields=['budget', 'amount', 'id'], name='transaction_budget_amount_idx'),
+        ]
     
     def __str__(self):
         return f"{self.amount} - {self.budget.name} ({self.date})"
 
 
-class SavingsGoal(models.Model):
+class TransactionRollup(models.Model):
+    """Sum and count of a budget's transactions per week, month or year.
+    
+    Maintained incrementally by the Transaction signal handlers in
+    budgets.signals (see budgets.rollups), so time-series analytics read a
+    handful of rows per period instead of the whole transaction history.
+    """
+    GRANULARITY_CHOICES = (
+        ('week', 'Week'),
+        ('month', 'Month'),
+        ('year', 'Year'),
+    )
+    
+    family = models.ForeignKey(
+        Family,
+        on_delete=models.CASCADE,
+        related_name='transaction_rollups'
+    )
+    budget = models.ForeignKey(
+        Budget,
+        on_delete=models.CASCADE,
+        related_name='rollups'
+    )
+    budget_type = models.CharField(max_length=20, choices=Budget.TYPE_CHOICES)
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    period_start = models.DateField()
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['budget', 'granularity', 'period_start'],
+                name='transaction_rollup_unique_period'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['family', 'granularity', 'period_start'], name='transaction_rollup_family_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.budget_id} {self.granularity} {self.period_start}: {self.total} ({self.count})"
+
+
+class SavingsGoal(LoadedValuesMixin, models.Model):
     family = models.ForeignKey(
         Family,
         on_delete=models.CASCADE,
@@ -101,7 +281,7 @@ class SavingsGoal(models.Model):
         return f"{self.name} - {self.current_amount}/{self.target_amount} ({self.family.name})"
 
 
-class SavingsContribution(models.Model):
+class SavingsContribution(LoadedValuesMixin, models.Model):
     savings_goal = models.ForeignKey(
         SavingsGoal,
         on_delete=models.CASCADE,
@@ -116,5 +296,68 @@ class SavingsContribution(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # Contribution sums per goal (budgets.savings) from the index alone
+            models.Index(fields=['savings_goal', 'amount'], name='contribution_goal_amount_idx'),
+            # A goal's contributions in a date range (budgets.filters)
+            models.Index(fields=['savings_goal', 'date'], name='contribution_goal_date_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.amount} to {self.savings_goal.name} ({self.date})"
+
+
+class DeletionJob(models.Model):
+    """A family or budget too large to delete within a request.
+    
+    ``run_deletion_jobs`` deletes the target's rows in chunks (budgets.deletion)
+    and records them in ``progress``, ``{model label: rows deleted}``, as it
+    goes. The target is referenced by id only: it is gone once the job is done.
+    """
+    TARGET_CHOICES = (
+        ('family', 'Family'),
+        ('budget', 'Budget'),
+    )
+    
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    ACTIVE_STATUSES = ('pending', 'running')
+    
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    target_id = models.BigIntegerField()
+    family_id = models.BigIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    estimated_rows = models.BigIntegerField(default=0)
+    deleted_rows = models.BigIntegerField(default=0)
+    progress = models.JSONField(default=dict)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='deletion_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        constraints = [
+            # Deleting a queued target again returns its job
+            models.UniqueConstraint(
+                fields=['target', 'target_id'],
+                condition=models.Q(status__in=('pending', 'running')),
+                name='deletion_job_active_target_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'id'], name='deletion_job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Delete {self.target} {self.target_id} ({self.get_status_display()})"
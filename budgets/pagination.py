@@ -0,0 +1,136 @@
+import base64
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over a unique ordering, without OFFSET.
+
+    The cursor is the opaque, base64-encoded sort key of the last row of the
+    previous page, so every page is a bounded range scan of the index that
+    matches ``ordering`` no matter how deep the client has paged.
+    """
+    ordering = ('-date', '-created_at', '-id')
+    page_size = settings.TRANSACTION_PAGE_SIZE
+    max_page_size = settings.TRANSACTION_MAX_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = self.get_ordering(view)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        # Fetch one extra row to know whether there is a next page
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_position = self.position_of(results[-1]) if self.has_next else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_ordering(self, view):
+        # A view with ?ordering= (budgets.filters) chooses among unique orderings
+        get_ordering = getattr(view, 'get_ordering', None)
+        return (get_ordering and get_ordering()) or self.ordering
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def position_of(self, instance):
+        return [getattr(instance, name) for name, _ in self.fields()]
+
+    def after(self, position):
+        """Filter for rows strictly after ``position`` in ``ordering``.
+
+        The leading column is bounded on its own as well, which lets the
+        database turn the OR of equalities into a single index range.
+        """
+        fields = self.fields()
+        leading, leading_descending = fields[0]
+        condition = Q()
+        for index, (name, descending) in enumerate(fields):
+            equal = {field: value for (field, _), value in zip(fields[:index], position)}
+            lookup = 'lt' if descending else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': position[index]})
+        bound = Q(**{f"{leading}__{'lte' if leading_descending else 'gte'}": position[0]})
+        return bound & condition
+
+    def encode_cursor(self, position):
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat')
+            else value if isinstance(value, (int, str))
+            else str(value)
+            for value in position
+        ]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [self.to_python(name, value) for (name, _), value in zip(self.fields(), values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, name, value):
+        return self.model._meta.get_field(name).to_python(value)
+
+
+class SearchPagination(KeysetPagination):
+    """Keyset pages of search results, best match first.
+
+    ``rank`` is the annotation of budgets.search; floats survive the JSON
+    cursor exactly, so the equality in ``after`` holds.
+    """
+    ordering = ('-rank', '-id')
+
+    def to_python(self, name, value):
+        if name == 'rank':
+            return float(value)
+        return super().to_python(name, value)
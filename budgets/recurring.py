@@ -0,0 +1,176 @@
+"""
+Materializing recurring transaction templates.
+
+``materialize_due`` walks the templates whose ``next_date`` has come, in
+batches of one database transaction each: it turns their due occurrences
+into transactions with ``bulk_create`` and moves ``next_date`` past them.
+Every occurrence carries its template and scheduled date, unique together,
+so running the generator again, or from several workers at once, never
+creates a second transaction for an occurrence: occurrences that exist are
+skipped, and a batch that would duplicate one fails on the constraint.
+
+On PostgreSQL batches are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED``,
+so concurrent workers split the templates between them, and lock the
+ledgers of their budgets. The rows are inserted with
+``bulk_create_transactions``, like a bulk upload, which adds them to the
+ledgers and rollups and bumps the families' data versions.
+"""
+
+import calendar
+from datetime import timedelta
+from django.db import connection, transaction as db_transaction
+from django.db.models import Max
+from .bulk import bulk_create_transactions
+from .models import Budget, BudgetLedger, RecurringTransaction, Transaction
+
+# Bound on the rows one template adds to a batch, e.g. a daily template started
+# years ago; it stays due and the following batches catch up
+MAX_OCCURRENCES_PER_BATCH = 366
+
+
+def add_months(day, months, anchor_day):
+    """``day`` moved by ``months``, on ``anchor_day`` or the month's last day."""
+    month_index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(month_index, 12)
+    return day.replace(year=year, month=month + 1, day=min(anchor_day, calendar.monthrange(year, month + 1)[1]))
+
+
+def nth_occurrence(template, n):
+    """Date of the ``n``-th occurrence of ``template`` (the first is ``n=0``)."""
+    step = n * template.interval
+    if template.frequency == 'daily':
+        return template.start_date + timedelta(days=step)
+    if template.frequency == 'weekly':
+        return template.start_date + timedelta(weeks=step)
+    months = step if template.frequency == 'monthly' else step * 12
+    return add_months(template.start_date, months, template.start_date.day)
+
+
+def first_occurrence_after(template, day):
+    """First occurrence of ``template`` later than ``day`` (``None`` past ``end_date``)."""
+    start = template.start_date
+    if day < start:
+        n = 0
+    elif template.frequency in ('daily', 'weekly'):
+        unit = template.interval * (7 if template.frequency == 'weekly' else 1)
+        n = (day - start).days // unit + 1
+    else:
+        unit = template.interval * (1 if template.frequency == 'monthly' else 12)
+        n = max(((day.year - start.year) * 12 + day.month - start.month) // unit, 0)
+        # Clamped month ends can land on either side of ``day``
+        while nth_occurrence(template, n) <= day:
+            n += 1
+    occurrence = nth_occurrence(template, n)
+    if template.end_date is not None and occurrence > template.end_date:
+        return None
+    return occurrence
+
+
+def schedule(template):
+    """Set ``next_date`` for a new or rescheduled template.
+
+    Occurrences already materialized are not repeated: the schedule resumes
+    after the latest of them.
+    """
+    latest = template.occurrences.aggregate(latest=Max('recurring_date'))['latest'] if template.pk else None
+    template.next_date = first_occurrence_after(template, latest or template.start_date - timedelta(days=1))
+    return template
+
+
+def due_occurrences(template, today):
+    """The occurrences of ``template`` from ``next_date`` to ``today``, and the
+    following ``next_date``.
+    """
+    dates = []
+    occurrence = template.next_date
+    while occurrence is not None and occurrence <= today and len(dates) < MAX_OCCURRENCES_PER_BATCH:
+        dates.append(occurrence)
+        occurrence = first_occurrence_after(template, occurrence)
+    return dates, occurrence
+
+
+def due_templates(today):
+    """Templates due by ``today``, in the order of ``recurring_due_idx``, with
+    the budget fields a batch needs.
+    """
+    return RecurringTransaction.objects.filter(
+        next_date__lte=today
+    ).select_related('budget').defer(
+        *(f'budget__{field.attname}' for field in Budget._meta.concrete_fields
+          if field.attname not in ('id', 'family_id', 'budget_type'))
+    ).order_by('next_date', 'id')
+
+
+def claim_due(today, batch_size):
+    """The next batch of due templates, locked against other workers where possible."""
+    queryset = due_templates(today)
+    if connection.features.has_select_for_update_skip_locked:
+        queryset = queryset.select_for_update(skip_locked=True, of=('self',))
+    return list(queryset[:batch_size])
+
+
+def materialize_batch(templates, today, insert_batch_size=None):
+    """Create the due transactions of ``templates``. Returns the number of
+    transactions created.
+    """
+    budget_ids = sorted({template.budget_id for template in templates})
+    # Batches of other workers on the same budgets wait here, so that the
+    # occurrences found below include theirs; locked in id order against deadlocks
+    list(BudgetLedger.objects.select_for_update().filter(
+        budget_id__in=budget_ids
+    ).order_by('budget_id').values_list('budget_id', flat=True))
+
+    due = {}
+    for template in templates:
+        dates, template.next_date = due_occurrences(template, today)
+        if dates:
+            due[template] = dates
+    if not due:
+        return 0
+
+    # Occurrences created before, e.g. by a run interrupted after its inserts
+    existing = set(Transaction.objects.filter(
+        recurring_id__in=[template.id for template in due],
+        recurring_date__gte=min(dates[0] for dates in due.values())
+    ).values_list('recurring_id', 'recurring_date'))
+    transactions = [
+        Transaction(
+            budget_id=template.budget_id,
+            amount=template.amount,
+            description=template.description,
+            date=occurrence,
+            created_by_id=template.created_by_id,
+            recurring_id=template.id,
+            recurring_date=occurrence,
+        )
+        for template, dates in due.items()
+        for occurrence in dates
+        if (template.id, occurrence) not in existing
+    ]
+    # The unique occurrence key rejects the batch rather than duplicate a row
+    bulk_create_transactions(transactions, insert_batch_size, budgets={
+        template.budget_id: (template.budget.family_id, template.budget.budget_type) for template in due
+    })
+
+    # Templates mostly move to the same few dates: one UPDATE per date
+    next_dates = {}
+    for template in due:
+        next_dates.setdefault(template.next_date, []).append(template.id)
+    for next_date, ids in next_dates.items():
+        RecurringTransaction.objects.filter(id__in=ids).update(next_date=next_date)
+    return len(transactions)
+
+
+def materialize_due(today, batch_size=1000, insert_batch_size=None):
+    """Materialize every due occurrence up to ``today``, one transaction per
+    batch of templates. Returns ``(templates, occurrences)`` processed.
+    """
+    template_count = occurrence_count = 0
+    while True:
+        with db_transaction.atomic():
+            templates = claim_due(today, batch_size)
+            if not templates:
+                break
+            occurrence_count += materialize_batch(templates, today, insert_batch_size)
+        template_count += len(templates)
+    return template_count, occurrence_count
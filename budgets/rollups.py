@@ -0,0 +1,281 @@
+"""
+Per-period transaction rollups (``TransactionRollup``).
+
+Every transaction counts towards one week, one month and one year row of its
+budget. The Transaction signal handlers apply deltas as transactions are
+written; ``rebuild_rollups`` recomputes rows from the transaction table after
+bulk writes, backfills or migrations.
+"""
+
+from datetime import timedelta
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Q, F, Sum, Count
+from django.db.models.functions import TruncWeek, TruncMonth, TruncYear
+from .models import Budget, Transaction, TransactionRollup
+
+GRANULARITIES = ('week', 'month', 'year')
+TRUNC_FUNCTIONS = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'year': TruncYear,
+}
+
+
+def period_start(day, granularity):
+    """First day of the period containing ``day`` (weeks start on Monday, like ``TruncWeek``)."""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def next_period_start(day, granularity):
+    start = period_start(day, granularity)
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start.replace(year=start.year + 1)
+
+
+def _periods_of(day):
+    condition = Q()
+    for granularity in GRANULARITIES:
+        condition |= Q(granularity=granularity, period_start=period_start(day, granularity))
+    return condition
+
+
+def apply_rollup_delta(budget_id, day, amount, count):
+    """Add ``amount``/``count`` to the week, month and year rows of the budget containing ``day``."""
+    rollups = TransactionRollup.objects.filter(_periods_of(day), budget_id=budget_id)
+    updated = rollups.update(total=F('total') + amount, count=F('count') + count)
+
+    if count < 0:
+        # Periods left without transactions disappear, as they do in the raw grouping
+        rollups.filter(count__lte=0).delete()
+    elif updated < len(GRANULARITIES):
+        _create_missing_periods(budget_id, day, amount, count, rollups)
+
+
+def add_transactions(transactions, budgets):
+    """Add new, already inserted ``transactions`` to their week, month and
+    year rows with a few set-based queries instead of an ``apply_rollup_delta``
+    per transaction. ``budgets`` maps their budget ids to
+    ``(family_id, budget_type)``.
+    """
+    deltas = {}
+    for obj in transactions:
+        for granularity in GRANULARITIES:
+            key = (obj.budget_id, granularity, period_start(obj.date, granularity))
+            total, count = deltas.get(key, (0, 0))
+            deltas[key] = (total + obj.amount, count + 1)
+    if not deltas:
+        return
+
+    # Missing periods are created empty first, so that every row added to is
+    # locked below and concurrent signal handlers wait for the new totals
+    TransactionRollup.objects.bulk_create(
+        [
+            TransactionRollup(
+                family_id=budgets[budget_id][0],
+                budget_id=budget_id,
+                budget_type=budgets[budget_id][1],
+                granularity=granularity,
+                period_start=start,
+                total=0,
+                count=0
+            )
+            for budget_id, granularity, start in deltas
+        ],
+        ignore_conflicts=True,
+        batch_size=1000
+    )
+    condition = Q()
+    for granularity in GRANULARITIES:
+        condition |= Q(granularity=granularity, period_start__in={key[2] for key in deltas if key[1] == granularity})
+    rollups = TransactionRollup.objects.select_for_update().filter(
+        condition, budget_id__in={key[0] for key in deltas}
+    ).order_by('id')
+    for rollup in rollups:
+        key = (rollup.budget_id, rollup.granularity, rollup.period_start)
+        if key in deltas:
+            total, count = deltas[key]
+            deltas[key] = (rollup.total + total, rollup.count + count)
+
+    TransactionRollup.objects.bulk_create(
+        [
+            TransactionRollup(
+                family_id=budgets[budget_id][0],
+                budget_id=budget_id,
+                budget_type=budgets[budget_id][1],
+                granularity=granularity,
+                period_start=start,
+                total=total,
+                count=count
+            )
+            for (budget_id, granularity, start), (total, count) in deltas.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['budget', 'granularity', 'period_start'],
+        update_fields=['total', 'count'],
+        batch_size=1000
+    )
+
+
+def _create_missing_periods(budget_id, day, amount, count, rollups):
+    existing = set(rollups.values_list('granularity', flat=True))
+    if count == 0:
+        # Changing a transaction whose periods are missing: the rollups are
+        # out of sync, recount the periods of that day
+        rebuild_rollups(budget_ids=[budget_id], start=day, end=day)
+        return
+
+    # First transaction of the period
+    family_id, budget_type = Budget.objects.values_list('family_id', 'budget_type').get(id=budget_id)
+    try:
+        with db_transaction.atomic():
+            TransactionRollup.objects.bulk_create([
+                TransactionRollup(
+                    family_id=family_id,
+                    budget_id=budget_id,
+                    budget_type=budget_type,
+                    granularity=granularity,
+                    period_start=period_start(day, granularity),
+                    total=amount,
+                    count=count
+                )
+                for granularity in GRANULARITIES
+                if granularity not in existing
+            ])
+    except IntegrityError:
+        # A concurrent transaction created the period first
+        rebuild_rollups(budget_ids=[budget_id], start=day, end=day)
+
+
+def rebuild_rollups(family_ids=None, budget_ids=None, start=None, end=None):
+    """Recompute the rollups of the given families / budgets (default: all)
+    from the transaction table.
+
+    With ``start``/``end`` only the periods overlapping that date range are
+    rebuilt. Returns the number of rollup rows written.
+    """
+    rollups = TransactionRollup.objects.all()
+    transactions = Transaction.objects.all()
+    if family_ids is not None:
+        rollups = rollups.filter(family_id__in=family_ids)
+        transactions = transactions.filter(budget__family_id__in=family_ids)
+    if budget_ids is not None:
+        rollups = rollups.filter(budget_id__in=budget_ids)
+        transactions = transactions.filter(budget_id__in=budget_ids)
+
+    written = 0
+    with db_transaction.atomic():
+        for granularity in GRANULARITIES:
+            period_rollups = rollups.filter(granularity=granularity)
+            period_transactions = transactions
+            if start is not None:
+                lower = period_start(start, granularity)
+                period_rollups = period_rollups.filter(period_start__gte=lower)
+                period_transactions = period_transactions.filter(date__gte=lower)
+            if end is not None:
+                upper = next_period_start(end, granularity)
+                period_rollups = period_rollups.filter(period_start__lt=upper)
+                period_transactions = period_transactions.filter(date__lt=upper)
+
+            period_rollups.delete()
+            rows = period_transactions.annotate(
+                period=TRUNC_FUNCTIONS[granularity]('date')
+            ).values(
+                'period', 'budget_id', 'budget__family_id', 'budget__budget_type'
+            ).annotate(
+                total=Sum('amount'),
+                count=Count('id')
+            ).order_by()
+            created = TransactionRollup.objects.bulk_create(
+                [
+                    TransactionRollup(
+                        family_id=row['budget__family_id'],
+                        budget_id=row['budget_id'],
+                        budget_type=row['budget__budget_type'],
+                        granularity=granularity,
+                        period_start=row['period'],
+                        total=row['total'],
+                        count=row['count']
+                    )
+                    for row in rows.iterator()
+                ],
+                batch_size=1000
+            )
+            written += len(created)
+    return written
+
+
+def family_period_totals(family_id, granularity, start=None, end=None):
+    """Per-period, per-budget totals of a family's transactions between
+    ``start`` and ``end`` (inclusive, both optional).
+
+    Whole periods are read from the rollups; periods only partly inside the
+    range are aggregated from the raw transactions of the covered days.
+    Returns ``(period, budget_id, budget_name, budget_type, total)`` tuples.
+    """
+    return [
+        row
+        for query in family_period_queries(family_id, granularity, start, end)
+        for row in query()
+    ]
+
+
+def family_period_queries(family_id, granularity, start=None, end=None):
+    """The independent queries behind ``family_period_totals``, as callables
+    returning its rows, so that they can run concurrently.
+    """
+    first_full = start
+    if start is not None and period_start(start, granularity) != start:
+        first_full = next_period_start(start, granularity)
+    # Exclusive end of the last whole period
+    end_full = None
+    if end is not None:
+        end_full = next_period_start(end, granularity)
+        if end_full - timedelta(days=1) != end:
+            end_full = period_start(end, granularity)
+
+    if first_full is not None and end_full is not None and first_full >= end_full:
+        # No whole period in the range
+        return [lambda: _raw_period_totals(family_id, granularity, Q(date__gte=start, date__lte=end))]
+
+    rollups = TransactionRollup.objects.filter(family_id=family_id, granularity=granularity)
+    if first_full is not None:
+        rollups = rollups.filter(period_start__gte=first_full)
+    if end_full is not None:
+        rollups = rollups.filter(period_start__lt=end_full)
+    queries = [lambda: [
+        (row['period_start'], row['budget_id'], row['budget__name'], row['budget_type'], row['total'])
+        for row in rollups.values('period_start', 'budget_id', 'budget__name', 'budget_type', 'total')
+    ]]
+
+    edges = Q()
+    if start is not None and start < first_full:
+        edges |= Q(date__gte=start, date__lt=first_full)
+    if end is not None and end_full <= end:
+        edges |= Q(date__gte=end_full, date__lte=end)
+    if edges:
+        queries.append(lambda: _raw_period_totals(family_id, granularity, edges))
+    return queries
+
+
+def _raw_period_totals(family_id, granularity, condition):
+    rows = Transaction.objects.filter(
+        condition,
+        budget__family_id=family_id
+    ).annotate(
+        period=TRUNC_FUNCTIONS[granularity]('date')
+    ).values(
+        'period', 'budget_id', 'budget__name', 'budget__budget_type'
+    ).annotate(
+        total=Sum('amount')
+    ).order_by()
+    return [
+        (row['period'], row['budget_id'], row['budget__name'], row['budget__budget_type'], row['total'])
+        for row in rows
+    ]
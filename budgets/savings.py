@@ -0,0 +1,54 @@
+from decimal import Decimal
+from django.db.models import Sum, F, OuterRef, Subquery, Value, DecimalField
+from django.db.models.functions import Coalesce
+from .chunking import iter_id_chunks
+from .data_version import bump_savings_goal_families
+from .models import SavingsGoal, SavingsContribution
+
+
+def apply_contribution_delta(savings_goal_id, amount):
+    """Add ``amount`` to the goal's balance with an in-database increment.
+
+    Concurrent contributions cannot overwrite each other, and only the
+    ``current_amount`` column is written. Call it inside the transaction
+    that inserts, updates or deletes the contribution.
+    """
+    SavingsGoal.objects.filter(id=savings_goal_id).update(current_amount=F('current_amount') + amount)
+
+
+def contribution_totals(goal_ids):
+    totals = {goal_id: Decimal('0.00') for goal_id in goal_ids}
+    totals.update(
+        SavingsContribution.objects.filter(
+            savings_goal_id__in=goal_ids
+        ).values('savings_goal_id').annotate(
+            total=Sum('amount')
+        ).order_by().values_list('savings_goal_id', 'total')
+    )
+    return totals
+
+
+def find_drift(goal_ids=None, chunk_size=1000):
+    """Yield ``(goal_id, current_amount, contributions_total)`` for every goal
+    whose balance differs from the sum of its contributions.
+    """
+    for chunk in iter_id_chunks(SavingsGoal.objects.all(), goal_ids, chunk_size):
+        totals = contribution_totals(chunk)
+        for goal_id, current_amount in SavingsGoal.objects.filter(id__in=chunk).values_list('id', 'current_amount'):
+            if current_amount != totals[goal_id]:
+                yield goal_id, current_amount, totals[goal_id]
+
+
+def repair_balances(goal_ids):
+    """Set the goals' balances to the sum of their contributions in one UPDATE
+    and bump their families' data versions. Returns the number of goals updated.
+    """
+    total = SavingsContribution.objects.filter(
+        savings_goal_id=OuterRef('id')
+    ).values('savings_goal_id').annotate(total=Sum('amount')).values('total')
+    updated = SavingsGoal.objects.filter(id__in=goal_ids).update(
+        current_amount=Coalesce(Subquery(total), Value(Decimal('0.00')), output_field=DecimalField())
+    )
+    # update() sends no signals: cached analytics still show the drifted balances
+    bump_savings_goal_families(goal_ids)
+    return updated
@@ -0,0 +1,168 @@
+"""
+Full-text search over transaction descriptions and budget names and
+descriptions.
+
+On PostgreSQL the searched columns are indexed by GIN indexes over
+``to_tsvector('simple', ...)`` (migration 0006), and queries build the very
+same ``SearchVector`` so that the planner uses them; results are ranked with
+``ts_rank``. On SQLite (local runs) the text lives in FTS5 tables kept in sync
+by triggers, and results are ranked with ``bm25``. Either way only the
+matching rows are read, however long the history.
+
+The ``simple`` configuration does no stemming, which works the same for the
+Russian and English descriptions users write. Every word of the query must
+match, as a prefix, so that "dent pay" finds "Dentist payment".
+"""
+
+import re
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from .models import Budget, Transaction
+
+SEARCH_CONFIG = 'simple'
+MAX_TERMS = 8
+
+# model -> searched columns
+SEARCH_FIELDS = {
+    Transaction: ('description',),
+    Budget: ('name', 'description'),
+}
+
+SQLITE_TABLES = {
+    'budgets_transaction': ('description',),
+    'budgets_budget': ('name', 'description'),
+}
+
+
+def search_terms(query):
+    """The words of ``query``, lower-cased."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def ranked_matches(queryset, terms):
+    """Filter ``queryset`` to the rows matching every term and annotate their
+    ``rank`` (higher is better).
+    """
+    model = queryset.model
+    fields = SEARCH_FIELDS[model]
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        # Same expression as the GIN indexes of migration 0006
+        vector = SearchVector(*fields, config=SEARCH_CONFIG)
+        query = SearchQuery(' & '.join(f"'{term}':*" for term in terms), search_type='raw', config=SEARCH_CONFIG)
+        return queryset.annotate(search_vector=vector).filter(search_vector=query).annotate(
+            rank=SearchRank(vector, query)
+        )
+
+    if connection.vendor == 'sqlite':
+        table = model._meta.db_table
+        fts_table = f'{table}_fts'
+        # FTS5 ANDs the quoted prefix terms
+        match = ' '.join(f'"{term}"*' for term in terms)
+        # bm25 only has a value inside a MATCH query, hence the subquery per
+        # matching row; its statistics cover the whole table, so the rank is
+        # the same as from a join
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s', [match])
+        ).annotate(rank=RawSQL(
+            f'SELECT -bm25({fts_table}) FROM {fts_table} '
+            f'WHERE {fts_table} MATCH %s AND {fts_table}.rowid = "{table}"."id"',
+            [match],
+            output_field=FloatField()
+        ))
+
+    # Other backends: unindexed and unranked
+    condition = Q()
+    for term in terms:
+        condition &= Q(*(Q(**{f'{field}__icontains': term}) for field in fields), _connector=Q.OR)
+    return queryset.filter(condition).annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+def search_transactions(family_id, terms, start_date=None, end_date=None, min_amount=None, max_amount=None,
+                        budget_id=None):
+    queryset = Transaction.objects.filter(budget__family_id=family_id)
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+    if min_amount is not None:
+        queryset = queryset.filter(amount__gte=min_amount)
+    if max_amount is not None:
+        queryset = queryset.filter(amount__lte=max_amount)
+    if budget_id:
+        queryset = queryset.filter(budget_id=budget_id)
+    return ranked_matches(queryset, terms)
+
+
+def search_budgets(family_id, terms, start_date=None, end_date=None, min_amount=None, max_amount=None,
+                   budget_id=None):
+    queryset = Budget.objects.filter(family_id=family_id)
+    # Budgets running at some point of the date range
+    if start_date:
+        queryset = queryset.filter(end_date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(start_date__lte=end_date)
+    if min_amount is not None:
+        queryset = queryset.filter(amount__gte=min_amount)
+    if max_amount is not None:
+        queryset = queryset.filter(amount__lte=max_amount)
+    if budget_id:
+        queryset = queryset.filter(id=budget_id)
+    return ranked_matches(queryset, terms)
+
+
+def install_sqlite_search(connection, rebuild=False):
+    """Create the FTS5 tables and the triggers that keep them in sync.
+
+    Safe to run again: Django rebuilds SQLite tables for most schema changes,
+    which drops their triggers, so this also runs after every ``migrate``
+    (see budgets.signals) and reindexes a table whose triggers were missing.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        triggers = {row[0] for row in cursor.fetchall()}
+
+        for table, columns in SQLITE_TABLES.items():
+            fts_table = f'{table}_fts'
+            column_list = ', '.join(columns)
+            new_values = ', '.join(f'new.{column}' for column in columns)
+            old_values = ', '.join(f'old.{column}' for column in columns)
+            names = {f'{fts_table}_{event}' for event in ('insert', 'delete', 'update')}
+
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+                f"{column_list}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE OF {column_list} ON {table} BEGIN "
+                f"INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+                f"INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values}); END"
+            )
+            if rebuild or not names <= triggers:
+                cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+
+def uninstall_sqlite_search(connection):
+    with connection.cursor() as cursor:
+        for table in SQLITE_TABLES:
+            fts_table = f'{table}_fts'
+            for event in ('insert', 'delete', 'update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {fts_table}_{event}')
+            cursor.execute(f'DROP TABLE IF EXISTS {fts_table}')
+
+
+def sqlite_search_installed(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'budgets_transaction_fts'")
+        return cursor.fetchone() is not None
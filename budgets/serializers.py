@@ -1,8 +1,17 @@
+from django.db import transaction as db_transaction
 from rest_framework import serializers
-from .models import Budget, Transaction, TransactionCategory, SavingsGoal, SavingsContribution
+from .models import (
+    Budget, Transaction, TransactionCategory, SavingsGoal, SavingsContribution, RecurringTransaction, DeletionJob
+)
 from users.serializers import UserSerializer
 from families.serializers import FamilySerializer
+from families.access import has_membership
 from families.models import Family
+from families.scoping import scope_to_user
+from family_budget_2.expansion import ExpandableFieldsMixin
+from .recurring import schedule
+from .savings import apply_contribution_delta
+from .search import search_terms
 
 
 class TransactionCategorySerializer(serializers.ModelSerializer):
@@ -11,25 +20,37 @@ class TransactionCategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'category_type', 'family']
         read_only_fields = ['id']
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        user = self.context.get('request').user if self.context.get('request') else None
+        
+        if user:
+            # Filter families to only those the user is a member of
+            self.fields['family'].queryset = scope_to_user(Family.objects.all(), user, 'id')
+    
     def create(self, validated_data):
         # Ensure the user is a member of the family
         user = self.context['request'].user
         family = validated_data.get('family')
         
-        if not family.memberships.filter(user=user, status='accepted').exists():
+        if not has_membership(user, family.id):
             raise serializers.ValidationError("You are not a member of this family.")
         
         return super().create(validated_data)
 
 
-class BudgetSerializer(serializers.ModelSerializer):
-    created_by = UserSerializer(read_only=True)
-    family = FamilySerializer(read_only=True)
+class BudgetSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    family = serializers.PrimaryKeyRelatedField(read_only=True)
     family_id = serializers.PrimaryKeyRelatedField(
         write_only=True,
         source='family',
         queryset=Family.objects.all()
     )
+    expandable_fields = {
+        'family': FamilySerializer,
+        'created_by': UserSerializer,
+    }
     
     class Meta:
         model = Budget
@@ -45,32 +66,33 @@ class BudgetSerializer(serializers.ModelSerializer):
         
         if user:
             # Filter families to only those the user is a member of
-            self.fields['family_id'].queryset = Family.objects.filter(
-                memberships__user=user,
-                memberships__status='accepted'
-            )
+            self.fields['family_id'].queryset = scope_to_user(Family.objects.all(), user, 'id')
     
     def create(self, validated_data):
         user = self.context['request'].user
         return Budget.objects.create(created_by=user, **validated_data)
 
 
-class TransactionSerializer(serializers.ModelSerializer):
-    created_by = UserSerializer(read_only=True)
-    budget = BudgetSerializer(read_only=True)
+class TransactionSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    budget = serializers.PrimaryKeyRelatedField(read_only=True)
     budget_id = serializers.PrimaryKeyRelatedField(
         write_only=True,
         source='budget',
         queryset=Budget.objects.all()
     )
+    expandable_fields = {
+        'budget': BudgetSerializer,
+        'created_by': UserSerializer,
+    }
     
     class Meta:
         model = Transaction
         fields = [
             'id', 'budget', 'budget_id', 'amount',
-            'description', 'date', 'created_by', 'created_at'
+            'description', 'date', 'created_by', 'created_at', 'recurring'
         ]
-        read_only_fields = ['id', 'created_at', 'created_by']
+        read_only_fields = ['id', 'created_at', 'created_by', 'recurring']
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -78,25 +100,108 @@ class TransactionSerializer(serializers.ModelSerializer):
         
         if user:
             # Filter budgets to only those in families the user is a member of
-            families = Family.objects.filter(
-                memberships__user=user,
-                memberships__status='accepted'
-            )
-            self.fields['budget_id'].queryset = Budget.objects.filter(family__in=families)
+            self.fields['budget_id'].queryset = scope_to_user(Budget.objects.all(), user)
     
     def create(self, validated_data):
         user = self.context['request'].user
         return Transaction.objects.create(created_by=user, **validated_data)
 
 
-class SavingsGoalSerializer(serializers.ModelSerializer):
-    created_by = UserSerializer(read_only=True)
-    family = FamilySerializer(read_only=True)
+class RecurringTransactionSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    budget = serializers.PrimaryKeyRelatedField(read_only=True)
+    budget_id = serializers.PrimaryKeyRelatedField(
+        write_only=True,
+        source='budget',
+        queryset=Budget.objects.all()
+    )
+    expandable_fields = {
+        'budget': BudgetSerializer,
+        'created_by': UserSerializer,
+    }
+    schedule_fields = ('frequency', 'interval', 'start_date', 'end_date')
+    
+    class Meta:
+        model = RecurringTransaction
+        fields = [
+            'id', 'budget', 'budget_id', 'amount', 'description', 'frequency', 'interval',
+            'start_date', 'end_date', 'next_date', 'created_by', 'created_at'
+        ]
+        read_only_fields = ['id', 'next_date', 'created_at', 'created_by']
+        extra_kwargs = {'interval': {'min_value': 1, 'max_value': 366}}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        user = self.context.get('request').user if self.context.get('request') else None
+        
+        if user:
+            # Filter budgets to only those in families the user is a member of
+            self.fields['budget_id'].queryset = scope_to_user(Budget.objects.all(), user)
+        if isinstance(self.instance, RecurringTransaction):
+            # A template stays with its budget and the occurrences created for it
+            self.fields['budget_id'].read_only = True
+    
+    def validate(self, attrs):
+        start_date = attrs.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = attrs.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError({'end_date': "End date must not be before the start date."})
+        return attrs
+    
+    def create(self, validated_data):
+        user = self.context['request'].user
+        template = schedule(RecurringTransaction(created_by=user, **validated_data))
+        template.save()
+        return template
+    
+    def update(self, instance, validated_data):
+        rescheduled = any(
+            field in validated_data and validated_data[field] != getattr(instance, field)
+            for field in self.schedule_fields
+        )
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        if rescheduled:
+            schedule(instance)
+        instance.save()
+        return instance
+
+
+class DeletionJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DeletionJob
+        fields = [
+            'id', 'target', 'target_id', 'status', 'estimated_rows', 'deleted_rows', 'progress', 'error',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+
+class BulkTransactionSerializer(serializers.ModelSerializer):
+    """One row of a bulk transaction upload.
+
+    ``budget_id`` is a plain integer here: the view checks all the budget ids
+    of the upload against the user's families in a single query.
+    """
+    budget_id = serializers.IntegerField()
+
+    class Meta:
+        model = Transaction
+        fields = ['budget_id', 'amount', 'description', 'date']
+
+
+class SavingsGoalSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    family = serializers.PrimaryKeyRelatedField(read_only=True)
     family_id = serializers.PrimaryKeyRelatedField(
         write_only=True,
         source='family',
         queryset=Family.objects.all()
     )
+    expandable_fields = {
+        'family': FamilySerializer,
+        'created_by': UserSerializer,
+    }
     
     class Meta:
         model = SavingsGoal
@@ -112,24 +217,25 @@ class SavingsGoalSerializer(serializers.ModelSerializer):
         
         if user:
             # Filter families to only those the user is a member of
-            self.fields['family_id'].queryset = Family.objects.filter(
-                memberships__user=user,
-                memberships__status='accepted'
-            )
+            self.fields['family_id'].queryset = scope_to_user(Family.objects.all(), user, 'id')
     
     def create(self, validated_data):
         user = self.context['request'].user
         return SavingsGoal.objects.create(created_by=user, **validated_data)
 
 
-class SavingsContributionSerializer(serializers.ModelSerializer):
-    created_by = UserSerializer(read_only=True)
-    savings_goal = SavingsGoalSerializer(read_only=True)
+class SavingsContributionSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    savings_goal = serializers.PrimaryKeyRelatedField(read_only=True)
     savings_goal_id = serializers.PrimaryKeyRelatedField(
         write_only=True,
         source='savings_goal',
         queryset=SavingsGoal.objects.all()
     )
+    expandable_fields = {
+        'savings_goal': SavingsGoalSerializer,
+        'created_by': UserSerializer,
+    }
     
     class Meta:
         model = SavingsContribution
@@ -145,19 +251,62 @@ class SavingsContributionSerializer(serializers.ModelSerializer):
         
         if user:
             # Filter savings goals to only those in families the user is a member of
-            families = Family.objects.filter(
-                memberships__user=user,
-                memberships__status='accepted'
-            )
-            self.fields['savings_goal_id'].queryset = SavingsGoal.objects.filter(family__in=families)
+            self.fields['savings_goal_id'].queryset = scope_to_user(SavingsGoal.objects.all(), user)
     
     def create(self, validated_data):
         user = self.context['request'].user
-        contribution = SavingsContribution.objects.create(created_by=user, **validated_data)
+        with db_transaction.atomic():
+            contribution = SavingsContribution.objects.create(created_by=user, **validated_data)
+            
+            # Update the current amount in the savings goal
+            apply_contribution_delta(contribution.savings_goal_id, contribution.amount)
         
-        # Update the current amount in the savings goal
-        savings_goal = contribution.savings_goal
-        savings_goal.current_amount += contribution.amount
-        savings_goal.save()
+        # Keep the loaded goal in step for the response
+        contribution.savings_goal.current_amount += contribution.amount
+        return contribution
+    
+    def update(self, instance, validated_data):
+        original_goal_id, original_amount = instance.savings_goal_id, instance.amount
+        with db_transaction.atomic():
+            contribution = super().update(instance, validated_data)
+            
+            # Move the amount between goals, or apply the difference
+            if contribution.savings_goal_id != original_goal_id:
+                apply_contribution_delta(original_goal_id, -original_amount)
+                apply_contribution_delta(contribution.savings_goal_id, contribution.amount)
+            elif contribution.amount != original_amount:
+                apply_contribution_delta(contribution.savings_goal_id, contribution.amount - original_amount)
         
-        return contribution 
\ No newline at end of file
+        return contribution
+
+
+class TransactionSearchResultSerializer(TransactionSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(TransactionSerializer.Meta):
+        fields = TransactionSerializer.Meta.fields + ['rank']
+
+
+class BudgetSearchResultSerializer(BudgetSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(BudgetSerializer.Meta):
+        fields = BudgetSerializer.Meta.fields + ['rank']
+
+
+class SearchParamsSerializer(serializers.Serializer):
+    """Query parameters of the family search endpoint."""
+    q = serializers.CharField()
+    type = serializers.ChoiceField(choices=['transactions', 'budgets'], default='transactions')
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    min_amount = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    max_amount = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    budget_id = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_q(self, value):
+        terms = search_terms(value)
+        if not terms:
+            raise serializers.ValidationError("Enter at least one word to search for.")
+        return terms
+
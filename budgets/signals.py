@@ -0,0 +1,149 @@
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import post_save, post_delete, post_migrate
+from django.dispatch import receiver
+from families.models import Family, FamilyMembership
+from .models import (
+    Budget, BudgetLedger, Transaction, TransactionCategory, TransactionRollup,
+    SavingsGoal, SavingsContribution, RecurringTransaction
+)
+from .ledger import apply_transaction_delta, refresh_last_date, rebuild_ledgers
+from .rollups import apply_rollup_delta, rebuild_rollups
+from .search import install_sqlite_search, sqlite_search_installed
+from .data_version import (
+    bump_data_version, bump_budget_families, bump_savings_goal_families, bump_member_families
+)
+
+TRACKED_FIELDS = ('budget_id', 'amount', 'date')
+
+
+def loaded_value(instance, field):
+    """``field`` as ``instance`` was loaded from the database (see
+    ``LoadedValuesMixin``), or its current value.
+    """
+    return (getattr(instance, '_loaded_values', None) or {}).get(field, getattr(instance, field))
+
+
+@receiver(post_migrate)
+def repair_sqlite_search(sender, using, **kwargs):
+    # SQLite table rebuilds during migrations drop the search triggers
+    connection = connections[using]
+    if sender.name == 'budgets' and connection.vendor == 'sqlite' and sqlite_search_installed(connection):
+        install_sqlite_search(connection)
+
+
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+@receiver(post_save, sender=SavingsGoal)
+@receiver(post_delete, sender=SavingsGoal)
+@receiver(post_save, sender=TransactionCategory)
+@receiver(post_delete, sender=TransactionCategory)
+@receiver(post_save, sender=FamilyMembership)
+@receiver(post_delete, sender=FamilyMembership)
+def bump_family_version(sender, instance, **kwargs):
+    # Budgets and savings goals can be moved to another family
+    bump_data_version(loaded_value(instance, 'family_id'), instance.family_id)
+
+
+@receiver(post_save, sender=Family)
+@receiver(post_delete, sender=Family)
+def bump_own_version(sender, instance, **kwargs):
+    bump_data_version(instance.id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def bump_member_versions(sender, instance, created, **kwargs):
+    # Members are rendered in family member lists and expanded relations
+    if not created:
+        bump_member_families(instance)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def bump_transaction_family_version(sender, instance, **kwargs):
+    original_budget_id = loaded_value(instance, 'budget_id')
+    if original_budget_id == instance.budget_id and Transaction.budget.is_cached(instance):
+        bump_data_version(instance.budget.family_id)
+    else:
+        # A budget removed by the same cascade is not found; its own signal bumps the family
+        bump_budget_families({original_budget_id, instance.budget_id})
+
+
+@receiver(post_save, sender=RecurringTransaction)
+@receiver(post_delete, sender=RecurringTransaction)
+def bump_recurring_family_version(sender, instance, **kwargs):
+    bump_budget_families([instance.budget_id])
+
+
+@receiver(post_save, sender=SavingsContribution)
+@receiver(post_delete, sender=SavingsContribution)
+def bump_contribution_family_version(sender, instance, **kwargs):
+    original_goal_id = loaded_value(instance, 'savings_goal_id')
+    if original_goal_id == instance.savings_goal_id and SavingsContribution.savings_goal.is_cached(instance):
+        bump_data_version(instance.savings_goal.family_id)
+    else:
+        # Moved to a goal that may belong to another family
+        bump_savings_goal_families({original_goal_id, instance.savings_goal_id})
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollups_on_save(sender, instance, created, **kwargs):
+    original = getattr(instance, '_loaded_values', None) or {}
+
+    if created:
+        apply_rollup_delta(instance.budget_id, instance.date, instance.amount, 1)
+    elif not all(field in original for field in TRACKED_FIELDS):
+        rebuild_rollups(budget_ids=[instance.budget_id])
+    elif (original['budget_id'], original['date']) != (instance.budget_id, instance.date):
+        # Moved to another budget or period
+        apply_rollup_delta(original['budget_id'], original['date'], -original['amount'], -1)
+        apply_rollup_delta(instance.budget_id, instance.date, instance.amount, 1)
+    elif original['amount'] != instance.amount:
+        apply_rollup_delta(instance.budget_id, instance.date, instance.amount - original['amount'], 0)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    apply_rollup_delta(instance.budget_id, instance.date, -instance.amount, -1)
+
+
+@receiver(post_save, sender=Budget)
+def sync_rollup_budget(sender, instance, created, **kwargs):
+    # Rollups copy the budget's family and type for grouping without joins
+    if not created:
+        TransactionRollup.objects.filter(budget_id=instance.id).exclude(
+            family_id=instance.family_id,
+            budget_type=instance.budget_type
+        ).update(family_id=instance.family_id, budget_type=instance.budget_type)
+
+
+@receiver(post_save, sender=Budget)
+def create_budget_ledger(sender, instance, created, **kwargs):
+    if created:
+        BudgetLedger.objects.get_or_create(budget=instance)
+
+
+@receiver(post_save, sender=Transaction)
+def update_ledger_on_save(sender, instance, created, **kwargs):
+    original = getattr(instance, '_loaded_values', None) or {}
+
+    if created:
+        apply_transaction_delta(instance.budget_id, instance.amount, 1, instance.date)
+    elif not all(field in original for field in TRACKED_FIELDS):
+        # Saved without the stored values at hand (e.g. deferred fields): recount
+        rebuild_ledgers([instance.budget_id])
+    elif original['budget_id'] != instance.budget_id:
+        # Transaction moved to another budget
+        apply_transaction_delta(original['budget_id'], -original['amount'], -1)
+        refresh_last_date(original['budget_id'])
+        apply_transaction_delta(instance.budget_id, instance.amount, 1, instance.date)
+    else:
+        apply_transaction_delta(instance.budget_id, instance.amount - original['amount'], 0, instance.date)
+        if instance.date < original['date']:
+            refresh_last_date(instance.budget_id)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_ledger_on_delete(sender, instance, **kwargs):
+    apply_transaction_delta(instance.budget_id, -instance.amount, -1)
+    refresh_last_date(instance.budget_id)
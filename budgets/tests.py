@@ -1,3 +1,1626 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import math
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction as db_transaction
+from django.db.models import CASCADE, Sum
+from django.db.models.functions import TruncWeek, TruncMonth, TruncYear
+from django.db.models.signals import post_delete, post_save
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APITestCase, APIRequestFactory, force_authenticate
+from family_budget_2.async_views import gather_parts
+from family_budget_2.metrics import RequestMetrics, registry, _current
+from family_budget_2.testing import EndpointBenchmarkMixin, create_user, seed_family_data
+from families.access import get_family_roles
+from families.models import Family, FamilyMembership
+from .models import (
+    Budget, BudgetLedger, Transaction, TransactionCategory, TransactionRollup, SavingsGoal, SavingsContribution,
+    RecurringTransaction, DeletionJob
+)
+from .management.commands.check_query_plans import sequential_scans
+from .deletion import family_steps
+from .forecast import DAYS_PER_MONTH, contribution_statistics, forecast_goals
+from .ledger import verify_ledgers
+from .recurring import first_occurrence_after, materialize_due, schedule
+from .signals import loaded_value
+from . import async_views, views
 
-# Create your tests here.
+
+class BudgetEndpointPerformanceTests(EndpointBenchmarkMixin, APITestCase):
+    """Query-count budgets for every route in budgets/urls.py.
+
+    Each read endpoint is measured for a user with little data and a user with
+    a lot of it; the number of queries must be the same for both.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.small_user = create_user('small@example.com', 'Small')
+        cls.large_user = create_user('large@example.com', 'Large')
+        cls.small_family = seed_family_data(cls.small_user)[0]
+        cls.large_family = seed_family_data(
+            cls.large_user, families=3, budgets=8, transactions=25, goals=3, contributions=6, members=2
+        )[0]
+        for user, family in ((cls.small_user, cls.small_family), (cls.large_user, cls.large_family)):
+            TransactionCategory.objects.create(name='Food', category_type='expense', family=family)
+
+    def cases(self, url_for):
+        """Build ``(label, user, url)`` cases from a ``url_for(family)`` callable."""
+        return [
+            ('small', self.small_user, url_for(self.small_family)),
+            ('large', self.large_user, url_for(self.large_family)),
+        ]
+
+    def first(self, model, family, **lookup):
+        return model.objects.filter(**lookup).filter(
+            **{self.family_path[model]: family}
+        ).order_by('id').first()
+
+    family_path = {
+        Budget: 'family',
+        Transaction: 'budget__family',
+        TransactionCategory: 'family',
+        SavingsGoal: 'family',
+        SavingsContribution: 'savings_goal__family',
+    }
+
+    def test_budget_list(self):
+        self.assertFlatQueries('budget-list', 'get', self.cases(lambda family: '/api/budgets/'), 2)
+
+    def test_budget_list_by_family(self):
+        self.assertFlatQueries(
+            'budget-list-by-family', 'get', self.cases(lambda family: f'/api/budgets/?family={family.id}'), 2
+        )
+
+    def test_budget_detail(self):
+        self.assertFlatQueries(
+            'budget-detail', 'get',
+            # The budget, plus its spend per period
+            self.cases(lambda family: f'/api/budgets/{self.first(Budget, family).id}/'), 3
+        )
+
+    def test_budget_summary(self):
+        self.assertFlatQueries(
+            'budget-summary', 'get',
+            self.cases(lambda family: f'/api/budgets/{self.first(Budget, family).id}/summary/'), 3
+        )
+
+    def test_transaction_list(self):
+        self.assertFlatQueries(
+            'transaction-list', 'get', self.cases(lambda family: '/api/budgets/transactions/'), 2
+        )
+
+    def test_transaction_list_by_budget(self):
+        self.assertFlatQueries(
+            'transaction-list-by-budget', 'get',
+            self.cases(lambda family: f'/api/budgets/transactions/?budget_id={self.first(Budget, family).id}'), 2
+        )
+
+    def test_transaction_detail(self):
+        self.assertFlatQueries(
+            'transaction-detail', 'get',
+            self.cases(lambda family: f'/api/budgets/transactions/{self.first(Transaction, family).id}/'), 2
+        )
+
+    def test_family_transaction_history(self):
+        self.assertFlatQueries(
+            'family-transaction-history', 'get',
+            self.cases(lambda family: f'/api/budgets/families/{family.id}/transactions/'), 2
+        )
+
+    def test_category_list(self):
+        self.assertFlatQueries('category-list', 'get', self.cases(lambda family: '/api/budgets/categories/'), 2)
+
+    def test_category_detail(self):
+        self.assertFlatQueries(
+            'category-detail', 'get',
+            self.cases(lambda family: f'/api/budgets/categories/{self.first(TransactionCategory, family).id}/'), 2
+        )
+
+    def test_savings_goal_list(self):
+        self.assertFlatQueries(
+            'savings-goal-list', 'get', self.cases(lambda family: '/api/budgets/savings-goals/'), 2
+        )
+
+    def test_savings_goal_detail(self):
+        self.assertFlatQueries(
+            'savings-goal-detail', 'get',
+            self.cases(lambda family: f'/api/budgets/savings-goals/{self.first(SavingsGoal, family).id}/'), 2
+        )
+
+    def test_contribution_list(self):
+        self.assertFlatQueries(
+            'contribution-list', 'get', self.cases(lambda family: '/api/budgets/savings-contributions/'), 2
+        )
+
+    def test_contribution_detail(self):
+        self.assertFlatQueries(
+            'contribution-detail', 'get',
+            self.cases(
+                lambda family: f'/api/budgets/savings-contributions/{self.first(SavingsContribution, family).id}/'
+            ), 2
+        )
+
+    def test_family_budget_analytics(self):
+        self.assertFlatQueries(
+            'family-budget-analytics', 'get',
+            self.cases(lambda family: f'/api/budgets/families/{family.id}/analytics/budget/'), 3
+        )
+
+    def test_transaction_analytics(self):
+        self.assertFlatQueries(
+            'transaction-analytics', 'get',
+            self.cases(lambda family: f'/api/budgets/families/{family.id}/analytics/transactions/?period=week'), 2
+        )
+
+    def test_budget_comparison(self):
+        self.assertFlatQueries(
+            'budget-comparison', 'get',
+            self.cases(lambda family: f'/api/budgets/families/{family.id}/analytics/comparison/'), 2
+        )
+
+    def test_savings_forecast(self):
+        self.assertFlatQueries(
+            'savings-forecast', 'get',
+            # The user, the goals and one columnar fetch of all their contributions
+            self.cases(lambda family: f'/api/budgets/families/{family.id}/analytics/savings-forecast/'), 3
+        )
+
+    def test_dashboard(self):
+        self.assertFlatQueries(
+            'dashboard', 'get', self.cases(lambda family: f'/api/budgets/dashboard/?family={family.id}'), 5
+        )
+
+    def test_budget_write_endpoints(self):
+        self.authenticate(self.large_user)
+        response = self.assertMaxQueries('budget-create', 'post', '/api/budgets/', 7, data={
+            'family_id': self.large_family.id, 'name': 'Groceries', 'amount': '300.00',
+            'budget_type': 'expense', 'period': 'monthly',
+            'start_date': '2024-01-01', 'end_date': '2024-12-31',
+        }, expected_status=201)
+        budget_id = response.data['id']
+        # Includes syncing the budget type copied into the rollups
+        self.assertMaxQueries('budget-update', 'patch', f'/api/budgets/{budget_id}/', 4,
+                              data={'amount': '350.00'})
+        # One DELETE per table of the budget's tree, however many rows it has (budgets.deletion)
+        self.assertMaxQueries('budget-delete', 'delete', f'/api/budgets/{budget_id}/', 10,
+                              expected_status=204)
+
+    def test_transaction_write_endpoints(self):
+        self.authenticate(self.large_user)
+        budget = self.first(Budget, self.large_family)
+        response = self.assertMaxQueries('transaction-create', 'post', '/api/budgets/transactions/', 5, data={
+            'budget_id': budget.id, 'amount': '42.00', 'description': 'Dentist', 'date': str(date(2024, 1, 2)),
+        }, expected_status=201)
+        # The first transaction of a week / month / year also creates its rollup rows
+        self.assertMaxQueries('transaction-create-new-period', 'post', '/api/budgets/transactions/', 10, data={
+            'budget_id': budget.id, 'amount': '12.00', 'description': 'Pharmacy', 'date': str(date(2025, 5, 1)),
+        }, expected_status=201)
+        transaction_id = response.data['id']
+        # Includes looking up the budget's family to bump its data version
+        self.assertMaxQueries('transaction-update', 'patch', f'/api/budgets/transactions/{transaction_id}/', 6,
+                              data={'amount': '40.00'})
+        self.assertMaxQueries('transaction-delete', 'delete', f'/api/budgets/transactions/{transaction_id}/', 8,
+                              expected_status=204)
+
+    def test_category_write_endpoints(self):
+        self.authenticate(self.large_user)
+        response = self.assertMaxQueries('category-create', 'post', '/api/budgets/categories/', 4, data={
+            'name': 'Rent', 'category_type': 'expense', 'family': self.large_family.id,
+        }, expected_status=201)
+        category_id = response.data['id']
+        self.assertMaxQueries('category-update', 'patch', f'/api/budgets/categories/{category_id}/', 5,
+                              data={'name': 'Housing'})
+        self.assertMaxQueries('category-delete', 'delete', f'/api/budgets/categories/{category_id}/', 3,
+                              expected_status=204)
+
+        outsider_family = seed_family_data(create_user('category.outsider@example.com', 'Outsider'))[0]
+        response = self.client.post('/api/budgets/categories/', {
+            'name': 'Rent', 'category_type': 'expense', 'family': outsider_family.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('family', response.data)
+
+    def test_savings_write_endpoints(self):
+        self.authenticate(self.large_user)
+        response = self.assertMaxQueries('savings-goal-create', 'post', '/api/budgets/savings-goals/', 3, data={
+            'family_id': self.large_family.id, 'name': 'Vacation', 'target_amount': '2000.00',
+            'target_date': '2025-06-01',
+        }, expected_status=201)
+        goal_id = response.data['id']
+        self.assertMaxQueries('savings-goal-update', 'patch', f'/api/budgets/savings-goals/{goal_id}/', 3,
+                              data={'target_amount': '2500.00'})
+        # Includes BEGIN / COMMIT of the atomic balance update, which SQLite logs as queries
+        response = self.assertMaxQueries(
+            'contribution-create', 'post', '/api/budgets/savings-contributions/', 6, data={
+                'savings_goal_id': goal_id, 'amount': '100.00', 'date': '2024-06-01',
+            }, expected_status=201
+        )
+        # Includes BEGIN / COMMIT and the goal's family lookup for the data version
+        self.assertMaxQueries('contribution-delete', 'delete',
+                              f"/api/budgets/savings-contributions/{response.data['id']}/", 7,
+                              expected_status=204)
+        self.assertMaxQueries('savings-goal-delete', 'delete', f'/api/budgets/savings-goals/{goal_id}/', 4,
+                              expected_status=204)
+
+    def test_other_families_are_not_visible(self):
+        self.authenticate(self.small_user)
+        response = self.client.get(f'/api/budgets/families/{self.large_family.id}/analytics/budget/')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/api/budgets/transactions/')
+        self.assertEqual(
+            {row['id'] for row in response.data['results']},
+            set(Transaction.objects.filter(budget__family=self.small_family).values_list('id', flat=True))
+        )
+
+
+class TransactionPaginationTests(EndpointBenchmarkMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('pager@example.com', 'Pager')
+        cls.family = seed_family_data(cls.user, budgets=3, transactions=40)[0]
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_pages_cover_history_in_order_without_duplicates(self):
+        ids = self.walk(f'/api/budgets/families/{self.family.id}/transactions/?page_size=7')
+        expected = list(
+            Transaction.objects.filter(budget__family=self.family)
+            .order_by('-date', '-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_budget_filter_is_kept_across_pages(self):
+        budget = Budget.objects.filter(family=self.family).first()
+        ids = self.walk(f'/api/budgets/transactions/?budget_id={budget.id}&page_size=9')
+        self.assertEqual(sorted(ids), sorted(budget.transactions.values_list('id', flat=True)))
+
+    def test_deep_page_costs_the_same_as_first_page(self):
+        url = f'/api/budgets/families/{self.family.id}/transactions/?page_size=5'
+        first, first_queries = self.measure('family-transaction-history-page-1', 'get', url)
+        cursor_url = first.data['next']
+        for _ in range(10):
+            cursor_url = self.client.get(cursor_url).data['next']
+        _, deep_queries = self.measure('family-transaction-history-page-12', 'get', cursor_url)
+        self.assertEqual(first_queries, deep_queries)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/budgets/transactions/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class SparseFieldsetTests(EndpointBenchmarkMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('sparse@example.com', 'Sparse')
+        cls.family = seed_family_data(cls.user, budgets=2, transactions=5)[0]
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def test_relations_are_flat_ids_by_default(self):
+        row = self.client.get('/api/budgets/transactions/').data['results'][0]
+        transaction = Transaction.objects.get(id=row['id'])
+        self.assertEqual(row['budget'], transaction.budget_id)
+        self.assertEqual(row['created_by'], self.user.id)
+
+    def test_nested_expansion(self):
+        url = '/api/budgets/transactions/?expand=budget,budget.family,budget.family.created_by,created_by'
+        response = self.assertMaxQueries('transaction-list-expanded', 'get', url, 2)
+        row = response.data['results'][0]
+        self.assertEqual(row['budget']['family']['id'], self.family.id)
+        self.assertEqual(row['budget']['family']['created_by']['email'], self.user.email)
+        self.assertEqual(row['budget']['created_by'], self.user.id)
+        self.assertEqual(row['created_by']['email'], self.user.email)
+
+    def test_sparse_fields(self):
+        response = self.client.get('/api/budgets/transactions/?fields=id,amount,date')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'amount', 'date'})
+
+    def test_fields_and_expand_on_detail_and_summary(self):
+        budget = Budget.objects.filter(family=self.family).first()
+        response = self.client.get(f'/api/budgets/{budget.id}/?fields=id,name,family&expand=family')
+        self.assertEqual(set(response.data), {'id', 'name', 'family', 'spent_amount'})
+        self.assertEqual(response.data['family']['name'], self.family.name)
+        response = self.client.get(f'/api/budgets/{budget.id}/summary/?expand=created_by')
+        self.assertEqual(response.data['budget']['created_by']['id'], self.user.id)
+
+
+class BulkTransactionTests(EndpointBenchmarkMixin, APITestCase):
+    url = '/api/budgets/transactions/bulk/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('bulk@example.com', 'Bulk')
+        cls.family = seed_family_data(cls.user, budgets=2, transactions=0)[0]
+        cls.budgets = list(Budget.objects.filter(family=cls.family).order_by('id'))
+        cls.other_budget = Budget.objects.filter(
+            family=seed_family_data(create_user('other.bulk@example.com', 'Other'))[0]
+        ).first()
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def rows(self, count):
+        return [
+            {
+                'budget_id': self.budgets[index % 2].id,
+                'amount': f'{index + 1}.00',
+                'description': f'Receipt {index}',
+                'date': date(2024, 3, 1 + index % 28).isoformat(),
+            }
+            for index in range(count)
+        ]
+
+    def test_query_count_does_not_grow_with_rows(self):
+        _, small_queries = self.measure('transaction-bulk-create[10]', 'post', self.url, self.rows(10),
+                                        expected_status=201)
+        response, large_queries = self.measure('transaction-bulk-create[1200]', 'post', self.url, self.rows(1200),
+                                               expected_status=201)
+        self.assertEqual(len(response.data['created']), 1200)
+        # Only the number of INSERT batches depends on the row count
+        fields = [field for field in Transaction._meta.concrete_fields if not field.primary_key]
+        batch_size = min(settings.TRANSACTION_BULK_BATCH_SIZE, connection.ops.bulk_batch_size(fields, [None] * 1200))
+        self.assertLessEqual(large_queries - small_queries, math.ceil(1200 / batch_size) - 1)
+
+        ledger = self.budgets[0].ledger
+        ledger.refresh_from_db()
+        transactions = Transaction.objects.filter(budget=self.budgets[0])
+        self.assertEqual(ledger.transaction_count, transactions.count())
+        self.assertEqual(ledger.spent_amount, sum(t.amount for t in transactions))
+        self.assertEqual(ledger.last_transaction_date, max(t.date for t in transactions))
+
+    def test_budget_without_a_ledger_row_is_rebuilt(self):
+        budget = self.budgets[0]
+        Transaction.objects.create(budget=budget, amount=Decimal('40.00'), description='Earlier',
+                                   date=date(2024, 2, 1), created_by=self.user)
+        BudgetLedger.objects.filter(budget=budget).delete()
+
+        response = self.client.post(self.url, self.rows(4), format='json')
+        self.assertEqual(response.status_code, 201)
+        ledger = BudgetLedger.objects.get(budget=budget)
+        self.assertEqual((ledger.spent_amount, ledger.transaction_count), (Decimal('44.00'), 3))
+        self.assertEqual(list(verify_ledgers([budget.id, self.budgets[1].id])), [])
+
+    def test_invalid_rows_are_reported_and_the_rest_created(self):
+        rows = self.rows(3)
+        rows[1]['amount'] = 'lots'
+        rows[2]['budget_id'] = self.other_budget.id
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row['index'] for row in response.data['created']], [0])
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertIn('amount', response.data['errors'][0]['errors'])
+        self.assertIn('budget_id', response.data['errors'][1]['errors'])
+        self.assertEqual(Transaction.objects.filter(budget__family=self.family).count(), 1)
+
+    def test_atomic_upload_creates_nothing_on_error(self):
+        rows = self.rows(3)
+        del rows[2]['date']
+        response = self.client.post(f'{self.url}?atomic=true', rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['index'], 2)
+        self.assertFalse(Transaction.objects.filter(budget__family=self.family).exists())
+
+    def test_body_must_be_a_list(self):
+        response = self.client.post(self.url, {'budget_id': self.budgets[0].id}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class TransactionExportTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('export@example.com', 'Export')
+        cls.family = seed_family_data(cls.user, budgets=3, transactions=30)[0]
+        cls.url = f'/api/budgets/families/{cls.family.id}/transactions/export/'
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_authenticate(self.user)
+        # Counted from a warm access cache, as for a signed-in user
+        get_family_roles(self.user)
+
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        with CaptureQueriesContext(connection) as queries:
+            content = self.read(self.client.get(self.url))
+        # One chunked read of the transactions: the user comes from the access token
+        self.assertEqual(len(queries), 1)
+        rows = list(csv.DictReader(io.StringIO(content)))
+        expected = Transaction.objects.filter(budget__family=self.family).order_by('date', 'created_at', 'id')
+        self.assertEqual([int(row['id']) for row in rows], list(expected.values_list('id', flat=True)))
+        self.assertEqual(rows[0]['created_by'], self.user.email)
+
+    def test_ndjson_export_with_filters(self):
+        budget = Budget.objects.filter(family=self.family).order_by('id').first()
+        response = self.client.get(
+            f'{self.url}?output=ndjson&budget_id={budget.id}&start_date=2024-01-05&end_date=2024-01-20'
+        )
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertTrue(rows)
+        expected = budget.transactions.filter(date__range=(date(2024, 1, 5), date(2024, 1, 20)))
+        self.assertEqual({row['id'] for row in rows}, set(expected.values_list('id', flat=True)))
+        self.assertTrue(all(row['budget_id'] == budget.id for row in rows))
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(f'{self.url}?output=xml').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.url}?start_date=yesterday').status_code, 400)
+
+    def test_other_families_cannot_export(self):
+        self.client.force_authenticate(create_user('outsider@example.com', 'Outsider'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class AnalyticsCacheTests(EndpointBenchmarkMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('cached.analytics@example.com', 'Cached')
+        cls.family = seed_family_data(cls.user, budgets=3, transactions=10)[0]
+        cls.url = f'/api/budgets/families/{cls.family.id}/analytics/budget/'
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def test_repeat_requests_run_no_aggregates(self):
+        cold = self.client.get(self.url)
+        # Only the authentication query is left
+        warm = self.assertMaxQueries('family-budget-analytics[cached]', 'get', self.url, 1)
+        self.assertEqual(warm.data, cold.data)
+
+    def test_query_parameters_are_part_of_the_key(self):
+        url = f'/api/budgets/families/{self.family.id}/analytics/transactions/'
+        weeks = self.client.get(f'{url}?period=week').data
+        years = self.client.get(f'{url}?period=year').data
+        self.assertNotEqual(weeks['spending_trends'], years['spending_trends'])
+
+    def test_writes_invalidate_the_cached_result(self):
+        budget = Budget.objects.filter(family=self.family, budget_type='expense').first()
+        before = self.client.get(self.url).data['budget_utilization']['expense']['transaction_amount']
+
+        transaction = Transaction.objects.create(
+            budget=budget, amount='150.00', date=date(2024, 2, 1), created_by=self.user
+        )
+        after_create = self.client.get(self.url).data['budget_utilization']['expense']['transaction_amount']
+        self.assertEqual(after_create, before + 150)
+
+        Transaction.objects.filter(id=transaction.id).first().delete()
+        after_delete = self.client.get(self.url).data['budget_utilization']['expense']['transaction_amount']
+        self.assertEqual(after_delete, before)
+
+        goal = SavingsGoal.objects.filter(family=self.family).first()
+        goal.current_amount += 10
+        goal.save()
+        progress = self.client.get(self.url).data['savings_progress']
+        self.assertEqual(next(row for row in progress if row['goal_id'] == goal.id)['current_amount'],
+                         goal.current_amount)
+
+    def test_moves_between_families_invalidate_both(self):
+        other = seed_family_data(self.user, budgets=1, transactions=0, contributions=0)[0]
+        # A token listing the new family
+        self.authenticate(self.user)
+
+        def income_budget(family):
+            return self.client.get(f'/api/budgets/families/{family.id}/analytics/comparison/').data['income']['budget']
+
+        def progress(family):
+            return {
+                row['goal_id']: row['current_amount']
+                for row in self.client.get(f'/api/budgets/families/{family.id}/analytics/budget/').data['savings_progress']
+            }
+
+        self.assertEqual((income_budget(self.family), income_budget(other)), (1000, 1000))
+        budget = Budget.objects.get(family=self.family, budget_type='income')
+        response = self.client.patch(f'/api/budgets/{budget.id}/', {'family_id': other.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((income_budget(self.family), income_budget(other)), (0, 2000))
+
+        goal = SavingsGoal.objects.get(family=self.family)
+        other_goal = SavingsGoal.objects.get(family=other)
+        self.assertEqual((progress(self.family), progress(other)), ({goal.id: 50}, {other_goal.id: 0}))
+        contribution = SavingsContribution.objects.filter(savings_goal=goal).first()
+        response = self.client.patch(
+            f'/api/budgets/savings-contributions/{contribution.id}/', {'savings_goal_id': other_goal.id}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((progress(self.family), progress(other)), ({goal.id: 25}, {other_goal.id: 25}))
+
+        response = self.client.patch(f'/api/budgets/savings-goals/{goal.id}/', {'family_id': other.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((progress(self.family), progress(other)), ({}, {goal.id: 25, other_goal.id: 25}))
+
+
+class TransactionRollupTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('rollups@example.com', 'Rollups')
+        cls.family = seed_family_data(cls.user, budgets=3, transactions=400)[0]
+        cls.url = f'/api/budgets/families/{cls.family.id}/analytics/transactions/'
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def raw_trends(self, period, start=None, end=None):
+        """The time series as grouped from the raw transactions."""
+        transactions = Transaction.objects.filter(budget__family=self.family)
+        if start:
+            transactions = transactions.filter(date__gte=start)
+        if end:
+            transactions = transactions.filter(date__lte=end)
+        trunc = {'week': TruncWeek, 'month': TruncMonth, 'year': TruncYear}[period]
+        return [
+            {'period': row['period'], 'budget_type': row['budget__budget_type'], 'amount': row['total']}
+            for row in transactions.annotate(period=trunc('date')).values(
+                'period', 'budget__budget_type'
+            ).annotate(total=Sum('amount')).order_by('period', 'budget__budget_type')
+        ]
+
+    def trends(self, query):
+        response = self.client.get(f'{self.url}?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['spending_trends']
+
+    def test_rollups_match_raw_grouping(self):
+        for period in ('week', 'month', 'year'):
+            self.assertEqual(self.trends(f'period={period}'), self.raw_trends(period))
+            # Ranges starting and ending inside periods use the raw rows at the edges
+            for start, end in ((date(2024, 1, 10), date(2024, 11, 17)), (date(2024, 3, 5), date(2024, 3, 6))):
+                self.assertEqual(
+                    self.trends(f'period={period}&start_date={start}&end_date={end}'),
+                    self.raw_trends(period, start, end)
+                )
+
+    def test_rollups_follow_transaction_writes(self):
+        budget = Budget.objects.filter(family=self.family).order_by('id').first()
+        other_budget = Budget.objects.filter(family=self.family).order_by('id').last()
+        transaction = Transaction.objects.create(
+            budget=budget, amount=Decimal('99.00'), date=date(2026, 7, 15), created_by=self.user
+        )
+        self.assertEqual(self.trends('period=year'), self.raw_trends('year'))
+
+        transaction = Transaction.objects.get(id=transaction.id)
+        transaction.amount = Decimal('120.00')
+        transaction.date = date(2026, 8, 1)
+        transaction.save()
+        self.assertEqual(self.trends('period=month'), self.raw_trends('month'))
+
+        transaction = Transaction.objects.get(id=transaction.id)
+        transaction.budget = other_budget
+        transaction.save()
+        self.assertEqual(self.trends('period=month'), self.raw_trends('month'))
+
+        Transaction.objects.get(id=transaction.id).delete()
+        self.assertFalse(TransactionRollup.objects.filter(period_start__year=2026).exists())
+        self.assertEqual(self.trends('period=week'), self.raw_trends('week'))
+
+    def test_receivers_see_previous_values_in_any_order(self):
+        seen = []
+
+        def late_receiver(sender, instance, created, **kwargs):
+            seen.append(loaded_value(instance, 'amount'))
+
+        # Connected after the rollup and ledger receivers
+        post_save.connect(late_receiver, sender=Transaction)
+        self.addCleanup(post_save.disconnect, late_receiver, sender=Transaction)
+
+        budget = Budget.objects.filter(family=self.family).order_by('id').first()
+        transaction = Transaction.objects.create(
+            budget=budget, amount=Decimal('99.00'), date=date(2026, 7, 15), created_by=self.user
+        )
+        # Saved again without reloading: the values it was created with count as loaded
+        for amount in (Decimal('120.00'), Decimal('80.00')):
+            transaction.amount = amount
+            transaction.save()
+
+        self.assertEqual(seen, [Decimal('99.00'), Decimal('99.00'), Decimal('120.00')])
+        self.assertEqual(self.trends('period=month'), self.raw_trends('month'))
+        self.assertEqual(list(verify_ledgers([budget.id])), [])
+
+    def test_rebuild_command(self):
+        expected = set(TransactionRollup.objects.values_list(
+            'budget_id', 'granularity', 'period_start', 'total', 'count'
+        ))
+        TransactionRollup.objects.all().delete()
+        call_command('rebuild_rollups', self.family.id, workers=1, stdout=io.StringIO())
+        self.assertEqual(set(TransactionRollup.objects.values_list(
+            'budget_id', 'granularity', 'period_start', 'total', 'count'
+        )), expected)
+
+
+class DashboardTests(EndpointBenchmarkMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('dashboard@example.com', 'Dashboard')
+        cls.families = seed_family_data(cls.user, families=2, budgets=4, transactions=12, goals=2)
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def test_bundle_matches_the_separate_endpoints(self):
+        family = self.families[1]
+        response = self.client.get(f'/api/budgets/dashboard/?family={family.id}&transactions=5')
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+
+        self.assertEqual({row['id'] for row in data['families']}, {family.id for family in self.families})
+        self.assertEqual(data['family_id'], family.id)
+        analytics = self.client.get(f'/api/budgets/families/{family.id}/analytics/budget/').data
+        self.assertEqual(data['budget_utilization'], analytics['budget_utilization'])
+        self.assertEqual(data['savings_progress'], analytics['savings_progress'])
+        comparison = self.client.get(f'/api/budgets/families/{family.id}/analytics/comparison/').data
+        self.assertEqual(data['budget_vs_actual'], comparison)
+        history = self.client.get(f'/api/budgets/families/{family.id}/transactions/?page_size=5&expand=budget').data
+        self.assertEqual(data['recent_transactions'], history['results'])
+
+    def test_defaults_to_the_first_family(self):
+        data = self.client.get('/api/budgets/dashboard/').data
+        self.assertEqual(data['family_id'], data['families'][0]['id'])
+        self.assertEqual(len(data['recent_transactions']), 10)
+
+    def test_repeat_loads_skip_the_aggregates(self):
+        url = f'/api/budgets/dashboard/?family={self.families[0].id}'
+        self.client.get(url)
+        # Authentication and the family list
+        self.assertMaxQueries('dashboard[cached]', 'get', url, 2)
+
+    def test_other_families_are_not_visible(self):
+        self.authenticate(create_user('no.family@example.com', 'Lonely'))
+        self.assertEqual(self.client.get(f'/api/budgets/dashboard/?family={self.families[0].id}').status_code, 404)
+        data = self.client.get('/api/budgets/dashboard/').data
+        self.assertEqual(data, {'families': [], 'family_id': None})
+
+
+class SavingsBalanceTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('savings@example.com', 'Savings')
+        cls.family = seed_family_data(cls.user, goals=2, contributions=3)[0]
+        cls.goal, cls.other_goal = SavingsGoal.objects.filter(family=cls.family).order_by('id')
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def balance(self, goal):
+        return SavingsGoal.objects.values_list('current_amount', flat=True).get(id=goal.id)
+
+    def test_contribution_writes_adjust_the_balance_in_place(self):
+        start, other_start = self.balance(self.goal), self.balance(self.other_goal)
+        response = self.client.post('/api/budgets/savings-contributions/?expand=savings_goal', {
+            'savings_goal_id': self.goal.id, 'amount': '100.00', 'date': '2024-06-01',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.balance(self.goal), start + 100)
+        self.assertEqual(Decimal(response.data['savings_goal']['current_amount']), start + 100)
+
+        url = f"/api/budgets/savings-contributions/{response.data['id']}/"
+        self.client.patch(url, {'amount': '60.00'}, format='json')
+        self.assertEqual(self.balance(self.goal), start + 60)
+
+        self.client.patch(url, {'savings_goal_id': self.other_goal.id}, format='json')
+        self.assertEqual(self.balance(self.goal), start)
+        self.assertEqual(self.balance(self.other_goal), other_start + 60)
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.balance(self.other_goal), other_start)
+
+    def test_reconcile_reports_and_repairs_drift(self):
+        call_command('reconcile_savings', stdout=io.StringIO())
+        SavingsGoal.objects.filter(id=self.goal.id).update(current_amount=Decimal('1.00'))
+        SavingsContribution.objects.filter(savings_goal=self.other_goal).delete()
+
+        out = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command('reconcile_savings', stdout=out)
+        self.assertIn(f'Savings goal {self.goal.id}:', out.getvalue())
+        self.assertIn(f'Savings goal {self.other_goal.id}:', out.getvalue())
+
+        url = f'/api/budgets/families/{self.family.id}/analytics/budget/'
+        self.assertEqual(self.client.get(url).data['savings_progress'][0]['current_amount'], Decimal('1.00'))
+
+        call_command('reconcile_savings', fix=True, chunk_size=1, stdout=io.StringIO())
+        self.assertEqual(
+            self.balance(self.goal),
+            sum(self.goal.contributions.values_list('amount', flat=True))
+        )
+        self.assertEqual(self.balance(self.other_goal), 0)
+        # The cached analytics follow the repaired balances
+        progress = {row['goal_id']: row['current_amount'] for row in self.client.get(url).data['savings_progress']}
+        self.assertEqual(progress, {self.goal.id: self.balance(self.goal), self.other_goal.id: 0})
+        call_command('reconcile_savings', stdout=io.StringIO())
+
+
+class QueryPlanTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('plans@example.com', 'Plans')
+        seed_family_data(cls.user, budgets=3, transactions=10, goals=1, contributions=3)
+
+    def test_hot_queries_use_indexes(self):
+        out = io.StringIO()
+        # Without a row threshold every full table scan is reported
+        call_command('check_query_plans', min_rows=0, stdout=out)
+        self.assertIn('No sequential scans of large tables.', out.getvalue())
+
+    def test_sequential_scans_are_detected(self):
+        self.assertEqual(sequential_scans('2 0 0 SCAN budgets_transaction'), ['budgets_transaction'])
+        self.assertEqual(
+            sequential_scans('Limit\n  ->  Seq Scan on budgets_budget  (cost=0.00..1.05 rows=5 width=8)'),
+            ['budgets_budget']
+        )
+        self.assertEqual(sequential_scans(
+            '2 0 0 SCAN budgets_transaction USING COVERING INDEX transaction_budget_date_idx\n'
+            '3 0 0 SEARCH budgets_budget USING INDEX budgets_budget_family_id (family_id=?)'
+        ), [])
+        self.assertEqual(sequential_scans('6 0 0 SCAN budgets_transaction_fts VIRTUAL TABLE INDEX 0:M1'), [])
+        self.assertEqual(sequential_scans('51 47 0 SCAN budgets_transaction_fts VIRTUAL TABLE INDEX 0:=M1'), [])
+
+
+class BudgetUtilizationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('utilization@example.com', 'Utilization')
+        # Budgets running from 40 days ago, so every one has a current period
+        cls.family = seed_family_data(
+            cls.user, budgets=6, transactions=60, start=timezone.localdate() - timedelta(days=40)
+        )[0]
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_authenticate(self.user)
+        # Counted from a warm access cache, as for a signed-in user
+        get_family_roles(self.user)
+
+    def spent_between(self, budget, start, end):
+        return Transaction.objects.filter(
+            budget=budget, date__gte=start, date__lte=end
+        ).aggregate(total=Sum('amount'))['total'] or 0
+
+    def test_periods_split_the_budget_spend(self):
+        for budget in Budget.objects.filter(family=self.family).select_related('ledger'):
+            periods = self.client.get(f'/api/budgets/{budget.id}/').data['periods']
+            self.assertEqual(periods[0]['start'], budget.start_date)
+            self.assertEqual(periods[-1]['end'], budget.end_date)
+            self.assertEqual(sum(period['spent_amount'] for period in periods), budget.spent_amount)
+            for period in periods:
+                self.assertEqual(period['spent_amount'], self.spent_between(budget, period['start'], period['end']))
+
+    def test_current_period_on_list_detail_and_summary(self):
+        with self.assertNumQueries(2):
+            budgets = self.client.get(f'/api/budgets/?family={self.family.id}').data
+        today = timezone.localdate()
+        for budget_data in budgets:
+            current = budget_data['current_period']
+            self.assertTrue(current['start'] <= today <= current['end'])
+            budget = Budget.objects.get(id=budget_data['id'])
+            self.assertEqual(current['spent_amount'], self.spent_between(budget, current['start'], current['end']))
+            self.assertEqual(current['utilization_percentage'], current['spent_amount'] / budget.amount * 100)
+            self.assertEqual(self.client.get(f"/api/budgets/{budget.id}/").data['current_period'], current)
+            self.assertEqual(self.client.get(f"/api/budgets/{budget.id}/summary/").data['current_period'], current)
+
+    def test_budget_outside_its_dates_has_no_current_period(self):
+        budget = Budget.objects.filter(family=self.family).first()
+        Budget.objects.filter(id=budget.id).update(end_date=timezone.localdate() - timedelta(days=1))
+        response = self.client.get(f'/api/budgets/{budget.id}/')
+        self.assertIsNone(response.data['current_period'])
+        self.assertEqual(response.data['periods'][-1]['end'], timezone.localdate() - timedelta(days=1))
+
+
+class SavingsForecastTests(APITestCase):
+    today = date(2024, 6, 15)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('forecast@example.com', 'Forecast')
+        cls.family = seed_family_data(cls.user, goals=0)[0]
+        goal = lambda name, current, target_date: SavingsGoal.objects.create(
+            family=cls.family, name=name, target_amount=Decimal('2000.00'), current_amount=current,
+            target_date=target_date, created_by=cls.user
+        )
+        # 100 a month for the last six months (January to June)
+        cls.steady = goal('Steady', Decimal('600.00'), date(2025, 12, 31))
+        SavingsContribution.objects.bulk_create([
+            SavingsContribution(savings_goal=cls.steady, amount=Decimal('100.00'),
+                                date=date(2024, month, 10), created_by=cls.user)
+            for month in range(1, 7)
+        ])
+        # Irregular amounts, with months without contributions
+        cls.irregular = goal('Irregular', Decimal('900.00'), date(2024, 9, 30))
+        SavingsContribution.objects.bulk_create([
+            SavingsContribution(savings_goal=cls.irregular, amount=amount, date=day, created_by=cls.user)
+            for amount, day in (
+                (Decimal('300.00'), date(2023, 11, 5)), (Decimal('50.00'), date(2023, 11, 20)),
+                (Decimal('400.00'), date(2024, 2, 1)), (Decimal('150.00'), date(2024, 5, 31)),
+            )
+        ])
+        cls.idle = goal('Idle', Decimal('0.00'), date(2025, 1, 1))
+        cls.reached = goal('Reached', Decimal('2000.00'), date(2023, 1, 1))
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def forecasts(self):
+        goals = SavingsGoal.objects.filter(family=self.family)
+        return {item['goal_id']: item for item in forecast_goals(goals, today=self.today, seed=1)}
+
+    def test_statistics_match_the_monthly_totals(self):
+        goal_ids = sorted([self.steady.id, self.irregular.id, self.idle.id])
+        rates, deviations = contribution_statistics(goal_ids, self.today)
+        # November 2023 to June 2024: eight months, five of them empty
+        monthly = [350, 0, 0, 400, 0, 0, 150, 0]
+        mean = sum(monthly) / len(monthly)
+        expected = {
+            self.steady.id: (100, 0),
+            self.irregular.id: (mean, math.sqrt(sum((value - mean) ** 2 for value in monthly) / len(monthly))),
+            self.idle.id: (0, 0),
+        }
+        for index, goal_id in enumerate(goal_ids):
+            self.assertAlmostEqual(rates[index], expected[goal_id][0])
+            self.assertAlmostEqual(deviations[index], expected[goal_id][1])
+
+    def test_forecasts(self):
+        forecasts = self.forecasts()
+
+        steady = forecasts[self.steady.id]
+        # 1400 missing at 100 a month
+        self.assertEqual(steady['monthly_rate'], Decimal('100'))
+        self.assertEqual(steady['projected_completion_date'], self.today + timedelta(days=427))
+        self.assertTrue(steady['on_track'])
+        self.assertEqual(steady['probability_by_target_date'], 1.0)
+
+        irregular = forecasts[self.irregular.id]
+        self.assertFalse(irregular['on_track'])
+        self.assertLess(irregular['probability_by_target_date'], 0.05)
+
+        self.assertIsNone(forecasts[self.idle.id]['projected_completion_date'])
+        self.assertEqual(forecasts[self.idle.id]['probability_by_target_date'], 0.0)
+        self.assertEqual(forecasts[self.reached.id]['projected_completion_date'], self.today)
+        self.assertEqual(forecasts[self.reached.id]['probability_by_target_date'], 1.0)
+
+    def test_goals_without_a_target_date_or_in_reach(self):
+        open_ended = SavingsGoal.objects.create(
+            family=self.family, name='Open-ended', target_amount=Decimal('2000.00'),
+            current_amount=Decimal('600.00'), target_date=None, created_by=self.user
+        )
+        SavingsContribution.objects.create(
+            savings_goal=open_ended, amount=Decimal('100.00'), date=date(2024, 6, 1), created_by=self.user
+        )
+        # A tiny rate against a huge remainder: completion far beyond any date
+        distant = SavingsGoal.objects.create(
+            family=self.family, name='Distant', target_amount=Decimal('9999999999.00'),
+            current_amount=Decimal('0.00'), target_date=date(2030, 1, 1), created_by=self.user
+        )
+        SavingsContribution.objects.create(
+            savings_goal=distant, amount=Decimal('0.01'), date=date(2024, 6, 1), created_by=self.user
+        )
+        forecasts = self.forecasts()
+
+        self.assertEqual(forecasts[open_ended.id]['projected_completion_date'], self.today + timedelta(days=427))
+        self.assertIsNone(forecasts[open_ended.id]['on_track'])
+        self.assertIsNone(forecasts[open_ended.id]['probability_by_target_date'])
+        self.assertIsNone(forecasts[distant.id]['projected_completion_date'])
+        self.assertFalse(forecasts[distant.id]['on_track'])
+        self.assertEqual(forecasts[distant.id]['probability_by_target_date'], 0.0)
+
+        response = self.client.get(f'/api/budgets/families/{self.family.id}/analytics/savings-forecast/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_probability_follows_the_variance(self):
+        # Exactly the missing amount is expected by the target date: the outcome is a coin flip
+        expected = 112.5 * (self.irregular.target_date - self.today).days / DAYS_PER_MONTH
+        SavingsGoal.objects.filter(id=self.irregular.id).update(
+            target_amount=self.irregular.current_amount + Decimal(str(round(expected, 2)))
+        )
+        probability = self.forecasts()[self.irregular.id]['probability_by_target_date']
+        self.assertGreater(probability, 0.4)
+        self.assertLess(probability, 0.6)
+
+    def test_endpoint(self):
+        url = f'/api/budgets/families/{self.family.id}/analytics/savings-forecast/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['goal_id'] for item in response.data['savings_forecast']],
+            sorted([self.steady.id, self.irregular.id, self.idle.id, self.reached.id])
+        )
+        # Seeded per family and day
+        self.assertEqual(self.client.get(url).data, response.data)
+
+        self.client.force_authenticate(create_user('stranger.forecast@example.com', 'Stranger'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ConditionalGetTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('etag@example.com', 'ETag')
+        cls.family = seed_family_data(cls.user, budgets=2, transactions=5)[0]
+        cls.budget = Budget.objects.filter(family=cls.family).first()
+        cls.other_user = create_user('other.etag@example.com', 'Other')
+        cls.other_budget = Budget.objects.filter(family=seed_family_data(cls.other_user)[0]).first()
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_matching_requests_are_not_modified(self):
+        for url in (
+            '/api/budgets/', f'/api/budgets/{self.budget.id}/', f'/api/budgets/{self.budget.id}/summary/',
+            '/api/budgets/transactions/', f'/api/budgets/families/{self.family.id}/transactions/',
+            '/api/budgets/savings-goals/', '/api/budgets/savings-contributions/', '/api/budgets/categories/',
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('no-cache', response['Cache-Control'])
+            etag = response['ETag']
+            # The user comes from the access token: nothing is loaded before answering
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response['ETag'], etag)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}').status_code, 304)
+
+    def test_etag_depends_on_the_url(self):
+        etag = self.client.get('/api/budgets/')['ETag']
+        self.assertNotEqual(self.client.get('/api/budgets/?fields=id')['ETag'], etag)
+        self.assertEqual(self.client.get('/api/budgets/?fields=id', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_writes_change_the_etag(self):
+        url = f'/api/budgets/{self.budget.id}/'
+        etag = self.client.get(url)['ETag']
+
+        # Writes to another family do not
+        Transaction.objects.create(
+            budget=self.other_budget, amount=Decimal('5.00'), date=date(2024, 3, 1), created_by=self.other_user
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.post('/api/budgets/transactions/', {
+            'budget_id': self.budget.id, 'amount': '5.00', 'date': '2024-03-01'
+        }, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etags_are_per_user(self):
+        url = '/api/budgets/'
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(self.other_user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class FamilySearchTests(EndpointBenchmarkMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('search@example.com', 'Search')
+        cls.family = seed_family_data(cls.user, budgets=2, transactions=5)[0]
+        cls.budget, cls.other_budget = Budget.objects.filter(family=cls.family).order_by('id')
+        cls.url = f'/api/budgets/families/{cls.family.id}/search/'
+        cls.dentist = Transaction.objects.create(
+            budget=cls.budget, amount=Decimal('120.00'), date=date(2024, 2, 10),
+            description='Dentist payment', created_by=cls.user
+        )
+        cls.checkup = Transaction.objects.create(
+            budget=cls.other_budget, amount=Decimal('40.00'), date=date(2024, 5, 3),
+            description='Dentist checkup, dentist visit', created_by=cls.user
+        )
+        cls.russian = Transaction.objects.create(
+            budget=cls.budget, amount=Decimal('75.00'), date=date(2024, 3, 1),
+            description='Оплата стоматолога', created_by=cls.user
+        )
+        cls.outsider = create_user('outsider.search@example.com', 'Outsider')
+        outsider_budget = Budget.objects.filter(family=seed_family_data(cls.outsider)[0]).first()
+        Transaction.objects.create(
+            budget=outsider_budget, amount=Decimal('99.00'), date=date(2024, 2, 10),
+            description='Dentist payment', created_by=cls.outsider
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data['results']]
+
+    def test_every_word_matches_as_a_prefix(self):
+        self.assertEqual(self.search(q='dent pay'), [self.dentist.id])
+        self.assertEqual(self.search(q='СТОМАТ'), [self.russian.id])
+        self.assertEqual(self.search(q='plumber'), [])
+
+    def test_best_match_first(self):
+        response = self.client.get(self.url, {'q': 'dentist'})
+        ranks = [row['rank'] for row in response.data['results']]
+        self.assertEqual([row['id'] for row in response.data['results']], [self.checkup.id, self.dentist.id])
+        self.assertGreater(ranks[0], ranks[1])
+
+    def test_filters(self):
+        self.assertEqual(self.search(q='dentist', start_date='2024-03-01'), [self.checkup.id])
+        self.assertEqual(self.search(q='dentist', end_date='2024-03-01'), [self.dentist.id])
+        self.assertEqual(self.search(q='dentist', min_amount='100'), [self.dentist.id])
+        self.assertEqual(self.search(q='dentist', max_amount='100'), [self.checkup.id])
+        self.assertEqual(self.search(q='dentist', budget_id=self.budget.id), [self.dentist.id])
+
+    def test_budgets(self):
+        ids = self.search(q='seeded budget', type='budgets')
+        self.assertEqual(sorted(ids), [self.budget.id, self.other_budget.id])
+        self.assertEqual(self.search(q='budget 1', type='budgets'), [self.other_budget.id])
+
+    def test_index_follows_writes(self):
+        self.dentist.description = 'Orthodontist payment'
+        self.dentist.save()
+        self.assertEqual(self.search(q='ortho'), [self.dentist.id])
+        self.assertEqual(self.search(q='dent pay'), [])
+
+        self.checkup.delete()
+        self.assertEqual(self.search(q='dentist'), [])
+
+        created = Transaction.objects.bulk_create([
+            Transaction(budget=self.budget, amount=Decimal('1.00'), date=date(2024, 6, 1),
+                        description=f'Parking {index}', created_by=self.user)
+            for index in range(3)
+        ])
+        self.assertEqual(sorted(self.search(q='parking')), sorted(transaction.id for transaction in created))
+
+    def test_pages_cover_matches_without_duplicates(self):
+        ids = []
+        url = f'{self.url}?q=payment&page_size=2'
+        while url:
+            response = self.client.get(url)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        expected = Transaction.objects.filter(
+            budget__family=self.family, description__icontains='payment'
+        ).values_list('id', flat=True)
+        self.assertEqual(sorted(ids), sorted(expected))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_query_count_does_not_grow_with_history(self):
+        busy_user = create_user('busy.search@example.com', 'Busy')
+        busy_family = seed_family_data(busy_user, budgets=4, transactions=60)[0]
+        self.assertFlatQueries('family-search', 'get', [
+            ('small', self.user, f'{self.url}?q=payment'),
+            ('large', busy_user, f'/api/budgets/families/{busy_family.id}/search/?q=payment'),
+        ], max_queries=2)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url, {'q': '  ?! '}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'dentist', 'type': 'goals'}).status_code, 400)
+        self.authenticate(self.outsider)
+        self.assertEqual(self.client.get(self.url, {'q': 'dentist'}).status_code, 404)
+
+
+class ListFilterTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('filters@example.com', 'Filters')
+        cls.family = seed_family_data(cls.user, budgets=3, transactions=20, contributions=6, members=1)[0]
+        cls.member = FamilyMembership.objects.get(family=cls.family, role='member').user
+        cls.budget = Budget.objects.filter(family=cls.family, budget_type='expense').first()
+        cls.member_transactions = [
+            Transaction.objects.create(
+                budget=cls.budget, amount=Decimal(amount), date=date(2024, 4, day), created_by=cls.member
+            )
+            for amount, day in (('5.00', 2), ('500.00', 9))
+        ]
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_authenticate(self.user)
+        # Counted from a warm access cache, as for a signed-in user
+        get_family_roles(self.user)
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def family_transactions(self, *ordering, **filters):
+        return list(Transaction.objects.filter(budget__family=self.family, **filters).order_by(
+            *(ordering or ('-date', '-created_at', '-id'))
+        ).values_list('id', flat=True))
+
+    def test_transaction_filters(self):
+        url = f'/api/budgets/families/{self.family.id}/transactions/?page_size=7'
+        self.assertEqual(
+            self.walk(f'{url}&start_date=2024-01-05&end_date=2024-01-10'),
+            self.family_transactions(date__range=(date(2024, 1, 5), date(2024, 1, 10)))
+        )
+        self.assertEqual(
+            self.walk(f'{url}&min_amount=15&max_amount=20.50'),
+            self.family_transactions(amount__gte=15, amount__lte=Decimal('20.50'))
+        )
+        self.assertEqual(
+            self.walk(f'{url}&created_by={self.member.id}'),
+            [transaction.id for transaction in reversed(self.member_transactions)]
+        )
+        self.assertEqual(
+            self.walk(f'/api/budgets/transactions/?family={self.family.id}&budget_type=income'),
+            self.family_transactions(budget__budget_type='income')
+        )
+
+    def test_transaction_orderings_page_through(self):
+        url = f'/api/budgets/transactions/?family={self.family.id}&page_size=6'
+        self.assertEqual(self.walk(f'{url}&ordering=amount'), self.family_transactions('amount', 'id'))
+        self.assertEqual(self.walk(f'{url}&ordering=-amount'), self.family_transactions('-amount', '-id'))
+        self.assertEqual(
+            self.walk(f'{url}&ordering=date&min_amount=20'),
+            self.family_transactions('date', 'created_at', 'id', amount__gte=20)
+        )
+
+    def test_budget_and_savings_filters(self):
+        response = self.client.get('/api/budgets/', {
+            'family': self.family.id, 'budget_type': 'expense', 'ordering': '-name'
+        })
+        expected = Budget.objects.filter(family=self.family, budget_type='expense').order_by('-name', '-id')
+        self.assertEqual([row['id'] for row in response.data], [budget.id for budget in expected])
+        # Budgets running at some point of the range
+        self.assertEqual(len(self.client.get('/api/budgets/', {'end_date': '2023-12-31'}).data), 0)
+        self.assertEqual(len(self.client.get('/api/budgets/', {'start_date': '2024-06-01'}).data), 3)
+
+        goal = SavingsGoal.objects.get(family=self.family)
+        response = self.client.get('/api/budgets/savings-contributions/', {
+            'savings_goal_id': goal.id, 'start_date': '2024-01-15', 'ordering': '-date'
+        })
+        expected = goal.contributions.filter(date__gte=date(2024, 1, 15)).order_by('-date', '-id')
+        self.assertEqual([row['id'] for row in response.data], [contribution.id for contribution in expected])
+        self.assertEqual(len(self.client.get('/api/budgets/savings-goals/', {'min_amount': '6000'}).data), 0)
+
+    def test_invalid_parameters(self):
+        for url in (
+            '/api/budgets/transactions/?ordering=description',
+            '/api/budgets/transactions/?start_date=yesterday',
+            '/api/budgets/transactions/?budget_id=abc',
+            '/api/budgets/?budget_type=savings',
+            '/api/budgets/savings-contributions/?max_amount=lots',
+        ):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+    def test_filtered_pages_cost_the_same(self):
+        base = f'/api/budgets/families/{self.family.id}/transactions/?page_size=5'
+        with CaptureQueriesContext(connection) as plain:
+            self.assertEqual(self.client.get(base).status_code, 200)
+        with CaptureQueriesContext(connection) as filtered:
+            response = self.client.get(
+                f'{base}&created_by={self.user.id}&budget_type=expense&min_amount=12&ordering=-amount'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(plain), len(filtered))
+
+
+class RecurringTransactionTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('recurring@example.com', 'Recurring')
+        cls.outsider = create_user('recurring-outsider@example.com', 'Outsider')
+        cls.family = seed_family_data(cls.user, budgets=2, transactions=4)[0]
+        cls.budget = Budget.objects.filter(family=cls.family).order_by('id').first()
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def template(self, **fields):
+        fields = {
+            'budget': self.budget, 'amount': Decimal('25.00'), 'description': 'Rent',
+            'frequency': 'monthly', 'start_date': date(2024, 1, 31), 'created_by': self.user, **fields
+        }
+        template = schedule(RecurringTransaction(**fields))
+        template.save()
+        return template
+
+    def occurrences(self, template):
+        return list(template.occurrences.order_by('date').values_list('date', flat=True))
+
+    def rollups(self):
+        return set(TransactionRollup.objects.values_list('budget_id', 'granularity', 'period_start', 'total', 'count'))
+
+    def test_schedule(self):
+        template = RecurringTransaction(frequency='monthly', interval=1, start_date=date(2024, 1, 31))
+        # Month ends are clamped without drifting
+        self.assertEqual(first_occurrence_after(template, date(2024, 1, 31)), date(2024, 2, 29))
+        self.assertEqual(first_occurrence_after(template, date(2024, 2, 29)), date(2024, 3, 31))
+        self.assertEqual(first_occurrence_after(template, date(2023, 6, 1)), date(2024, 1, 31))
+
+        template = RecurringTransaction(frequency='weekly', interval=2, start_date=date(2024, 1, 1))
+        self.assertEqual(first_occurrence_after(template, date(2024, 1, 1)), date(2024, 1, 15))
+        self.assertEqual(first_occurrence_after(template, date(2024, 1, 20)), date(2024, 1, 29))
+
+        template = RecurringTransaction(
+            frequency='yearly', interval=1, start_date=date(2024, 2, 29), end_date=date(2026, 12, 31)
+        )
+        self.assertEqual(first_occurrence_after(template, date(2024, 2, 29)), date(2025, 2, 28))
+        self.assertEqual(first_occurrence_after(template, date(2025, 3, 1)), date(2026, 2, 28))
+        self.assertIsNone(first_occurrence_after(template, date(2026, 3, 1)))
+
+    def test_command_materializes_due_occurrences_once(self):
+        monthly = self.template()
+        daily = self.template(frequency='daily', interval=3, start_date=date(2024, 2, 1), end_date=date(2024, 2, 10))
+        before = Transaction.objects.count()
+
+        out = io.StringIO()
+        call_command('materialize_recurring', '--date', '2024-04-30', '--batch-size', '1', stdout=out)
+        self.assertIn('Materialized 8 occurrence(s) of 2 template(s)', out.getvalue())
+        self.assertEqual(
+            self.occurrences(monthly), [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)]
+        )
+        self.assertEqual(
+            self.occurrences(daily), [date(2024, 2, 1), date(2024, 2, 4), date(2024, 2, 7), date(2024, 2, 10)]
+        )
+        monthly.refresh_from_db()
+        daily.refresh_from_db()
+        self.assertEqual(monthly.next_date, date(2024, 5, 31))
+        self.assertIsNone(daily.next_date)
+
+        # The derived tables got the rows that bulk_create inserted
+        self.assertEqual(list(verify_ledgers()), [])
+        rollups = self.rollups()
+        call_command('rebuild_rollups', workers=1, stdout=io.StringIO())
+        self.assertEqual(self.rollups(), rollups)
+
+        self.assertEqual(materialize_due(date(2024, 4, 30)), (0, 0))
+        self.assertEqual(Transaction.objects.count(), before + 8)
+
+    def test_existing_occurrences_are_not_repeated(self):
+        template = self.template()
+        materialize_due(date(2024, 3, 31))
+        # As if a worker had stopped before moving next_date
+        RecurringTransaction.objects.filter(id=template.id).update(next_date=date(2024, 1, 31))
+        self.assertEqual(materialize_due(date(2024, 4, 30)), (1, 1))
+        self.assertEqual(len(self.occurrences(template)), 4)
+
+        with self.assertRaises(IntegrityError), db_transaction.atomic():
+            Transaction.objects.create(
+                budget=self.budget, amount=1, date=date(2024, 1, 31), created_by=self.user,
+                recurring=template, recurring_date=date(2024, 1, 31)
+            )
+
+    def test_endpoints(self):
+        response = self.client.post('/api/budgets/recurring-transactions/', {
+            'budget_id': self.budget.id, 'amount': '12.50', 'description': 'Gym',
+            'frequency': 'weekly', 'start_date': '2024-03-04', 'next_date': '2030-01-01'
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['next_date'], '2024-03-04')
+        url = f"/api/budgets/recurring-transactions/{response.data['id']}/"
+
+        materialize_due(date(2024, 3, 20))
+        # The schedule resumes after the occurrences already created
+        response = self.client.patch(url, {'interval': 2})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['next_date'], '2024-04-01')
+        response = self.client.patch(url, {'end_date': '2024-03-01'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/api/budgets/recurring-transactions/', {'budget_id': self.budget.id})
+        self.assertEqual([row['id'] for row in response.data], [response.data[0]['id']])
+        self.assertEqual(len(self.client.get('/api/budgets/recurring-transactions/', {'frequency': 'daily'}).data), 0)
+        response = self.client.get(f'/api/budgets/families/{self.family.id}/transactions/?page_size=1')
+        self.assertIsNotNone(response.data['results'][0]['recurring'])
+
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.post('/api/budgets/recurring-transactions/', {
+            'budget_id': self.budget.id, 'amount': '1.00', 'frequency': 'daily', 'start_date': '2024-03-04'
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class ChunkedDeletionTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('deletion@example.com', 'Deletion')
+        cls.family, cls.other_family = seed_family_data(cls.user, families=2, budgets=3, transactions=6, members=1)
+        cls.member = FamilyMembership.objects.get(family=cls.family, role='member').user
+        cls.budget = Budget.objects.filter(family=cls.family).order_by('id').first()
+        TransactionCategory.objects.create(family=cls.family, name='Rent', category_type='expense')
+        cls.template = schedule(RecurringTransaction(
+            budget=cls.budget, amount=Decimal('5.00'), frequency='monthly', start_date=date(2024, 1, 1),
+            created_by=cls.user
+        ))
+        cls.template.save()
+        materialize_due(date(2024, 3, 1))
+        # An occurrence moved to the other family keeps pointing to its template
+        cls.moved = cls.template.occurrences.order_by('date').first()
+        cls.moved.budget = Budget.objects.filter(family=cls.other_family).first()
+        cls.moved.save()
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def family_rows(self, family_id):
+        return {model._meta.label: rows.count() for model, rows in family_steps(family_id)}
+
+    def test_plan_covers_every_relation(self):
+        # Memberships go first, with the access they grant (revoke_family_access)
+        planned = {model for model, rows in family_steps(self.family.id)} | {FamilyMembership}
+        pending = [Family]
+        while pending:
+            model = pending.pop()
+            for relation in model._meta.related_objects:
+                if relation.on_delete is CASCADE and relation.related_model not in (Family, DeletionJob):
+                    self.assertIn(relation.related_model, planned, f'{model.__name__}.{relation.name}')
+                    pending.append(relation.related_model)
+
+    def test_small_family_is_deleted_in_the_request(self):
+        other_rows = self.family_rows(self.other_family.id)
+        deleted = []
+
+        def receiver(sender, **kwargs):
+            deleted.append(sender)
+
+        post_delete.connect(receiver)
+        try:
+            response = self.client.delete(f'/api/families/{self.family.id}/')
+        finally:
+            post_delete.disconnect(receiver)
+        self.assertEqual(response.status_code, 204)
+        # Nothing was loaded into memory to be signalled
+        self.assertEqual(deleted, [])
+
+        self.assertEqual(set(self.family_rows(self.family.id).values()), {0})
+        self.assertFalse(FamilyMembership.objects.filter(family_id=self.family.id).exists())
+        self.assertEqual(self.family_rows(self.other_family.id), other_rows)
+        self.moved.refresh_from_db()
+        self.assertIsNone(self.moved.recurring_id)
+        self.assertEqual(list(verify_ledgers()), [])
+
+        # The members' cached access and access tokens are gone with it
+        self.assertEqual(self.client.get(f'/api/families/{self.family.id}/').status_code, 404)
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get('/api/families/').data, [])
+
+    @override_settings(DELETION_SYNC_MAX_ROWS=5, DELETION_CHUNK_SIZE=4)
+    def test_large_budget_is_deleted_by_a_job(self):
+        transactions = self.budget.transactions.count()
+        rollups = self.budget.rollups.count()
+        response = self.client.delete(f'/api/budgets/{self.budget.id}/')
+        self.assertEqual(response.status_code, 202, response.data)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(response.data['estimated_rows'], transactions)
+        job_url = f"/api/budgets/deletion-jobs/{response.data['id']}/"
+        # Deleting it again finds the queued job
+        self.assertEqual(self.client.delete(f'/api/budgets/{self.budget.id}/').data['id'], response.data['id'])
+        self.assertTrue(Budget.objects.filter(id=self.budget.id).exists())
+
+        out = io.StringIO()
+        call_command('run_deletion_jobs', stdout=out)
+        self.assertIn(f'deleted budget {self.budget.id}', out.getvalue())
+        response = self.client.get(job_url)
+        self.assertEqual(response.data['status'], 'done')
+        self.assertEqual(response.data['progress'], {
+            'budgets.Transaction': transactions,
+            'budgets.RecurringTransaction': 1,
+            'budgets.TransactionRollup': rollups,
+            'budgets.BudgetLedger': 1,
+            'budgets.Budget': 1,
+        })
+        self.assertFalse(Budget.objects.filter(id=self.budget.id).exists())
+        self.assertFalse(Transaction.objects.filter(budget_id=self.budget.id).exists())
+        self.assertEqual(list(verify_ledgers()), [])
+
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(job_url).status_code, 404)
+
+    @override_settings(DELETION_SYNC_MAX_ROWS=5, DELETION_CHUNK_SIZE=4)
+    def test_large_family_is_hidden_then_deleted_by_a_job(self):
+        response = self.client.delete(f'/api/families/{self.family.id}/')
+        self.assertEqual(response.status_code, 202, response.data)
+        job = DeletionJob.objects.get(id=response.data['id'])
+        # The members lose access before the job runs
+        self.assertEqual(self.client.get(f'/api/families/{self.family.id}/').status_code, 404)
+        self.assertTrue(Budget.objects.filter(family=self.family).exists())
+
+        # As if a worker had stopped halfway: the job is resumed by id
+        job.status = 'running'
+        job.save()
+        call_command('run_deletion_jobs', job.id, stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.deleted_rows, sum(job.progress.values()))
+        self.assertEqual(set(self.family_rows(self.family.id).values()), {0})
+
+        out = io.StringIO()
+        call_command('run_deletion_jobs', stdout=out)
+        self.assertIn('No deletion jobs pending', out.getvalue())
+
+
+class RequestMetricsTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('metrics@example.com', 'Metrics')
+        cls.family = seed_family_data(cls.user, budgets=3, transactions=5)[0]
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        registry.clear()
+        self.client.force_authenticate(self.user)
+
+    def server_timing(self, response):
+        return dict(
+            (metric.split(';')[0], dict(part.split('=', 1) for part in metric.split(';')[1:]))
+            for metric in response['Server-Timing'].split(', ')
+        )
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/budgets/?family={self.family.id}')
+        timing = self.server_timing(response)
+        self.assertEqual(set(timing), {'db', 'serialize', 'app', 'total'})
+        self.assertEqual(timing['db']['desc'], f'"{len(queries)} queries"')
+        self.assertLessEqual(float(timing['db']['dur']), float(timing['total']['dur']))
+
+        self.assertNotIn('Server-Timing', self.client.get('/metrics'))
+
+    def test_serializer_time_counts_as_serialize(self):
+        TransactionCategory.objects.bulk_create([
+            TransactionCategory(name=f'Category {index}', category_type='expense', family=self.family)
+            for index in range(3)
+        ])
+        budget = Budget.objects.filter(family=self.family).first()
+        to_representation = serializers.ModelSerializer.to_representation
+
+        def slow_to_representation(serializer, instance):
+            time.sleep(0.05)
+            return to_representation(serializer, instance)
+
+        # Generic views with and without expandable serializers, and an APIView
+        for url, rows in (
+            (f'/api/budgets/?family={self.family.id}', 3),
+            (f'/api/budgets/categories/?family={self.family.id}', 3),
+            (f'/api/budgets/{budget.id}/summary/', 1),
+        ):
+            with mock.patch.object(serializers.ModelSerializer, 'to_representation', slow_to_representation):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            timing = self.server_timing(response)
+            self.assertGreaterEqual(float(timing['serialize']['dur']), rows * 50, url)
+            self.assertLess(float(timing['app']['dur']), 50, url)
+
+    def test_metrics_endpoint(self):
+        self.client.get('/api/budgets/')
+        self.client.get(f'/api/budgets/families/{self.family.id}/analytics/budget/')
+        self.client.post('/api/budgets/', {}, format='json')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('api_request_duration_seconds_count{endpoint="BudgetListCreateView.list",method="GET"', body)
+        # AsyncFamilyBudgetAnalyticsView with ASYNC_ANALYTICS
+        self.assertRegex(body, r'api_request_queries_bucket\{endpoint="(Async)?FamilyBudgetAnalyticsView.get",method="GET"')
+        self.assertIn('api_response_size_bytes_sum{endpoint="BudgetListCreateView.list"', body)
+        self.assertIn('api_requests_total{endpoint="BudgetListCreateView.create",method="POST",status="400"', body)
+
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 404)
+
+
+class AsyncAnalyticsTests(TransactionTestCase):
+    """The async views against committed data, so that their parts really
+    run concurrently on other connections.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('async@example.com', 'Async')
+        self.family = seed_family_data(self.user, families=2, budgets=4, transactions=20, goals=2)[0]
+
+    def call(self, view_class, url, **kwargs):
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, user=self.user)
+        view = view_class.as_view()
+        if iscoroutinefunction(view):
+            view = async_to_sync(view)
+        return view(request, **kwargs)
+
+    def test_parts_run_in_worker_threads(self):
+        results = async_to_sync(gather_parts)({
+            'threads': lambda: threading.get_ident(),
+            'budgets': lambda: Budget.objects.filter(family=self.family).count(),
+        })
+        self.assertNotEqual(results['threads'], threading.get_ident())
+        self.assertEqual(results['budgets'], 4)
+
+    def test_worker_queries_count_towards_the_request(self):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            async_to_sync(gather_parts)({
+                'budgets': lambda: Budget.objects.filter(family=self.family).count(),
+                'goals': lambda: SavingsGoal.objects.filter(family=self.family).count(),
+            })
+        finally:
+            _current.reset(token)
+        self.assertEqual(metrics.query_count, 2)
+
+    def test_async_views_match_the_sync_views(self):
+        family = {'family_id': self.family.id}
+        for sync_view, async_view, url, kwargs in (
+            (views.FamilyBudgetAnalyticsView, async_views.AsyncFamilyBudgetAnalyticsView, '/', family),
+            (views.TransactionAnalyticsView, async_views.AsyncTransactionAnalyticsView,
+             '/?period=week&start_date=2024-01-10&end_date=2024-01-20', family),
+            (views.DashboardView, async_views.AsyncDashboardView, f'/?family={self.family.id}', {}),
+            (views.DashboardView, async_views.AsyncDashboardView, '/?transactions=3', {}),
+        ):
+            expected = self.call(sync_view, url, **kwargs)
+            self.assertEqual(expected.status_code, 200)
+            # Both views share the result cache
+            cache.clear()
+            response = self.call(async_view, url, **kwargs)
+            self.assertEqual(response.status_code, 200, async_view.__name__)
+            self.assertEqual(response.data, expected.data, async_view.__name__)
+            cache.clear()
+
+    def test_errors(self):
+        outsider = seed_family_data(create_user('outsider.async@example.com', 'Outsider'))[0]
+        response = self.call(async_views.AsyncFamilyBudgetAnalyticsView, '/', family_id=outsider.id)
+        self.assertEqual(response.status_code, 404)
+        response = self.call(
+            async_views.AsyncTransactionAnalyticsView, '/?start_date=yesterday', family_id=self.family.id
+        )
+        self.assertEqual(response.status_code, 400)
@@ -1,13 +1,23 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     BudgetListCreateView, BudgetDetailView, TransactionListCreateView,
-    TransactionDetailView, TransactionCategoryListCreateView,
-    TransactionCategoryDetailView, FamilyTransactionHistoryView,
+    TransactionDetailView, TransactionBulkCreateView, TransactionCategoryListCreateView,
+    RecurringTransactionListCreateView, RecurringTransactionDetailView, DeletionJobDetailView,
+    TransactionCategoryDetailView, FamilyTransactionHistoryView, FamilySearchView, FamilyTransactionExportView,
     BudgetSummaryView, SavingsGoalListCreateView, SavingsGoalDetailView,
     SavingsContributionListCreateView, SavingsContributionDetailView,
-    FamilyBudgetAnalyticsView, TransactionAnalyticsView, BudgetComparisonView
+    FamilyBudgetAnalyticsView, TransactionAnalyticsView, BudgetComparisonView,
+    SavingsForecastView, DashboardView
 )
 
+if settings.ASYNC_ANALYTICS:
+    from .async_views import (
+        AsyncFamilyBudgetAnalyticsView as FamilyBudgetAnalyticsView,
+        AsyncTransactionAnalyticsView as TransactionAnalyticsView,
+        AsyncDashboardView as DashboardView,
+    )
+
 urlpatterns = [
     # Budget URLs
     path('', BudgetListCreateView.as_view(), name='budget-list-create'),
@@ -16,8 +26,18 @@ urlpatterns = [
     
     # Transaction URLs
     path('transactions/', TransactionListCreateView.as_view(), name='transaction-list-create'),
+    path('transactions/bulk/', TransactionBulkCreateView.as_view(), name='transaction-bulk-create'),
     path('transactions/<int:pk>/', TransactionDetailView.as_view(), name='transaction-detail'),
     path('families/<int:family_id>/transactions/', FamilyTransactionHistoryView.as_view(), name='family-transaction-history'),
+    path('families/<int:family_id>/search/', FamilySearchView.as_view(), name='family-search'),
+    path('families/<int:family_id>/transactions/export/', FamilyTransactionExportView.as_view(), name='family-transaction-export'),
+    
+    # Recurring Transaction URLs
+    path('recurring-transactions/', RecurringTransactionListCreateView.as_view(), name='recurring-transaction-list-create'),
+    path('recurring-transactions/<int:pk>/', RecurringTransactionDetailView.as_view(), name='recurring-transaction-detail'),
+    
+    # Deletion progress of large families and budgets
+    path('deletion-jobs/<int:pk>/', DeletionJobDetailView.as_view(), name='deletion-job-detail'),
     
     # Transaction Category URLs
     path('categories/', TransactionCategoryListCreateView.as_view(), name='category-list-create'),
@@ -35,4 +55,8 @@ urlpatterns = [
     path('families/<int:family_id>/analytics/budget/', FamilyBudgetAnalyticsView.as_view(), name='family-budget-analytics'),
     path('families/<int:family_id>/analytics/transactions/', TransactionAnalyticsView.as_view(), name='transaction-analytics'),
     path('families/<int:family_id>/analytics/comparison/', BudgetComparisonView.as_view(), name='budget-comparison'),
+    path('families/<int:family_id>/analytics/savings-forecast/', SavingsForecastView.as_view(), name='savings-forecast'),
+    
+    # Dashboard URL
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
 ] 
\ No newline at end of file
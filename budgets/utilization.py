@@ -0,0 +1,124 @@
+"""
+Per-period utilization of budgets.
+
+A budget's ``amount`` is its allowance for one period (week, month or year).
+Its windows are the calendar periods between ``start_date`` and ``end_date``,
+the first and last one clipped to those dates; weeks start on Monday, like
+the transaction rollups.
+"""
+
+from datetime import timedelta
+from django.db.models import Case, When, Value, F, Sum, Count
+from django.utils import timezone
+from .models import Transaction
+from .rollups import TRUNC_FUNCTIONS, period_start, next_period_start
+
+PERIOD_GRANULARITIES = {
+    'weekly': 'week',
+    'monthly': 'month',
+    'yearly': 'year',
+}
+
+
+def budget_windows(budget):
+    """``(start, end)`` of every window of ``budget``, oldest first, ends inclusive."""
+    granularity = PERIOD_GRANULARITIES[budget.period]
+    windows = []
+    start = budget.start_date
+    while start <= budget.end_date:
+        following = next_period_start(start, granularity)
+        windows.append((start, min(following - timedelta(days=1), budget.end_date)))
+        start = following
+    return windows
+
+
+def current_window(budget, today):
+    """The window of ``budget`` containing ``today``, or None outside the budget's dates."""
+    if not budget.start_date <= today <= budget.end_date:
+        return None
+    granularity = PERIOD_GRANULARITIES[budget.period]
+    return (
+        max(period_start(today, granularity), budget.start_date),
+        min(next_period_start(today, granularity) - timedelta(days=1), budget.end_date),
+    )
+
+
+def _window_start():
+    """The calendar period of a transaction, truncated according to its budget's period."""
+    return Case(*(
+        When(budget__period=period, then=TRUNC_FUNCTIONS[granularity]('date'))
+        for period, granularity in PERIOD_GRANULARITIES.items()
+    ))
+
+
+def window_totals(budgets, today=None):
+    """``{(budget_id, period start): (spent, count)}`` for ``budgets``, in one grouped query.
+
+    Only transactions between each budget's ``start_date`` and ``end_date``
+    count. With ``today`` only the windows containing that day are read.
+    """
+    transactions = Transaction.objects.filter(
+        budget_id__in=[budget.id for budget in budgets],
+        date__gte=F('budget__start_date'),
+        date__lte=F('budget__end_date')
+    ).annotate(window=_window_start())
+
+    if today is not None:
+        starts = {granularity: period_start(today, granularity) for granularity in PERIOD_GRANULARITIES.values()}
+        transactions = transactions.filter(
+            # The date bounds keep the scan to the current periods, at most a year per budget
+            date__gte=min(starts.values()),
+            date__lt=max(next_period_start(today, granularity) for granularity in starts),
+            window=Case(*(
+                When(budget__period=period, then=Value(starts[granularity]))
+                for period, granularity in PERIOD_GRANULARITIES.items()
+            ))
+        )
+
+    rows = transactions.values('budget_id', 'window').annotate(
+        spent=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+    return {(row['budget_id'], row['window']): (row['spent'], row['count']) for row in rows}
+
+
+def _window(budget, window, totals):
+    start, end = window
+    granularity = PERIOD_GRANULARITIES[budget.period]
+    spent, count = totals.get((budget.id, period_start(start, granularity)), (0, 0))
+    return {
+        'start': start,
+        'end': end,
+        'spent_amount': spent,
+        'transaction_count': count,
+        'utilization_percentage': (spent / budget.amount) * 100 if budget.amount > 0 else 0
+    }
+
+
+def period_utilization(budgets, current_only=False, today=None):
+    """Spend per window for each of ``budgets``.
+
+    Returns ``{budget_id: {'current_period': window or None, 'periods': [window, ...]}}``
+    where a window is ``{'start', 'end', 'spent_amount', 'transaction_count',
+    'utilization_percentage'}``. With ``current_only`` only the current windows
+    are aggregated and ``periods`` is left out.
+    """
+    budgets = list(budgets)
+    today = today or timezone.localdate()
+    if current_only:
+        active = [budget for budget in budgets if current_window(budget, today)]
+        totals = window_totals(active, today) if active else {}
+    else:
+        totals = window_totals(budgets) if budgets else {}
+
+    utilization = {}
+    for budget in budgets:
+        current = current_window(budget, today)
+        utilization[budget.id] = {
+            'current_period': _window(budget, current, totals) if current else None
+        }
+        if not current_only:
+            utilization[budget.id]['periods'] = [
+                _window(budget, window, totals) for window in budget_windows(budget)
+            ]
+    return utilization
@@ -1,57 +1,74 @@
-from django.shortcuts import render
-from rest_framework import generics, status, permissions
+from django.conf import settings
+from django.db import transaction as db_transaction
+from rest_framework import generics, serializers, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum, Count, Avg, F, Q
-from django.db.models.functions import TruncMonth, TruncYear, TruncWeek
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from datetime import timedelta
-from families.models import Family, FamilyMembership
+from datetime import date
+from functools import cached_property
+from families.models import Family
+from families.access import require_membership
+from families.scoping import scope_to_user
+from families.serializers import FamilySerializer
+from family_budget_2.conditional import ConditionalGetMixin
+from family_budget_2.expansion import ExpandableQuerysetMixin, split_param, field_requested
+from family_budget_2.metrics import SerializerMetricsMixin, serialize
 from .models import (
     Budget, Transaction, TransactionCategory,
-    SavingsGoal, SavingsContribution
+    SavingsGoal, SavingsContribution, RecurringTransaction, DeletionJob
 )
+from .bulk import bulk_create_transactions
+from .analytics import family_totals, budget_utilization, budget_vs_actual, savings_progress
+from .data_version import cached_family_result
+from .deletion import delete_budget
+from .export import EXPORT_CONTENT_TYPES, STREAMERS, export_rows
+from .filters import (
+    FilteredListMixin, BudgetFilterSet, TransactionFilterSet, SavingsGoalFilterSet, SavingsContributionFilterSet,
+    RecurringTransactionFilterSet
+)
+from .forecast import family_savings_forecast
+from .pagination import KeysetPagination, SearchPagination
+from .rollups import GRANULARITIES, family_period_queries
+from .savings import apply_contribution_delta
+from .search import search_transactions, search_budgets
+from .utilization import period_utilization
 from .serializers import (
     BudgetSerializer, TransactionSerializer, TransactionCategorySerializer,
-    SavingsGoalSerializer, SavingsContributionSerializer
+    SavingsGoalSerializer, SavingsContributionSerializer, BulkTransactionSerializer, RecurringTransactionSerializer,
+    DeletionJobSerializer,
+    TransactionSearchResultSerializer, BudgetSearchResultSerializer, SearchParamsSerializer
 )
 
 
-class BudgetListCreateView(generics.ListCreateAPIView):
+class BudgetListCreateView(ConditionalGetMixin, FilteredListMixin, ExpandableQuerysetMixin,
+                           SerializerMetricsMixin, generics.ListCreateAPIView):
     serializer_class = BudgetSerializer
+    filterset_class = BudgetFilterSet
     
     def get_queryset(self):
-        # Filter by family if provided
-        family_id = self.request.query_params.get('family')
-        queryset = Budget.objects.filter(
-            family__memberships__user=self.request.user,
-            family__memberships__status='accepted'
-        ).distinct()
-        
-        if family_id:
-            queryset = queryset.filter(family_id=family_id)
-        
-        return queryset
+        # ?family= and the other filters are applied by BudgetFilterSet
+        queryset = scope_to_user(Budget.objects.all(), self.request.user)
+        return self.expand_queryset(queryset)
     
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
+        queryset = self.filter_queryset(self.get_queryset()).select_related('ledger')
         
         # Serialize the queryset
         serializer = self.get_serializer(queryset, many=True)
         data = serializer.data
         
-        # Add spent_amount to each budget
-        for budget_data in data:
-            budget_id = budget_data['id']
-            budget_type = budget_data['budget_type']
-
-            spent_amount = Transaction.objects.filter(
-                budget_id=budget_id
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            # Add spent_amount to the budget data
-            budget_data['spent_amount'] = spent_amount
+        # Add spent_amount to each budget from its maintained ledger
+        for budget, budget_data in zip(queryset, data):
+            budget_data['spent_amount'] = budget.spent_amount
+        
+        # The spend of the current period, from one grouped query for the whole list
+        if field_requested(request, 'current_period'):
+            utilization = period_utilization(queryset, current_only=True)
+            for budget, budget_data in zip(queryset, data):
+                budget_data['current_period'] = utilization[budget.id]['current_period']
         
         return Response(data)
 
@@ -65,14 +82,13 @@ class BudgetListCreateView(generics.ListCreateAPIView):
 
 
 
-class BudgetDetailView(generics.RetrieveUpdateDestroyAPIView):
+class BudgetDetailView(ConditionalGetMixin, ExpandableQuerysetMixin,
+                       SerializerMetricsMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = BudgetSerializer
     
     def get_queryset(self):
-        return Budget.objects.filter(
-            family__memberships__user=self.request.user,
-            family__memberships__status='accepted'
-        )
+        queryset = scope_to_user(Budget.objects.all(), self.request.user).select_related('ledger')
+        return self.expand_queryset(queryset)
 
     def retrieve(self, request, *args, **kwargs):
         # Получаем один объект, а не queryset
@@ -83,12 +99,12 @@ class BudgetDetailView(generics.RetrieveUpdateDestroyAPIView):
         data = serializer.data
         
         # Добавляем spent_amount к бюджету
-        budget_id = data['id']
-        spent_amount = Transaction.objects.filter(
-            budget_id=budget_id
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        data['spent_amount'] = instance.spent_amount
         
-        data['spent_amount'] = spent_amount
+        # Расход по периодам, если клиент его запросил
+        periods = field_requested(request, 'periods')
+        if periods or field_requested(request, 'current_period'):
+            data.update(period_utilization([instance], current_only=not periods)[instance.id])
         
         return Response(data)
 
@@ -103,25 +119,32 @@ class BudgetDetailView(generics.RetrieveUpdateDestroyAPIView):
         
         # Добавляем spent_amount к бюджету
         data = serializer.data
-        budget_id = data['id']
-        spent_amount = Transaction.objects.filter(
-            budget_id=budget_id
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        data['spent_amount'] = spent_amount
+        data['spent_amount'] = instance.spent_amount
         
         return Response(data)
 
-class TransactionCategoryListCreateView(generics.ListCreateAPIView):
+    def destroy(self, request, *args, **kwargs):
+        # Large budgets are deleted by a job; the response tells how to follow it
+        job = delete_budget(self.get_object(), requested_by=request.user)
+        if job is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(serialize(DeletionJobSerializer(job)), status=status.HTTP_202_ACCEPTED)
+
+
+class DeletionJobDetailView(SerializerMetricsMixin, generics.RetrieveAPIView):
+    """Progress of a deletion the user requested (see budgets.deletion)."""
+    serializer_class = DeletionJobSerializer
+    
+    def get_queryset(self):
+        return DeletionJob.objects.filter(requested_by=self.request.user)
+
+class TransactionCategoryListCreateView(ConditionalGetMixin, SerializerMetricsMixin, generics.ListCreateAPIView):
     serializer_class = TransactionCategorySerializer
     
     def get_queryset(self):
         # Filter by family if provided
         family_id = self.request.query_params.get('family_id')
-        queryset = TransactionCategory.objects.filter(
-            family__memberships__user=self.request.user,
-            family__memberships__status='accepted'
-        ).distinct()
+        queryset = scope_to_user(TransactionCategory.objects.all(), self.request.user)
         
         if family_id:
             queryset = queryset.filter(family_id=family_id)
@@ -129,75 +152,216 @@ class TransactionCategoryListCreateView(generics.ListCreateAPIView):
         return queryset
 
 
-class TransactionCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TransactionCategoryDetailView(ConditionalGetMixin, SerializerMetricsMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TransactionCategorySerializer
     
     def get_queryset(self):
-        return TransactionCategory.objects.filter(
-            family__memberships__user=self.request.user,
-            family__memberships__status='accepted'
-        )
+        return scope_to_user(TransactionCategory.objects.all(), self.request.user)
 
 
-class TransactionListCreateView(generics.ListCreateAPIView):
+class TransactionListCreateView(ConditionalGetMixin, FilteredListMixin, ExpandableQuerysetMixin,
+                                SerializerMetricsMixin, generics.ListCreateAPIView):
     serializer_class = TransactionSerializer
+    pagination_class = KeysetPagination
+    filterset_class = TransactionFilterSet
     
     def get_queryset(self):
-        # Filter by budget if provided
-        budget_id = self.request.query_params.get('budget_id')
-        queryset = Transaction.objects.filter(
-            budget__family__memberships__user=self.request.user,
-            budget__family__memberships__status='accepted'
-        ).distinct()
-        
-        if budget_id:
-            queryset = queryset.filter(budget_id=budget_id)
-        
-        return queryset
+        # ?budget_id= and the other filters are applied by TransactionFilterSet
+        queryset = scope_to_user(Transaction.objects.all(), self.request.user, 'budget__family')
+        return self.expand_queryset(queryset)
 
 
-class TransactionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TransactionDetailView(ConditionalGetMixin, ExpandableQuerysetMixin,
+                            SerializerMetricsMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TransactionSerializer
     
     def get_queryset(self):
-        return Transaction.objects.filter(
-            budget__family__memberships__user=self.request.user,
-            budget__family__memberships__status='accepted'
+        queryset = scope_to_user(Transaction.objects.all(), self.request.user, 'budget__family')
+        return self.expand_queryset(queryset)
+
+
+class RecurringTransactionListCreateView(ConditionalGetMixin, FilteredListMixin, ExpandableQuerysetMixin,
+                                         SerializerMetricsMixin, generics.ListCreateAPIView):
+    """Recurring transaction templates; the ``materialize_recurring`` command
+    creates their transactions when they fall due.
+    """
+    serializer_class = RecurringTransactionSerializer
+    filterset_class = RecurringTransactionFilterSet
+    
+    def get_queryset(self):
+        queryset = scope_to_user(RecurringTransaction.objects.all(), self.request.user, 'budget__family')
+        return self.expand_queryset(queryset)
+
+
+class RecurringTransactionDetailView(ConditionalGetMixin, ExpandableQuerysetMixin,
+                                     SerializerMetricsMixin, generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = RecurringTransactionSerializer
+    
+    def get_queryset(self):
+        queryset = scope_to_user(RecurringTransaction.objects.all(), self.request.user, 'budget__family')
+        return self.expand_queryset(queryset)
+
+
+class TransactionBulkCreateView(APIView):
+    """Create many transactions from a JSON list in one request.
+
+    Rows that fail validation are reported by index and the others are
+    created, unless ``?atomic=true`` asks for all-or-nothing.
+    """
+    def post(self, request):
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response(
+                {"detail": "Expected a list of transactions."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(rows) > settings.TRANSACTION_BULK_MAX_ROWS:
+            return Response(
+                {"detail": f"At most {settings.TRANSACTION_BULK_MAX_ROWS} transactions can be created at once."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        atomic = request.query_params.get('atomic', '').lower() in ('1', 'true', 'yes')
+
+        # One serializer instance validates every row
+        row_serializer = BulkTransactionSerializer()
+        valid_rows = []
+        errors = {}
+        for index, row in enumerate(rows):
+            try:
+                valid_rows.append((index, row_serializer.run_validation(row)))
+            except ValidationError as exc:
+                errors[index] = exc.detail
+
+        # Check every referenced budget against the user's families at once
+        budget_ids = {data['budget_id'] for _, data in valid_rows}
+        accessible_budgets = {
+            budget_id: (family_id, budget_type)
+            for budget_id, family_id, budget_type in scope_to_user(
+                Budget.objects.filter(id__in=budget_ids), request.user
+            ).values_list('id', 'family_id', 'budget_type')
+        } if budget_ids else {}
+        does_not_exist = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+
+        transactions = []
+        indexes = []
+        for index, data in valid_rows:
+            if data['budget_id'] not in accessible_budgets:
+                errors[index] = {'budget_id': [does_not_exist.format(pk_value=data['budget_id'])]}
+                continue
+            transactions.append(Transaction(created_by=request.user, **data))
+            indexes.append(index)
+
+        errors = [{'index': index, 'errors': errors[index]} for index in sorted(errors)]
+        if errors and (atomic or not transactions):
+            return Response({'created': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        created = bulk_create_transactions(
+            transactions, batch_size=settings.TRANSACTION_BULK_BATCH_SIZE, budgets=accessible_budgets
         )
+        return Response({
+            'created': [{'index': index, 'id': obj.id} for index, obj in zip(indexes, created)],
+            'errors': errors,
+        }, status=status.HTTP_201_CREATED)
 
 
-class FamilyTransactionHistoryView(generics.ListAPIView):
+class FamilyTransactionHistoryView(ConditionalGetMixin, FilteredListMixin, ExpandableQuerysetMixin,
+                                   SerializerMetricsMixin, generics.ListAPIView):
     serializer_class = TransactionSerializer
+    pagination_class = KeysetPagination
+    filterset_class = TransactionFilterSet
     
     def get_queryset(self):
         family_id = self.kwargs.get('family_id')
         # Check if user is a member of the family
-        get_object_or_404(
-            FamilyMembership,
-            family_id=family_id,
-            user=self.request.user,
-            status='accepted'
-        )
+        require_membership(self.request.user, family_id)
         
-        return Transaction.objects.filter(
+        return self.expand_queryset(Transaction.objects.filter(
             budget__family_id=family_id
-        ).order_by('-date', '-created_at')
+        ).order_by('-date', '-created_at', '-id'))
+
+
+class FamilySearchView(ConditionalGetMixin, ExpandableQuerysetMixin, SerializerMetricsMixin, generics.ListAPIView):
+    """Full-text search of a family's transactions (or, with ``?type=budgets``,
+    budgets), best match first. See budgets.search.
+    """
+    pagination_class = SearchPagination
+    searches = {
+        'transactions': (search_transactions, TransactionSearchResultSerializer),
+        'budgets': (search_budgets, BudgetSearchResultSerializer),
+    }
+
+    @cached_property
+    def params(self):
+        serializer = SearchParamsSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def get_serializer_class(self):
+        return self.searches[self.params['type']][1]
+
+    def get_queryset(self):
+        family_id = self.kwargs.get('family_id')
+        # Check if user is a member of the family
+        require_membership(self.request.user, family_id)
+
+        filters = dict(self.params)
+        search = self.searches[filters.pop('type')][0]
+        return self.expand_queryset(search(family_id, filters.pop('q'), **filters))
+
 
+class FamilyTransactionExportView(APIView):
+    """Stream a family's full transaction history as CSV or NDJSON.
 
-class BudgetSummaryView(APIView):
+    ``?output=csv|ndjson`` (``format`` is taken by DRF's format suffixes),
+    optionally filtered by ``start_date``, ``end_date`` and ``budget_id``.
+    """
+    def get(self, request, family_id):
+        require_membership(request.user, family_id)
+
+        output = request.query_params.get('output', 'csv')
+        if output not in STREAMERS:
+            return Response(
+                {"detail": f"Unsupported output '{output}', use one of: {', '.join(STREAMERS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filters = {}
+        for name in ('start_date', 'end_date'):
+            value = request.query_params.get(name)
+            if value:
+                try:
+                    filters[name] = date.fromisoformat(value)
+                except ValueError:
+                    return Response(
+                        {name: ["Date has wrong format. Use YYYY-MM-DD."]},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+        budget_id = request.query_params.get('budget_id')
+        if budget_id:
+            if not budget_id.isdigit():
+                return Response({"budget_id": ["A valid integer is required."]}, status=status.HTTP_400_BAD_REQUEST)
+            filters['budget_id'] = int(budget_id)
+
+        response = StreamingHttpResponse(
+            STREAMERS[output](export_rows(family_id, **filters)),
+            content_type=EXPORT_CONTENT_TYPES[output]
+        )
+        response['Content-Disposition'] = f'attachment; filename="family-{family_id}-transactions.{output}"'
+        return response
+
+
+class BudgetSummaryView(ConditionalGetMixin, APIView):
     def get(self, request, budget_id):
         # Check if user has access to the budget
         budget = get_object_or_404(
-            Budget,
-            id=budget_id,
-            family__memberships__user=request.user,
-            family__memberships__status='accepted'
+            scope_to_user(Budget.objects.all(), request.user).select_related(
+                'ledger', *BudgetSerializer.get_select_related(split_param(request, 'expand'))
+            ),
+            id=budget_id
         )
         
-        # Calculate total transactions
-        total_transactions = Transaction.objects.filter(
-            budget=budget
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        # Total transactions come from the maintained ledger
+        total_transactions = budget.spent_amount
         
         # Calculate remaining amount
         if budget.budget_type == 'income':
@@ -206,264 +370,256 @@ class BudgetSummaryView(APIView):
             remaining = budget.amount - total_transactions
         
         return Response({
-            'budget': BudgetSerializer(budget, context={'request': request}).data,
+            'budget': serialize(BudgetSerializer(budget, context={'request': request})),
             'total_transactions': total_transactions,
-            'remaining': remaining
+            'remaining': remaining,
+            **period_utilization([budget])[budget.id]
         })
 
 
-class SavingsGoalListCreateView(generics.ListCreateAPIView):
+class SavingsGoalListCreateView(ConditionalGetMixin, FilteredListMixin, ExpandableQuerysetMixin,
+                                SerializerMetricsMixin, generics.ListCreateAPIView):
     serializer_class = SavingsGoalSerializer
+    filterset_class = SavingsGoalFilterSet
     
     def get_queryset(self):
-        # Filter by family if provided
-        family_id = self.request.query_params.get('family_id')
-        queryset = SavingsGoal.objects.filter(
-            family__memberships__user=self.request.user,
-            family__memberships__status='accepted'
-        ).distinct()
-        
-        if family_id:
-            queryset = queryset.filter(family_id=family_id)
-        
-        return queryset
+        # ?family_id= and the other filters are applied by SavingsGoalFilterSet
+        queryset = scope_to_user(SavingsGoal.objects.all(), self.request.user)
+        return self.expand_queryset(queryset)
 
 
-class SavingsGoalDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SavingsGoalDetailView(ConditionalGetMixin, ExpandableQuerysetMixin,
+                            SerializerMetricsMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = SavingsGoalSerializer
     
     def get_queryset(self):
-        return SavingsGoal.objects.filter(
-            family__memberships__user=self.request.user,
-            family__memberships__status='accepted'
-        )
+        queryset = scope_to_user(SavingsGoal.objects.all(), self.request.user)
+        return self.expand_queryset(queryset)
 
 
-class SavingsContributionListCreateView(generics.ListCreateAPIView):
+class SavingsContributionListCreateView(ConditionalGetMixin, FilteredListMixin, ExpandableQuerysetMixin,
+                                        SerializerMetricsMixin, generics.ListCreateAPIView):
     serializer_class = SavingsContributionSerializer
+    filterset_class = SavingsContributionFilterSet
     
     def get_queryset(self):
-        # Filter by savings goal if provided
-        savings_goal_id = self.request.query_params.get('savings_goal_id')
-        queryset = SavingsContribution.objects.filter(
-            savings_goal__family__memberships__user=self.request.user,
-            savings_goal__family__memberships__status='accepted'
-        ).distinct()
-        
-        if savings_goal_id:
-            queryset = queryset.filter(savings_goal_id=savings_goal_id)
-        
-        return queryset
+        # ?savings_goal_id= and the other filters are applied by SavingsContributionFilterSet
+        queryset = scope_to_user(SavingsContribution.objects.all(), self.request.user, 'savings_goal__family')
+        return self.expand_queryset(queryset)
 
 
-class SavingsContributionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SavingsContributionDetailView(ConditionalGetMixin, ExpandableQuerysetMixin,
+                                    SerializerMetricsMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = SavingsContributionSerializer
     
     def get_queryset(self):
-        return SavingsContribution.objects.filter(
-            savings_goal__family__memberships__user=self.request.user,
-            savings_goal__family__memberships__status='accepted'
-        )
+        queryset = scope_to_user(SavingsContribution.objects.all(), self.request.user, 'savings_goal__family')
+        return self.expand_queryset(queryset)
     
     def perform_destroy(self, instance):
-        # Update the current amount in the savings goal
-        savings_goal = instance.savings_goal
-        savings_goal.current_amount -= instance.amount
-        savings_goal.save()
-        
-        instance.delete()
-
-
-class FamilyBudgetAnalyticsView(APIView):
+        with db_transaction.atomic():
+            # Update the current amount in the savings goal
+            apply_contribution_delta(instance.savings_goal_id, -instance.amount)
+            instance.delete()
+
+
+class CachedFamilyAnalyticsView(APIView):
+    """Base view for family analytics, cached until the family's data changes.
+
+    Subclasses implement ``get_parts(request, family_id)``, the independent
+    queries behind the result as ``{name: callable}``, and
+    ``combine(request, results)``, which builds the response from their
+    results. The result is kept per family and query string in
+    budgets.data_version. budgets.async_views runs the same parts
+    concurrently.
+    """
     def get(self, request, family_id):
         # Check if user is a member of the family
-        get_object_or_404(
-            FamilyMembership,
-            family_id=family_id,
-            user=request.user,
-            status='accepted'
-        )
-        
-        # Get all budgets for the family
-        budgets = Budget.objects.filter(family_id=family_id)
-        
-        # Calculate total budget amounts by type
-        budget_totals = budgets.values('budget_type').annotate(
-            total=Sum('amount')
-        )
-        
-        # Calculate total transactions by budget type
-        transaction_totals = Transaction.objects.filter(
-            budget__family_id=family_id
-        ).values('budget__budget_type').annotate(
-            total=Sum('amount')
+        require_membership(request.user, family_id)
+
+        data = cached_family_result(
+            family_id, self.get_cache_name(request), request.query_params,
+            lambda: self.get_data(request, family_id)
         )
-        
-        # Calculate budget utilization
-        budget_utilization = {}
-        for budget_type in ['income', 'expense']:
-            budget_amount = next((item['total'] for item in budget_totals if item['budget_type'] == budget_type), 0)
-            transaction_amount = next((item['total'] for item in transaction_totals if item['budget__budget_type'] == budget_type), 0)
-            
-            if budget_amount > 0:
-                utilization = (transaction_amount / budget_amount) * 100
-            else:
-                utilization = 0
-                
-            budget_utilization[budget_type] = {
-                'budget_amount': budget_amount,
-                'transaction_amount': transaction_amount,
-                'utilization_percentage': utilization
-            }
-        
-        # Get savings goals progress
-        savings_goals = SavingsGoal.objects.filter(family_id=family_id)
-        savings_progress = []
-        
-        for goal in savings_goals:
-            if goal.target_amount > 0:
-                progress_percentage = (goal.current_amount / goal.target_amount) * 100
-            else:
-                progress_percentage = 0
-                
-            savings_progress.append({
-                'goal_id': goal.id,
-                'name': goal.name,
-                'target_amount': goal.target_amount,
-                'current_amount': goal.current_amount,
-                'progress_percentage': progress_percentage,
-                'target_date': goal.target_date
-            })
-        
-        return Response({
-            'budget_utilization': budget_utilization,
-            'savings_progress': savings_progress
-        })
+        return Response(data)
 
+    def get_cache_name(self, request):
+        return type(self).__name__
 
-class TransactionAnalyticsView(APIView):
-    def get(self, request, family_id):
-        # Check if user is a member of the family
-        get_object_or_404(
-            FamilyMembership,
-            family_id=family_id,
-            user=request.user,
-            status='accepted'
-        )
-        
+    def get_data(self, request, family_id):
+        parts = self.get_parts(request, family_id)
+        return self.combine(request, {name: part() for name, part in parts.items()})
+
+    def get_parts(self, request, family_id):
+        raise NotImplementedError
+
+    def combine(self, request, results):
+        raise NotImplementedError
+
+
+class FamilyBudgetAnalyticsView(CachedFamilyAnalyticsView):
+    def get_parts(self, request, family_id):
+        return {
+            'totals': lambda: family_totals(family_id),
+            'savings_progress': lambda: savings_progress(family_id),
+        }
+
+    def combine(self, request, results):
+        return {
+            'budget_utilization': budget_utilization(results['totals']),
+            'savings_progress': results['savings_progress']
+        }
+
+
+class SavingsForecastView(CachedFamilyAnalyticsView):
+    def get_cache_name(self, request):
+        # Forecasts start from today: a new day is a new result
+        return f"{type(self).__name__}:{timezone.localdate()}"
+
+    def get_parts(self, request, family_id):
+        return {
+            'savings_forecast': lambda: family_savings_forecast(family_id),
+        }
+
+    def combine(self, request, results):
+        return results
+
+
+class TransactionAnalyticsView(CachedFamilyAnalyticsView):
+    def get_parts(self, request, family_id):
         # Get query parameters
         period = request.query_params.get('period', 'month')
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        
-        # Filter transactions by date if provided
-        transactions = Transaction.objects.filter(budget__family_id=family_id)
-        
-        if start_date:
-            transactions = transactions.filter(date__gte=start_date)
-        
-        if end_date:
-            transactions = transactions.filter(date__lte=end_date)
-        
-        # Group transactions by category
-        category_totals = transactions.values(
-            'category__name', 'category__category_type'
-        ).annotate(
-            total=Sum('amount')
-        ).order_by('-total')
-        
-        # Group transactions by time period
-        if period == 'week':
-            time_function = TruncWeek('date')
-        elif period == 'month':
-            time_function = TruncMonth('date')
-        elif period == 'year':
-            time_function = TruncYear('date')
-        else:
-            time_function = TruncMonth('date')  # Default to month
-        
-        time_series = transactions.annotate(
-            period=time_function
-        ).values(
-            'period', 'budget__budget_type'
-        ).annotate(
-            total=Sum('amount')
-        ).order_by('period')
+        if period not in GRANULARITIES:
+            period = 'month'  # Default to month
+        dates = {}
+        for name in ('start_date', 'end_date'):
+            value = request.query_params.get(name)
+            try:
+                dates[name] = date.fromisoformat(value) if value else None
+            except ValueError:
+                raise ValidationError({name: ["Date has wrong format. Use YYYY-MM-DD."]})
+        
+        # Whole periods come from the rollups, partial ones at the edges of
+        # the date range from the transactions themselves
+        queries = family_period_queries(family_id, period, dates['start_date'], dates['end_date'])
+        return dict(enumerate(queries))
+
+    def combine(self, request, results):
+        rows = [row for _, part_rows in sorted(results.items()) for row in part_rows]
+        
+        # Group transactions by budget (transactions carry no category of their own)
+        budget_totals = {}
+        trends = {}
+        for period_start, budget_id, budget_name, budget_type, total in rows:
+            entry = budget_totals.setdefault(budget_id, {
+                'budget_id': budget_id,
+                'budget__name': budget_name,
+                'budget__budget_type': budget_type,
+                'total': 0
+            })
+            entry['total'] += total
+            trends[period_start, budget_type] = trends.get((period_start, budget_type), 0) + total
+        category_totals = sorted(budget_totals.values(), key=lambda item: item['total'], reverse=True)
         
         # Calculate spending trends
-        spending_trends = []
-        for entry in time_series:
-            spending_trends.append({
-                'period': entry['period'],
-                'budget_type': entry['budget__budget_type'],
-                'amount': entry['total']
-            })
+        spending_trends = [
+            {
+                'period': period_start,
+                'budget_type': budget_type,
+                'amount': amount
+            }
+            for (period_start, budget_type), amount in sorted(trends.items())
+        ]
         
         # Get top spending categories
-        top_expense_categories = [item for item in category_totals if item.get('category__category_type') == 'expense'][:5]
-        top_income_categories = [item for item in category_totals if item.get('category__category_type') == 'income'][:5]
+        top_expense_categories = [item for item in category_totals if item.get('budget__budget_type') == 'expense'][:5]
+        top_income_categories = [item for item in category_totals if item.get('budget__budget_type') == 'income'][:5]
         
-        return Response({
+        return {
             'top_expense_categories': top_expense_categories,
             'top_income_categories': top_income_categories,
             'spending_trends': spending_trends
-        })
+        }
 
 
-class BudgetComparisonView(APIView):
-    def get(self, request, family_id):
-        # Check if user is a member of the family
-        get_object_or_404(
-            FamilyMembership,
-            family_id=family_id,
-            user=request.user,
-            status='accepted'
-        )
-        
-        # Get all budgets for the family
-        budgets = Budget.objects.filter(family_id=family_id)
-        
-        # Compare income vs expense budgets
-        income_budgets = budgets.filter(budget_type='income').aggregate(total=Sum('amount'))['total'] or 0
-        expense_budgets = budgets.filter(budget_type='expense').aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Calculate net budget (income - expense)
-        net_budget = income_budgets - expense_budgets
-        
-        # Compare actual income vs expense transactions
-        income_transactions = Transaction.objects.filter(
-            budget__family_id=family_id,
-            budget__budget_type='income'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        expense_transactions = Transaction.objects.filter(
-            budget__family_id=family_id,
-            budget__budget_type='expense'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Calculate net transactions (income - expense)
-        net_transactions = income_transactions - expense_transactions
-        
-        # Calculate budget vs actual difference
-        budget_vs_actual = {
-            'income': {
-                'budget': income_budgets,
-                'actual': income_transactions,
-                'difference': income_transactions - income_budgets,
-                'percentage': (income_transactions / income_budgets * 100) if income_budgets > 0 else 0
-            },
-            'expense': {
-                'budget': expense_budgets,
-                'actual': expense_transactions,
-                'difference': expense_transactions - expense_budgets,
-                'percentage': (expense_transactions / expense_budgets * 100) if expense_budgets > 0 else 0
-            },
-            'net': {
-                'budget': net_budget,
-                'actual': net_transactions,
-                'difference': net_transactions - net_budget,
-                'percentage': (net_transactions / net_budget * 100) if net_budget > 0 else 0
-            }
+class BudgetComparisonView(CachedFamilyAnalyticsView):
+    def get_parts(self, request, family_id):
+        return {
+            'totals': lambda: family_totals(family_id),
+        }
+
+    def combine(self, request, results):
+        return budget_vs_actual(results['totals'])
+
+
+class DashboardView(APIView):
+    """Everything the dashboard page shows, in one response.
+
+    Returns the user's families and, for ``?family=<id>`` (default: the
+    first family), budget utilization, budget vs actual, savings progress
+    and the latest ``?transactions=<n>`` transactions. The family part is
+    built from one conditional aggregation and cached like the analytics.
+    """
+    default_transaction_count = 10
+
+    def get(self, request):
+        families = self.get_families(request)
+        family_id = self.get_family_id(request, families)
+        count = self.get_transaction_count(request)
+
+        data = {'families': families, 'family_id': family_id}
+        if family_id is not None:
+            data.update(cached_family_result(
+                family_id, type(self).__name__, request.query_params,
+                lambda: self.get_family_data(request, family_id, count)
+            ))
+        return Response(data)
+
+    def get_families(self, request):
+        return serialize(FamilySerializer(
+            scope_to_user(Family.objects.all(), request.user, 'id'),
+            many=True,
+            context={'request': request}
+        ))
+
+    def get_family_id(self, request, families=None):
+        """The requested family, else the first of ``families`` (None: not loaded yet)."""
+        family_id = request.query_params.get('family')
+        if family_id:
+            require_membership(request.user, family_id)
+            return int(family_id)
+        if families:
+            return families[0]['id']
+        return None
+
+    def get_transaction_count(self, request):
+        try:
+            count = int(request.query_params.get('transactions', self.default_transaction_count))
+        except ValueError:
+            count = self.default_transaction_count
+        return max(0, min(count, settings.TRANSACTION_MAX_PAGE_SIZE))
+
+    def get_family_data(self, request, family_id, count):
+        parts = self.get_family_parts(request, family_id, count)
+        return self.combine_family({name: part() for name, part in parts.items()})
+
+    def get_family_parts(self, request, family_id, count):
+        transactions = Transaction.objects.filter(
+            budget__family_id=family_id
+        ).select_related('budget').order_by('-date', '-created_at', '-id')[:count]
+        return {
+            'totals': lambda: family_totals(family_id),
+            'savings_progress': lambda: savings_progress(family_id),
+            'recent_transactions': lambda: serialize(TransactionSerializer(
+                transactions, many=True, context={'request': request}, expand=['budget']
+            )),
+        }
+
+    def combine_family(self, results):
+        totals = results['totals']
+        return {
+            'budget_utilization': budget_utilization(totals),
+            'budget_vs_actual': budget_vs_actual(totals),
+            'savings_progress': results['savings_progress'],
+            'recent_transactions': results['recent_transactions'],
         }
-        
-        return Response(budget_vs_actual)
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from .models import FamilyMembership
+
+ACCESS_CACHE_KEY = 'family_access:{user_id}'
+
+
+def _cache_key(user_id):
+    return ACCESS_CACHE_KEY.format(user_id=user_id)
+
+
+def get_family_roles(user):
+    """Return ``{family_id: role}`` for the families ``user`` is an accepted member of.
+
+    The mapping is cached per user and dropped by the FamilyMembership signal
+    handlers in families.signals whenever one of the user's memberships changes.
+
+    Users authenticated from their access token (users.authentication) carry
+    the mapping from the token, checked to be current.
+    """
+    token_roles = getattr(user, 'token_family_roles', None)
+    if token_roles is not None:
+        return token_roles
+
+    key = _cache_key(user.id)
+    roles = cache.get(key)
+    if roles is None:
+        roles = dict(
+            FamilyMembership.objects.filter(
+                user_id=user.id,
+                status='accepted'
+            ).values_list('family_id', 'role')
+        )
+        cache.set(key, roles, settings.FAMILY_ACCESS_CACHE_TIMEOUT)
+    return roles
+
+
+def get_family_ids(user):
+    return list(get_family_roles(user))
+
+
+def invalidate_family_access(*user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def has_membership(user, family_id, role=None):
+    try:
+        family_role = get_family_roles(user).get(int(family_id))
+    except (TypeError, ValueError):
+        return False
+    return family_role is not None and (role is None or family_role == role)
+
+
+def require_membership(user, family_id, role=None):
+    """Raise 404 unless ``user`` is an accepted member (with ``role``, if given) of the family."""
+    if not has_membership(user, family_id, role):
+        raise Http404('No FamilyMembership matches the given query.')
@@ -0,0 +1,84 @@
+"""
+Family invitations for many emails at once.
+
+``invite_users`` looks up the users behind all the emails, together with
+their membership of the family if they have one, in a single query. It then
+creates the new invitations with one INSERT and renews the rejected ones
+with one UPDATE. Neither sends the FamilyMembership signals, so the access
+caches and the family's data version are invalidated here. Pending
+invitations are not part of access tokens, so token versions stay as they are.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models import FilteredRelation, Q
+from django.utils import timezone
+from .access import invalidate_family_access
+from .models import FamilyMembership
+
+# Per-email results
+INVITED = 'invited'
+REINVITED = 'reinvited'
+ALREADY_MEMBER = 'already_member'
+ALREADY_INVITED = 'already_invited'
+UNKNOWN_USER = 'unknown_user'
+
+# Membership status -> result
+EXISTING_RESULTS = {
+    'accepted': ALREADY_MEMBER,
+    'pending': ALREADY_INVITED,
+    'rejected': REINVITED,
+}
+
+
+def invite_users(family, emails, invited_by):
+    """Invite the users with ``emails`` to ``family``.
+
+    Returns ``[{"email", "result"}]`` in the order of ``emails``, without
+    repeats.
+    """
+    from budgets.data_version import bump_data_version
+
+    emails = list(dict.fromkeys(emails))
+    users = get_user_model().objects.filter(email__in=emails).annotate(
+        membership=FilteredRelation('family_memberships', condition=Q(family_memberships__family=family))
+    ).values_list('email', 'id', 'membership__id', 'membership__status')
+    found = {email: (user_id, membership_id, status) for email, user_id, membership_id, status in users}
+
+    results = []
+    new_user_ids = []
+    rejected_ids = []
+    # Users whose memberships change
+    invited_user_ids = []
+    for email in emails:
+        if email not in found:
+            results.append({'email': email, 'result': UNKNOWN_USER})
+            continue
+        user_id, membership_id, status = found[email]
+        if membership_id is None:
+            new_user_ids.append(user_id)
+            results.append({'email': email, 'result': INVITED})
+        else:
+            if status == 'rejected':
+                rejected_ids.append(membership_id)
+            results.append({'email': email, 'result': EXISTING_RESULTS[status]})
+        if membership_id is None or status == 'rejected':
+            invited_user_ids.append(user_id)
+
+    if not invited_user_ids:
+        return results
+
+    # Independent statements: each of them can be repeated on its own
+    if new_user_ids:
+        # A concurrent invitation of the same user has the same effect
+        FamilyMembership.objects.bulk_create([
+            FamilyMembership(family=family, user_id=user_id, role='member', status='pending', invited_by=invited_by)
+            for user_id in new_user_ids
+        ], ignore_conflicts=True)
+    if rejected_ids:
+        FamilyMembership.objects.filter(id__in=rejected_ids, status='rejected').update(
+            status='pending', invited_by=invited_by, invited_at=timezone.now(), responded_at=None
+        )
+
+    invalidate_family_access(*invited_user_ids)
+    bump_data_version(family.id)
+    return results
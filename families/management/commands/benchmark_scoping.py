@@ -0,0 +1,125 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from budgets.models import Budget, Transaction, SavingsContribution
+from families.models import Family, FamilyMembership
+from families.scoping import scope_to_user
+
+User = get_user_model()
+
+
+def membership_exists(user, family_field='family'):
+    """Correlated ``EXISTS`` on the user's accepted membership, the alternative
+    to ``scope_to_user`` this command compares it with.
+    """
+    return Exists(FamilyMembership.objects.filter(
+        family_id=OuterRef('id' if family_field == 'id' else f'{family_field}_id'),
+        user=user,
+        status='accepted'
+    ))
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the query plans and timings of the old join-plus-DISTINCT membership '
+        'filters with the IN filter of families.scoping and a correlated EXISTS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of an existing user to benchmark against.')
+        parser.add_argument(
+            '--seed', type=int, nargs=3, metavar=('FAMILIES', 'BUDGETS', 'TRANSACTIONS'),
+            help='Seed a throwaway dataset (rolled back afterwards) with FAMILIES families of '
+                 'BUDGETS budgets of TRANSACTIONS transactions each, with several members per family.'
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the best time is reported.')
+        parser.add_argument('--no-explain', action='store_true', help='Only print timings.')
+
+    def handle(self, *args, **options):
+        if not options['user'] and not options['seed']:
+            raise CommandError('Pass --user or --seed.')
+
+        if options['seed']:
+            try:
+                with transaction.atomic():
+                    user = self.seed(*options['seed'])
+                    self.run(user, options)
+                    raise Rollback
+            except Rollback:
+                pass
+        else:
+            try:
+                user = User.objects.get(email=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist.")
+            self.run(user, options)
+
+    def seed(self, families, budgets, transactions):
+        from family_budget_2.testing import create_user, seed_family_data
+
+        user = create_user('benchmark.scoping@example.com', 'Benchmark')
+        self.stdout.write(f'Seeding {families} families x {budgets} budgets x {transactions} transactions...')
+        seed_family_data(user, families=families, budgets=budgets, transactions=transactions, members=4)
+        return user
+
+    def querysets(self, user):
+        """``(name, legacy, in_filter, exists)`` for each scoped list."""
+        legacy = {'family__memberships__user': user, 'family__memberships__status': 'accepted'}
+        return [
+            (
+                'families',
+                Family.objects.filter(memberships__user=user, memberships__status='accepted').distinct(),
+                scope_to_user(Family.objects.all(), user, 'id'),
+                Family.objects.filter(membership_exists(user, 'id')),
+            ),
+            (
+                'budgets',
+                Budget.objects.filter(**legacy).distinct(),
+                scope_to_user(Budget.objects.all(), user),
+                Budget.objects.filter(membership_exists(user)),
+            ),
+            (
+                'transactions',
+                Transaction.objects.filter(
+                    budget__family__memberships__user=user,
+                    budget__family__memberships__status='accepted'
+                ).distinct(),
+                scope_to_user(Transaction.objects.all(), user, 'budget__family'),
+                Transaction.objects.filter(membership_exists(user, 'budget__family')),
+            ),
+            (
+                'contributions',
+                SavingsContribution.objects.filter(
+                    savings_goal__family__memberships__user=user,
+                    savings_goal__family__memberships__status='accepted'
+                ).distinct(),
+                scope_to_user(SavingsContribution.objects.all(), user, 'savings_goal__family'),
+                SavingsContribution.objects.filter(membership_exists(user, 'savings_goal__family')),
+            ),
+        ]
+
+    def run(self, user, options):
+        for name, *variants in self.querysets(user):
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {name}'))
+            for label, queryset in zip(('join + DISTINCT', 'IN', 'EXISTS'), variants):
+                best, rows = self.time(queryset, options['repeat'])
+                self.stdout.write(f'{label:<16} {rows:>9} rows  {best * 1000:9.2f} ms')
+                if not options['no_explain']:
+                    for line in queryset.explain().splitlines():
+                        self.stdout.write(f'    {line}')
+
+    @staticmethod
+    def time(queryset, repeat):
+        best, rows = None, 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = len(list(queryset.values_list('id', flat=True)))
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, rows
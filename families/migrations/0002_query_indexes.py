@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('families', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='familymembership',
+            index=models.Index(fields=['user', 'status', 'family', 'role'], name='membership_user_access_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='familymembership',
+            index=models.Index(fields=['family', 'status', 'role'], name='membership_family_status_idx'),
+        ),
+    ]
@@ -18,10 +18,15 @@ class Family(models.Model):
     def __str__(self):
         return self.name
     
-    def delete_if_empty(self):
-        """Delete the family if there are no members left."""
+    def delete_if_empty(self, requested_by=None):
+        """Delete the family if there are no members left.
+        
+        A large family is deleted by a job afterwards (see budgets.deletion).
+        """
+        from budgets.deletion import delete_family
+        
         if not self.memberships.filter(status='accepted').exists():
-            self.delete()
+            delete_family(self, requested_by=requested_by)
             return True
         return False
 
@@ -61,6 +66,12 @@ class FamilyMembership(models.Model):
     
     class Meta:
         unique_together = ('family', 'user')
+        indexes = [
+            # Covers the per-user access lookup (families.access) and the invitation list
+            models.Index(fields=['user', 'status', 'family', 'role'], name='membership_user_access_idx'),
+            # Member lists and admin counts of a family
+            models.Index(fields=['family', 'status', 'role'], name='membership_family_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user} in {self.family} ({self.get_status_display()})"
@@ -78,6 +89,6 @@ class FamilyMembership(models.Model):
         
         # If the user is the creator, delete the family if it's empty
         if is_creator:
-            return family.delete_if_empty()
+            return family.delete_if_empty(requested_by=self.user)
         
         return False
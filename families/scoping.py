@@ -0,0 +1,15 @@
+from .access import get_family_ids
+
+
+def scope_to_user(queryset, user, family_field='family'):
+    """Restrict ``queryset`` to rows of the families ``user`` belongs to.
+
+    ``family_field`` is the lookup path from the queryset's model to its
+    family, e.g. ``'budget__family'`` for transactions or ``'id'`` for
+    families. Access is expressed as ``family_id IN (...)`` over the user's
+    cached family ids (see families.access), which never multiplies rows, so
+    no ``DISTINCT`` is needed and no membership query runs once the ids are
+    cached. A user without families gets an empty queryset without a query.
+    """
+    lookup = 'id__in' if family_field == 'id' else f'{family_field}_id__in'
+    return queryset.filter(**{lookup: get_family_ids(user)})
@@ -1,10 +1,15 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Family, FamilyMembership
 from users.serializers import UserSerializer
+from family_budget_2.expansion import ExpandableFieldsMixin
 
 
-class FamilySerializer(serializers.ModelSerializer):
-    created_by = UserSerializer(read_only=True)
+class FamilySerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    expandable_fields = {
+        'created_by': UserSerializer,
+    }
     
     class Meta:
         model = Family
@@ -27,10 +32,15 @@ class FamilySerializer(serializers.ModelSerializer):
         return family
 
 
-class FamilyMembershipSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
-    invited_by = UserSerializer(read_only=True)
-    family = FamilySerializer(read_only=True)
+class FamilyMembershipSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    invited_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    family = serializers.PrimaryKeyRelatedField(read_only=True)
+    expandable_fields = {
+        'user': UserSerializer,
+        'invited_by': UserSerializer,
+        'family': FamilySerializer,
+    }
     
     class Meta:
         model = FamilyMembership
@@ -39,18 +49,16 @@ class FamilyMembershipSerializer(serializers.ModelSerializer):
 
 
 class FamilyInvitationSerializer(serializers.Serializer):
+    # The user is looked up along with their membership (families.invitations)
     email = serializers.EmailField(required=True)
-    
-    def validate_email(self, value):
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        
-        try:
-            User.objects.get(email=value)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("User with this email does not exist.")
-        
-        return value
+
+
+class FamilyBulkInvitationSerializer(serializers.Serializer):
+    emails = serializers.ListField(
+        child=serializers.EmailField(),
+        allow_empty=False,
+        max_length=settings.FAMILY_INVITATION_MAX_EMAILS
+    )
 
 
 class FamilyInvitationResponseSerializer(serializers.Serializer):
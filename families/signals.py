@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import FamilyMembership
+from users.authentication import bump_token_versions
+from .access import invalidate_family_access
+
+
+@receiver(post_save, sender=FamilyMembership)
+@receiver(post_delete, sender=FamilyMembership)
+def invalidate_member_access(sender, instance, **kwargs):
+    # Covers invitations, accept/reject, promotion, removal, leaving, and the
+    # cascade from Family.delete(). Families deleted through budgets.deletion
+    # send no signals and invalidate their members' access themselves
+    invalidate_family_access(instance.user_id)
+
+
+@receiver(post_save, sender=FamilyMembership)
+@receiver(post_delete, sender=FamilyMembership)
+def bump_member_token_version(sender, instance, signal, **kwargs):
+    # Access tokens list the user's accepted families and roles. Pending and
+    # rejected invitations are not part of them
+    if signal is post_delete or instance.status == 'accepted':
+        bump_token_versions(instance.user_id)
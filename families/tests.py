@@ -1,3 +1,176 @@
-from django.test import TestCase
+from rest_framework.test import APITestCase
+from family_budget_2.testing import EndpointBenchmarkMixin, create_user, seed_family_data
+from .models import Family, FamilyMembership
 
-# Create your tests here.
+
+class FamilyEndpointPerformanceTests(EndpointBenchmarkMixin, APITestCase):
+    """Query-count budgets for every route in families/urls.py."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.small_user = create_user('small@example.com', 'Small')
+        cls.large_user = create_user('large@example.com', 'Large')
+        cls.small_family = seed_family_data(cls.small_user, members=1)[0]
+        cls.large_family = seed_family_data(
+            cls.large_user, families=4, budgets=4, transactions=10, members=6
+        )[0]
+        cls.invitee = create_user('invitee@example.com', 'Invitee')
+        for family in Family.objects.all():
+            FamilyMembership.objects.create(
+                family=family, user=cls.invitee, status='pending', invited_by=family.created_by
+            )
+
+    def cases(self, url_for):
+        return [
+            ('small', self.small_user, url_for(self.small_family)),
+            ('large', self.large_user, url_for(self.large_family)),
+        ]
+
+    def member_of(self, family):
+        return FamilyMembership.objects.filter(family=family, role='member', status='accepted').first()
+
+    def test_family_list(self):
+        self.assertFlatQueries('family-list', 'get', self.cases(lambda family: '/api/families/'), 2)
+
+    def test_family_detail(self):
+        self.assertFlatQueries('family-detail', 'get', self.cases(lambda family: f'/api/families/{family.id}/'), 2)
+
+    def test_family_members(self):
+        self.assertFlatQueries(
+            'family-member-list', 'get', self.cases(lambda family: f'/api/families/{family.id}/members/'), 2
+        )
+
+    def test_user_invitations(self):
+        self.authenticate(self.invitee)
+        self.assertMaxQueries('user-invitations', 'get', '/api/families/invitations/', 2)
+
+    def test_family_write_endpoints(self):
+        self.authenticate(self.large_user)
+        # Includes marking the creator's access tokens stale (users.authentication)
+        response = self.assertMaxQueries('family-create', 'post', '/api/families/', 4, data={
+            'name': 'New family', 'description': 'Created by the benchmark',
+        }, expected_status=201)
+        family_id = response.data['id']
+        # Includes re-reading the access cache the create invalidated
+        self.assertMaxQueries('family-update', 'put', f'/api/families/{family_id}/', 4, data={
+            'name': 'Renamed family',
+        })
+        # Memberships are loaded once to invalidate the members' access caches
+        # and tokens, then one DELETE per table of the family's tree, however
+        # many rows it has (budgets.deletion)
+        self.assertMaxQueries('family-delete', 'delete', f'/api/families/{family_id}/', 12,
+                              expected_status=204)
+
+    def test_invitation_flow(self):
+        invitee = create_user('new.member@example.com', 'New')
+        self.authenticate(self.large_user)
+        # The user and their membership are looked up with one query (families.invitations)
+        self.assertMaxQueries('family-invite', 'post', f'/api/families/{self.large_family.id}/invite/', 4, data={
+            'email': invitee.email,
+        }, expected_status=201)
+
+        invitation = FamilyMembership.objects.get(family=self.large_family, user=invitee)
+        self.authenticate(invitee)
+        self.assertMaxQueries('invitation-response', 'post',
+                              f'/api/families/invitations/{invitation.id}/respond/', 4,
+                              data={'response': 'accept'})
+
+        self.authenticate(self.large_user)
+        # Membership writes also mark the member's access tokens stale
+        self.assertMaxQueries('promote-member', 'post',
+                              f'/api/families/{self.large_family.id}/members/{invitation.id}/promote/', 6)
+        self.assertMaxQueries('remove-family-member', 'delete',
+                              f'/api/families/{self.large_family.id}/members/{invitation.id}/', 6,
+                              expected_status=204)
+
+    def test_bulk_invitations(self):
+        url = f'/api/families/{self.large_family.id}/invite/bulk/'
+        new_users = [create_user(f'bulk{index}@example.com', 'Bulk') for index in range(4)]
+        rejected = create_user('rejected@example.com', 'Rejected')
+        FamilyMembership.objects.create(
+            family=self.large_family, user=rejected, status='rejected', invited_by=self.large_user
+        )
+        member = self.member_of(self.large_family).user
+        self.authenticate(self.large_user)
+
+        response = self.assertMaxQueries('family-bulk-invite-small', 'post', url, 4, data={
+            'emails': [new_users[0].email],
+        })
+        self.assertEqual(response.data['results'], [{'email': new_users[0].email, 'result': 'invited'}])
+        # Resolving more emails costs no more queries
+        response = self.assertMaxQueries('family-bulk-invite-large', 'post', url, 5, data={'emails': [
+            new_users[1].email, new_users[2].email, new_users[3].email, rejected.email, self.invitee.email,
+            member.email, 'nobody@example.com', new_users[1].email,
+        ]})
+        self.assertEqual([(row['email'], row['result']) for row in response.data['results']], [
+            (new_users[1].email, 'invited'),
+            (new_users[2].email, 'invited'),
+            (new_users[3].email, 'invited'),
+            (rejected.email, 'reinvited'),
+            (self.invitee.email, 'already_invited'),
+            (member.email, 'already_member'),
+            ('nobody@example.com', 'unknown_user'),
+        ])
+        invitations = FamilyMembership.objects.filter(
+            family=self.large_family, user__in=new_users + [rejected]
+        )
+        self.assertEqual({(row.status, row.role, row.invited_by_id, row.responded_at) for row in invitations},
+                         {('pending', 'member', self.large_user.id, None)})
+
+        self.authenticate(rejected)
+        self.assertEqual([row['family'] for row in self.client.get('/api/families/invitations/').data],
+                         [self.large_family.id])
+
+        self.authenticate(self.large_user)
+        for data in ({'emails': []}, {'emails': ['not an email']}, {}):
+            self.assertEqual(self.client.post(url, data, format='json').status_code, 400, data)
+        # The single invitation refuses what the bulk one reports
+        single = f'/api/families/{self.large_family.id}/invite/'
+        response = self.client.post(single, {'email': 'nobody@example.com'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.data)
+        self.assertEqual(self.client.post(single, {'email': member.email}, format='json').status_code, 400)
+
+    def test_leave_family(self):
+        member = self.member_of(self.large_family)
+        self.authenticate(member.user)
+        self.assertMaxQueries('leave-family', 'delete', f'/api/families/{self.large_family.id}/leave/', 7)
+        self.assertFalse(FamilyMembership.objects.filter(id=member.id).exists())
+
+    def test_access_cache_follows_membership_changes(self):
+        invitee = create_user('cached.member@example.com', 'Cached')
+        invitation = FamilyMembership.objects.create(
+            family=self.large_family, user=invitee, invited_by=self.large_user
+        )
+        self.authenticate(invitee)
+        url = f'/api/families/{self.large_family.id}/'
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        invitation.status = 'accepted'
+        invitation.save()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        invitation.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_etags_follow_family_and_member_changes(self):
+        self.authenticate(self.large_user)
+        url = f'/api/families/{self.large_family.id}/members/'
+        etag = self.client.get(url)['ETag']
+
+        # The user comes from the access token: nothing is loaded before answering
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        member = self.member_of(self.large_family).user
+        member.first_name = 'Renamed'
+        member.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = self.client.get('/api/families/')['ETag']
+        Family.objects.filter(id=self.large_family.id).first().save()
+        self.assertEqual(self.client.get('/api/families/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import (
     FamilyListCreateView, FamilyDetailView, FamilyMemberListView,
-    FamilyInvitationView, UserInvitationsListView, InvitationResponseView,
+    FamilyInvitationView, FamilyBulkInvitationView, UserInvitationsListView, InvitationResponseView,
     RemoveFamilyMemberView, LeaveFamilyView, PromoteMemberToAdminView
 )
 
@@ -10,6 +10,7 @@ urlpatterns = [
     path('<int:pk>/', FamilyDetailView.as_view(), name='family-detail'),
     path('<int:family_id>/members/', FamilyMemberListView.as_view(), name='family-member-list'),
     path('<int:family_id>/invite/', FamilyInvitationView.as_view(), name='family-invite'),
+    path('<int:family_id>/invite/bulk/', FamilyBulkInvitationView.as_view(), name='family-bulk-invite'),
     path('<int:family_id>/members/<int:member_id>/', RemoveFamilyMemberView.as_view(), name='remove-family-member'),
     path('<int:family_id>/members/<int:member_id>/promote/', PromoteMemberToAdminView.as_view(), name='promote-member'),
     path('<int:family_id>/leave/', LeaveFamilyView.as_view(), name='leave-family'),
@@ -4,114 +4,88 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.contrib.auth import get_user_model
+from budgets.deletion import delete_family
+from budgets.serializers import DeletionJobSerializer
+from family_budget_2.conditional import ConditionalGetMixin
+from family_budget_2.expansion import ExpandableQuerysetMixin
+from family_budget_2.metrics import SerializerMetricsMixin, serialize
 from .models import Family, FamilyMembership
+from .access import require_membership
+from .scoping import scope_to_user
 from .serializers import (
     FamilySerializer, FamilyMembershipSerializer,
-    FamilyInvitationSerializer, FamilyInvitationResponseSerializer
+    FamilyInvitationSerializer, FamilyBulkInvitationSerializer, FamilyInvitationResponseSerializer
 )
+from .invitations import ALREADY_INVITED, ALREADY_MEMBER, UNKNOWN_USER, invite_users
 
-User = get_user_model()
 
-
-class FamilyListCreateView(generics.ListCreateAPIView):
+class FamilyListCreateView(ConditionalGetMixin, ExpandableQuerysetMixin,
+                           SerializerMetricsMixin, generics.ListCreateAPIView):
     serializer_class = FamilySerializer
     
     def get_queryset(self):
         # Return families where the user is a member with accepted status
-        return Family.objects.filter(
-            memberships__user=self.request.user,
-            memberships__status='accepted'
-        ).distinct()
+        queryset = scope_to_user(Family.objects.all(), self.request.user, 'id')
+        return self.expand_queryset(queryset)
 
 
-class FamilyDetailView(generics.RetrieveUpdateDestroyAPIView):
+class FamilyDetailView(ConditionalGetMixin, ExpandableQuerysetMixin,
+                       SerializerMetricsMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = FamilySerializer
     
     def get_queryset(self):
         # Return families where the user is a member with accepted status
-        return Family.objects.filter(
-            memberships__user=self.request.user,
-            memberships__status='accepted'
-        )
+        queryset = scope_to_user(Family.objects.all(), self.request.user, 'id')
+        return self.expand_queryset(queryset)
     
-    def perform_destroy(self, instance):
+    def destroy(self, request, *args, **kwargs):
+        instance = self.get_object()
         # Only allow the creator to delete the family
-        if instance.created_by != self.request.user:
-            self.permission_denied(self.request, message="Only the creator can delete the family.")
+        if instance.created_by_id != request.user.id:
+            self.permission_denied(request, message="Only the creator can delete the family.")
         
-        instance.delete()
+        # Large families are deleted by a job; the response tells how to follow it
+        job = delete_family(instance, requested_by=request.user)
+        if job is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(serialize(DeletionJobSerializer(job)), status=status.HTTP_202_ACCEPTED)
 
 
-class FamilyMemberListView(generics.ListAPIView):
+class FamilyMemberListView(ConditionalGetMixin, ExpandableQuerysetMixin, SerializerMetricsMixin, generics.ListAPIView):
     serializer_class = FamilyMembershipSerializer
     
     def get_queryset(self):
         family_id = self.kwargs.get('family_id')
         # Check if user is a member of the family
-        get_object_or_404(
-            FamilyMembership,
-            family_id=family_id,
-            user=self.request.user,
-            status='accepted'
-        )
+        require_membership(self.request.user, family_id)
         
-        return FamilyMembership.objects.filter(
+        return self.expand_queryset(FamilyMembership.objects.filter(
             family_id=family_id,
             status='accepted'
-        )
+        ))
 
 
 class FamilyInvitationView(APIView):
+    # Reasons an invitation is refused
+    errors = {
+        UNKNOWN_USER: {"email": ["User with this email does not exist."]},
+        ALREADY_MEMBER: {"detail": "User is already a member of this family."},
+        ALREADY_INVITED: {"detail": "User already has a pending invitation to this family."},
+    }
+    
     def post(self, request, family_id):
         # Check if user is an admin of the family
         family = get_object_or_404(Family, id=family_id)
-        membership = get_object_or_404(
-            FamilyMembership,
-            family=family,
-            user=request.user,
-            status='accepted',
-            role='admin'
-        )
+        require_membership(request.user, family.id, role='admin')
         
         serializer = FamilyInvitationSerializer(data=request.data)
         if serializer.is_valid():
             email = serializer.validated_data['email']
-            invited_user = User.objects.get(email=email)
+            # Creates the invitation, or renews a rejected one
+            [result] = invite_users(family, [email], request.user)
             
-            # Check if user is already a member or has a pending invitation
-            existing_membership = FamilyMembership.objects.filter(
-                family=family,
-                user=invited_user
-            ).first()
-            
-            if existing_membership:
-                if existing_membership.status == 'accepted':
-                    return Response(
-                        {"detail": "User is already a member of this family."},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                elif existing_membership.status == 'pending':
-                    return Response(
-                        {"detail": "User already has a pending invitation to this family."},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                else:  # rejected
-                    # Update the rejected invitation to pending
-                    existing_membership.status = 'pending'
-                    existing_membership.invited_by = request.user
-                    existing_membership.invited_at = timezone.now()
-                    existing_membership.responded_at = None
-                    existing_membership.save()
-            else:
-                # Create a new invitation
-                FamilyMembership.objects.create(
-                    family=family,
-                    user=invited_user,
-                    role='member',
-                    status='pending',
-                    invited_by=request.user
-                )
+            if result['result'] in self.errors:
+                return Response(self.errors[result['result']], status=status.HTTP_400_BAD_REQUEST)
             
             return Response(
                 {"detail": f"Invitation sent to {email}."},
@@ -121,14 +95,29 @@ class FamilyInvitationView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserInvitationsListView(generics.ListAPIView):
+class FamilyBulkInvitationView(APIView):
+    """Invite many users at once; the response has a result per email
+    (see families.invitations).
+    """
+    def post(self, request, family_id):
+        family = get_object_or_404(Family, id=family_id)
+        require_membership(request.user, family.id, role='admin')
+        
+        serializer = FamilyBulkInvitationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = invite_users(family, serializer.validated_data['emails'], request.user)
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+class UserInvitationsListView(ExpandableQuerysetMixin, SerializerMetricsMixin, generics.ListAPIView):
+    # No ETag: pending invitations come from families the user is not a member of
     serializer_class = FamilyMembershipSerializer
     
     def get_queryset(self):
-        return FamilyMembership.objects.filter(
+        return self.expand_queryset(FamilyMembership.objects.filter(
             user=self.request.user,
             status='pending'
-        )
+        ))
 
 
 class InvitationResponseView(APIView):
@@ -164,13 +153,7 @@ class RemoveFamilyMemberView(APIView):
     def delete(self, request, family_id, member_id):
         # Check if user is an admin of the family
         family = get_object_or_404(Family, id=family_id)
-        admin_membership = get_object_or_404(
-            FamilyMembership,
-            family=family,
-            user=request.user,
-            status='accepted',
-            role='admin'
-        )
+        require_membership(request.user, family.id, role='admin')
         
         # Get the membership to remove
         membership_to_remove = get_object_or_404(
@@ -250,13 +233,7 @@ class PromoteMemberToAdminView(APIView):
     def post(self, request, family_id, member_id):
         # Check if user is an admin of the family
         family = get_object_or_404(Family, id=family_id)
-        admin_membership = get_object_or_404(
-            FamilyMembership,
-            family=family,
-            user=request.user,
-            status='accepted',
-            role='admin'
-        )
+        require_membership(request.user, family.id, role='admin')
         
         # Get the membership to promote
         membership_to_promote = get_object_or_404(
@@ -0,0 +1,112 @@
+"""
+Async DRF views and concurrent execution of independent ORM queries.
+
+DRF's ``APIView`` only dispatches to synchronous handlers. ``AsyncViewMixin``
+gives a view ``async def`` handlers: authentication, permissions and
+throttling still run through DRF (in a worker thread, as they may query
+the database), then the handler is awaited on the event loop.
+
+``gather_parts`` runs independent, synchronous pieces of work (typically one
+query each) at the same time, each in a worker thread with its own database
+connection, so a response waits for the slowest query instead of the sum of
+all of them. ``run_in_worker`` does the same for a single call. The pool
+has ``ASYNC_DB_WORKERS`` threads, which bounds both the queries in flight
+and the connections they open.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, close_old_connections
+from django.utils.decorators import classonlymethod
+
+
+class AsyncViewMixin:
+    """Mixin for ``APIView`` subclasses whose handlers are coroutines."""
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Django only marks the view async when every handler is a coroutine
+        if not cls.view_is_async:
+            raise TypeError(f'{cls.__name__} mixes sync and async handlers.')
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Same steps as APIView.dispatch, awaiting the handler
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authentication may load the user
+            await run_in_worker(lambda: self.initial(request, *args, **kwargs))
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def options(self, request, *args, **kwargs):
+        return await sync_to_async(super().options)(request, *args, **kwargs)
+
+
+@cache
+def _worker_pool():
+    return ThreadPoolExecutor(max_workers=settings.ASYNC_DB_WORKERS, thread_name_prefix='db-worker')
+
+
+def _run_on_worker_connection(function, *args):
+    try:
+        return function(*args)
+    finally:
+        # Worker threads outlive the request: release their connection
+        # once it is past CONN_MAX_AGE, as request_finished would
+        close_old_connections()
+
+
+async def _call_in_worker(function, *args):
+    return await sync_to_async(
+        _run_on_worker_connection, thread_sensitive=False, executor=_worker_pool()
+    )(function, *args)
+
+
+async def _outside_transaction():
+    return not await sync_to_async(lambda: connection.in_atomic_block)()
+
+
+async def run_in_worker(function, *args):
+    """Call ``function(*args)`` in a worker thread with its own database
+    connection, so that the event loop and other requests are not held up.
+
+    Inside a transaction (tests, or a caller wrapped in ``atomic``) it runs
+    on the caller's connection instead: other connections would not see its
+    uncommitted writes.
+    """
+    if await _outside_transaction():
+        return await _call_in_worker(function, *args)
+    return await sync_to_async(function)(*args)
+
+
+async def gather_parts(parts):
+    """Run ``{name: callable}`` concurrently and return ``{name: result}``.
+
+    Inside a transaction the parts run one after the other on the caller's
+    connection, as in ``run_in_worker``.
+    """
+    if await _outside_transaction():
+        results = await asyncio.gather(*(_call_in_worker(part) for part in parts.values()))
+        return dict(zip(parts, results))
+
+    return await sync_to_async(lambda: {name: part() for name, part in parts.items()})()
@@ -0,0 +1,69 @@
+"""
+Conditional GET (``ETag`` / ``If-None-Match``) for the family-scoped API views.
+
+A response's ETag is derived from everything it can depend on: the user,
+the URL with its query string, the negotiated format, the current day and
+the data versions of the user's families (budgets.data_version). All of
+these are already in memory or in the cache, so a request whose ETag
+matches is answered with 304 Not Modified before the view queries the
+database or runs a serializer.
+"""
+
+import hashlib
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from budgets.data_version import get_data_versions
+from families.access import get_family_ids
+
+
+class NotModified(Exception):
+    """Raised from ``initial`` to skip the handler of a matching request."""
+
+
+class ConditionalGetMixin:
+    """APIView mixin adding strong ETags and 304 responses to GET / HEAD.
+
+    Only for views whose responses are determined by the requesting user's
+    accepted families.
+    """
+    etag = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD'):
+            self.etag = self.get_etag(request)
+            # Weak comparison, as If-None-Match requires (proxies that compress
+            # the body mark the ETag weak)
+            if_none_match = {etag.removeprefix('W/') for etag in parse_etags(request.headers.get('If-None-Match', ''))}
+            if '*' in if_none_match or self.etag in if_none_match:
+                raise NotModified
+
+    def get_etag(self, request):
+        family_ids = sorted(get_family_ids(request.user))
+        versions = get_data_versions(family_ids)
+        parts = [
+            str(request.user.pk),
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            # Budgets report their current period
+            timezone.localdate().isoformat(),
+            *(f'{family_id}:{versions[family_id]}' for family_id in family_ids),
+        ]
+        return quote_etag(hashlib.md5('|'.join(parts).encode(), usedforsecurity=False).hexdigest())
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.etag and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = self.etag
+            # Browsers keep the response and revalidate it on every use
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Authorization',))
+        return response
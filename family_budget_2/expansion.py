@@ -0,0 +1,106 @@
+"""
+Sparse fieldsets (``?fields=``) and opt-in expansion (``?expand=``) of related
+objects for the API serializers.
+
+Related objects are rendered as plain primary keys unless the client asks
+for them, e.g. ``?expand=budget,budget.family`` on the transaction list, and
+views join only the relations that were actually expanded.
+"""
+
+from django.utils.module_loading import import_string
+
+
+def parse_expand(values):
+    """Turn ``['budget', 'budget.family', 'created_by']`` into
+    ``{'budget': ['family'], 'created_by': []}``.
+    """
+    tree = {}
+    for value in values or []:
+        name, _, rest = value.strip().partition('.')
+        if not name:
+            continue
+        tree.setdefault(name, [])
+        if rest:
+            tree[name].append(rest)
+    return tree
+
+
+def split_param(request, name):
+    if request is None or name not in request.query_params:
+        return None
+    return [value for value in request.query_params[name].split(',') if value.strip()]
+
+
+def field_requested(request, name):
+    """Whether ``name`` is part of the response under the request's ``?fields=``."""
+    fields = split_param(request, 'fields')
+    return fields is None or name in {field.strip() for field in fields}
+
+
+class ExpandableFieldsMixin:
+    """Serializer mixin implementing ``fields`` and ``expand``.
+
+    ``expandable_fields`` maps the name of a model relation to the serializer
+    class (or its dotted path) rendering the expanded object. The declared
+    field of the same name is what is rendered when the field is not
+    expanded, normally a read-only ``PrimaryKeyRelatedField``.
+
+    Top-level serializers read the options from the request query parameters;
+    nested serializers get them from their parent.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is None and expand is None:
+            request = self.context.get('request')
+            fields = split_param(request, 'fields')
+            expand = split_param(request, 'expand')
+
+        for name, nested_expand in parse_expand(expand).items():
+            if name in self.expandable_fields:
+                serializer_class = self.get_expanded_serializer_class(name)
+                options = {'expand': nested_expand} if issubclass(serializer_class, ExpandableFieldsMixin) else {}
+                self.fields[name] = serializer_class(read_only=True, **options)
+
+        if fields is not None:
+            allowed = {name.strip() for name in fields}
+            for name in list(self.fields):
+                if name not in allowed and not self.fields[name].write_only:
+                    self.fields.pop(name)
+
+    @classmethod
+    def get_expanded_serializer_class(cls, name):
+        serializer_class = cls.expandable_fields[name]
+        if isinstance(serializer_class, str):
+            serializer_class = import_string(serializer_class)
+        return serializer_class
+
+    @classmethod
+    def get_select_related(cls, expand, prefix=''):
+        """Return the ``select_related`` paths needed to render ``expand``."""
+        paths = []
+        for name, nested_expand in parse_expand(expand).items():
+            if name not in cls.expandable_fields:
+                continue
+            path = f"{prefix}{name}"
+            paths.append(path)
+            serializer_class = cls.get_expanded_serializer_class(name)
+            if hasattr(serializer_class, 'get_select_related'):
+                paths.extend(serializer_class.get_select_related(nested_expand, f"{path}__"))
+        return paths
+
+
+class ExpandableQuerysetMixin:
+    """View mixin joining the relations the request expands."""
+
+    def expand_queryset(self, queryset):
+        serializer_class = self.get_serializer_class()
+        expand = split_param(self.request, 'expand')
+        if not expand or not hasattr(serializer_class, 'get_select_related'):
+            return queryset
+        return queryset.select_related(*serializer_class.get_select_related(expand))
+
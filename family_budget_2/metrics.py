@@ -0,0 +1,319 @@
+"""
+Per-request performance metrics for the API.
+
+``RequestMetricsMiddleware`` measures every ``/api/`` request: the number of
+queries and the time spent in them, the time spent serializing the response
+(building ``serializer.data``, see ``SerializerMetricsMixin``, and rendering
+it with the negotiated DRF renderer) and the response size. It
+reports them to the client in a ``Server-Timing`` header, which browsers show
+in the network panel::
+
+    Server-Timing: db;dur=4.1;desc="3 queries", serialize;dur=0.8, app;dur=6.2, total;dur=11.1
+
+and adds them to per-endpoint histograms, labelled with the view and its
+action (``BudgetListCreateView.list``). ``metrics_view`` exposes the
+histograms in the Prometheus text format to the addresses in
+``METRICS_ALLOWED_NETWORKS``.
+
+Queries are attributed to the request through a context variable, so the
+queries the async views run in worker threads count as well. Histograms are
+kept per process: with several gunicorn workers every scrape reports the
+worker that answered it, told apart by the ``pid`` label.
+"""
+
+import ipaddress
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# DRF action names of the generic views' handlers, in lookup order
+ACTIONS = {
+    'get': ('list', 'retrieve'),
+    'post': ('create',),
+    'put': ('update',),
+    'patch': ('partial_update',),
+    'delete': ('destroy',),
+}
+
+_current = ContextVar('request_metrics', default=None)
+_serializing = ContextVar('serializing', default=False)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self._lock = threading.Lock()
+
+    def add_query(self, duration):
+        # Parts of an async view run their queries in parallel threads
+        with self._lock:
+            self.query_count += 1
+            self.db_time += duration
+
+    def add_serialize_time(self, duration):
+        with self._lock:
+            self.serialize_time += duration
+
+
+@contextmanager
+def serializing():
+    """Count the time spent in the block as serialization, less the queries
+    run in it, which count as database time. Nested blocks count once, as
+    part of the outermost one.
+    """
+    metrics = _current.get()
+    if metrics is None or _serializing.get():
+        yield
+        return
+    token = _serializing.set(True)
+    started = time.perf_counter()
+    db_time = metrics.db_time
+    try:
+        yield
+    finally:
+        _serializing.reset(token)
+        duration = time.perf_counter() - started - (metrics.db_time - db_time)
+        # Queries of parallel parts can land within the block
+        metrics.add_serialize_time(max(duration, 0))
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(time.perf_counter() - started)
+
+
+def _install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(_install_query_recorder)
+
+
+def serialize(serializer):
+    """``serializer.data``, timed as serialization."""
+    with serializing():
+        return serializer.data
+
+
+class SerializerMetricsMixin:
+    """Mixin for generic views timing the response data of their serializer,
+    whatever its class, as serialization.
+
+    The data of a serializer built to render objects is produced (and cached
+    by the serializer) as soon as it is created; after a write, once the
+    object is saved.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if 'data' not in kwargs:
+            serialize(serializer)
+        return serializer
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        serialize(serializer)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        serialize(serializer)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> [count per bucket..., +Inf count, sum]
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def exposition(self, label_names, extra_labels=''):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self.series.items()):
+            label_text = ','.join(f'{name}="{value}"' for name, value in zip(label_names, labels)) + extra_labels
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {series[-2]}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {series[-1]:.6f}')
+            lines.append(f'{self.name}_count{{{label_text}}} {series[-2]}')
+        return lines
+
+
+class Registry:
+    label_names = ('endpoint', 'method')
+
+    def __init__(self):
+        self.histograms = {
+            'duration': Histogram('api_request_duration_seconds', 'Time to produce the response.', DURATION_BUCKETS),
+            'db_time': Histogram('api_request_db_seconds', 'Time spent in database queries.', DURATION_BUCKETS),
+            'queries': Histogram('api_request_queries', 'Database queries per request.', QUERY_BUCKETS),
+            'serialize': Histogram('api_request_serialize_seconds', 'Time spent serializing and rendering the response.', DURATION_BUCKETS),
+            'size': Histogram('api_response_size_bytes', 'Size of the response body.', SIZE_BUCKETS),
+        }
+        self.status_counts = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, status_code, values):
+        with self._lock:
+            for name, value in values.items():
+                self.histograms[name].observe(labels, value)
+            key = labels + (str(status_code),)
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+
+    def exposition(self):
+        extra_labels = f',pid="{os.getpid()}"'
+        with self._lock:
+            lines = []
+            for histogram in self.histograms.values():
+                lines.extend(histogram.exposition(self.label_names, extra_labels))
+            lines += ['# HELP api_requests_total Responses by status code.', '# TYPE api_requests_total counter']
+            for (endpoint, method, status_code), count in sorted(self.status_counts.items()):
+                lines.append(
+                    f'api_requests_total{{endpoint="{endpoint}",method="{method}",status="{status_code}"{extra_labels}}} {count}'
+                )
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self._lock:
+            for histogram in self.histograms.values():
+                histogram.series.clear()
+            self.status_counts.clear()
+
+
+registry = Registry()
+
+
+def endpoint_name(request):
+    """``ViewClass.action`` of the view that handled ``request``."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view_class = getattr(match.func, 'view_class', None)
+    if view_class is None:
+        return match.view_name or 'unknown'
+    method = request.method.lower()
+    action = next((name for name in ACTIONS.get(method, ()) if hasattr(view_class, name)), method)
+    return f'{view_class.__name__}.{action}'
+
+
+class RequestMetricsMiddleware:
+    """Measures ``/api/`` requests; see the module docstring."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        metrics = self.start(request)
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not request.path.startswith('/api/'):
+            return await self.get_response(request)
+
+        metrics = self.start(request)
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def start(self, request):
+        # Connections opened before this module was imported
+        _install_query_recorder(connection)
+        request.metrics = RequestMetrics()
+        return request.metrics
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                metrics.add_serialize_time(time.perf_counter() - started)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        app = max(total - metrics.db_time - metrics.serialize_time, 0)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.query_count} queries"',
+            f'serialize;dur={metrics.serialize_time * 1000:.1f}',
+            f'app;dur={app * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        values = {
+            'duration': total,
+            'db_time': metrics.db_time,
+            'queries': metrics.query_count,
+            'serialize': metrics.serialize_time,
+        }
+        # Streamed bodies (the CSV export) are produced after this point
+        if not response.streaming:
+            values['size'] = len(response.content)
+        registry.observe((endpoint_name(request), request.method), response.status_code, values)
+        return response
+
+
+def _allowed(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+def metrics_view(request):
+    """The histograms in the Prometheus text format, for local scrapers only."""
+    if not _allowed(request.META.get('REMOTE_ADDR', '')):
+        raise Http404
+    return HttpResponse(registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -48,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that its timings cover the other middleware
+    'family_budget_2.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -103,6 +105,49 @@ else:
         }
     }
 
+# Persistent connections: each worker thread keeps its connection for
+# DB_CONN_MAX_AGE seconds instead of connecting to PostgreSQL on every
+# request (0 restores a connection per request). With health checks a
+# connection that broke since the previous request is replaced before use.
+# Every gunicorn thread (and ASYNC_DB_WORKERS thread) holds one connection:
+# keep workers x threads below the server's max_connections.
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# The local-memory cache is per process: with several workers, point
+# CACHE_BACKEND/CACHE_LOCATION at a shared cache so that invalidations reach
+# every worker. Family data versions never expire, so a worker with its own
+# cache would serve stale analytics and 304s indefinitely; docker-compose.yml
+# runs Redis (django.core.cache.backends.redis.RedisCache).
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'family-budget'),
+    }
+}
+
+# Seconds a user's accessible families stay cached. Membership changes drop
+# the entry right away; the timeout bounds staleness across processes that
+# do not share the cache.
+FAMILY_ACCESS_CACHE_TIMEOUT = int(os.environ.get('FAMILY_ACCESS_CACHE_TIMEOUT', '60'))
+
+# Emails accepted by one bulk invitation request (families.invitations)
+FAMILY_INVITATION_MAX_EMAILS = int(os.environ.get('FAMILY_INVITATION_MAX_EMAILS', '100'))
+
+# Seconds cached analytics results are kept. They are invalidated by the
+# family's data version, so this only bounds how long unused entries live.
+FAMILY_RESULT_CACHE_TIMEOUT = int(os.environ.get('FAMILY_RESULT_CACHE_TIMEOUT', '86400'))
+
+# Seconds a user's token version stays cached. Read requests trust the
+# claims of an access token of that version without querying the user, so
+# with caches that are not shared this bounds how long another process keeps
+# accepting tokens from before a password or membership change.
+TOKEN_VERSION_CACHE_TIMEOUT = int(os.environ.get('TOKEN_VERSION_CACHE_TIMEOUT', '60'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -152,13 +197,48 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 }
 
+# Page size of the cursor-paginated transaction lists
+TRANSACTION_PAGE_SIZE = int(os.environ.get('TRANSACTION_PAGE_SIZE', '50'))
+TRANSACTION_MAX_PAGE_SIZE = int(os.environ.get('TRANSACTION_MAX_PAGE_SIZE', '500'))
+
+# Bulk transaction uploads: maximum rows per request and rows per INSERT
+TRANSACTION_BULK_MAX_ROWS = int(os.environ.get('TRANSACTION_BULK_MAX_ROWS', '5000'))
+TRANSACTION_BULK_BATCH_SIZE = int(os.environ.get('TRANSACTION_BULK_BATCH_SIZE', '500'))
+
+# Rows fetched per round trip by the streaming transaction export
+TRANSACTION_EXPORT_CHUNK_SIZE = int(os.environ.get('TRANSACTION_EXPORT_CHUNK_SIZE', '2000'))
+
+# Families and budgets with up to DELETION_SYNC_MAX_ROWS transactions are
+# deleted within the request; larger ones are queued for run_deletion_jobs,
+# which deletes DELETION_CHUNK_SIZE rows per statement (budgets.deletion)
+DELETION_SYNC_MAX_ROWS = int(os.environ.get('DELETION_SYNC_MAX_ROWS', '10000'))
+DELETION_CHUNK_SIZE = int(os.environ.get('DELETION_CHUNK_SIZE', '5000'))
+
+# Savings forecasts: simulated outcomes per goal and months of contribution
+# history the monthly rate and its deviation are estimated from
+SAVINGS_FORECAST_SIMULATIONS = int(os.environ.get('SAVINGS_FORECAST_SIMULATIONS', '2000'))
+SAVINGS_FORECAST_HISTORY_MONTHS = int(os.environ.get('SAVINGS_FORECAST_HISTORY_MONTHS', '24'))
+
+# Serve the analytics endpoints and the dashboard with the async views of
+# budgets.async_views, which run their independent queries concurrently.
+# Meant for ASGI workers (family_budget_2.asgi); under WSGI every request
+# would start its own event loop.
+ASYNC_ANALYTICS = os.environ.get('ASYNC_ANALYTICS', 'False') == 'True'
+
+# Threads (and so database connections) the async views run their queries in
+ASYNC_DB_WORKERS = int(os.environ.get('ASYNC_DB_WORKERS', '16'))
+
+# Addresses allowed to read the Prometheus metrics at /metrics
+# (family_budget_2.metrics); nginx does not proxy that path
+METRICS_ALLOWED_NETWORKS = os.environ.get('METRICS_ALLOWED_NETWORKS', '127.0.0.1/32,::1/128').split(',')
+
 # JWT settings
 from datetime import timedelta
 
@@ -175,6 +255,10 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    # Access tokens carry the user's fields and family roles, so that read
+    # requests need no user query (users.authentication)
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.ClaimsTokenRefreshSerializer',
 }
 
 # Custom user model
@@ -0,0 +1,228 @@
+"""
+Helpers for the endpoint performance regression suite.
+
+``seed_family_data`` builds realistic family data in bulk, and
+``EndpointBenchmarkMixin`` measures query counts and latency of API calls.
+Measurements are written to a JSON report that can be diffed between
+releases when ``PERF_REPORT_PATH`` is set; plain test runs leave no file
+behind. Functional tests use a plain ``APITestCase``.
+"""
+
+import json
+import os
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from users.models import User
+from users.serializers import ClaimsTokenObtainPairSerializer
+from families.models import Family, FamilyMembership
+from families.access import get_family_roles
+
+REPORT_PATH = os.environ.get('PERF_REPORT_PATH')
+REPEAT = int(os.environ.get('PERF_REPEAT', '5'))
+
+_report = {
+    'generated_at': None,
+    'endpoints': {},
+}
+
+
+def create_user(email, first_name='Test', last_name='User', password='Str0ng-pass!'):
+    return User.objects.create_user(email, first_name, last_name, password)
+
+
+def seed_family_data(owner, families=1, budgets=2, transactions=3, goals=1,
+                     contributions=2, members=0, start=date(2024, 1, 1)):
+    """Create ``families`` families owned by ``owner``, each with ``budgets``
+    budgets of ``transactions`` transactions and ``goals`` savings goals of
+    ``contributions`` contributions. Returns the created families.
+    """
+    from budgets.models import Budget, Transaction, SavingsGoal, SavingsContribution
+    from budgets.ledger import rebuild_ledgers
+    from budgets.rollups import rebuild_rollups
+
+    created = []
+    for family_index in range(families):
+        family = Family.objects.create(
+            name=f"{owner.first_name} family {family_index}",
+            description='Seeded family',
+            created_by=owner
+        )
+        FamilyMembership.objects.create(
+            family=family, user=owner, role='admin', status='accepted', invited_by=owner
+        )
+        for member_index in range(members):
+            member = create_user(f"member{member_index}.{family.id}@example.com", 'Member', str(member_index))
+            FamilyMembership.objects.create(
+                family=family, user=member, role='member', status='accepted', invited_by=owner
+            )
+
+        family_budgets = Budget.objects.bulk_create([
+            Budget(
+                family=family,
+                name=f"Budget {budget_index}",
+                amount=Decimal('1000.00'),
+                budget_type='income' if budget_index % 3 == 0 else 'expense',
+                period=('weekly', 'monthly', 'yearly')[budget_index % 3],
+                description=f"Seeded budget {budget_index}",
+                start_date=start,
+                end_date=start + timedelta(days=365),
+                created_by=owner
+            )
+            for budget_index in range(budgets)
+        ])
+        Transaction.objects.bulk_create([
+            Transaction(
+                budget=budget,
+                amount=Decimal('10.00') + transaction_index,
+                description=f"Payment {transaction_index}",
+                date=start + timedelta(days=transaction_index % 365),
+                created_by=owner
+            )
+            for budget in family_budgets
+            for transaction_index in range(transactions)
+        ], batch_size=500)
+
+        family_goals = SavingsGoal.objects.bulk_create([
+            SavingsGoal(
+                family=family,
+                name=f"Goal {goal_index}",
+                target_amount=Decimal('5000.00'),
+                current_amount=Decimal('25.00') * contributions,
+                target_date=start + timedelta(days=730),
+                created_by=owner
+            )
+            for goal_index in range(goals)
+        ])
+        SavingsContribution.objects.bulk_create([
+            SavingsContribution(
+                savings_goal=goal,
+                amount=Decimal('25.00'),
+                date=start + timedelta(days=contribution_index * 7),
+                created_by=owner
+            )
+            for goal in family_goals
+            for contribution_index in range(contributions)
+        ], batch_size=500)
+
+        # bulk_create bypasses the signals that maintain the derived tables
+        rebuild_ledgers([budget.id for budget in family_budgets])
+        rebuild_rollups(family_ids=[family.id])
+        created.append(family)
+    return created
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def write_report():
+    if not REPORT_PATH:
+        return
+    _report['generated_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    with open(REPORT_PATH, 'w') as report_file:
+        json.dump(_report, report_file, indent=2, sort_keys=True)
+
+
+class EndpointBenchmarkMixin:
+    """Mixin for ``APITestCase`` classes measuring API endpoints."""
+
+    def setUp(self):
+        super().setUp()
+        # Cached family access outlives the rolled back test transactions
+        cache.clear()
+
+    def authenticate(self, user):
+        # Measure the steady state of a signed-in user: an access token issued
+        # at login, with the family access and token version cached
+        user = User.objects.get(pk=user.pk)
+        get_family_roles(user)
+        token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def measure(self, name, method, url, data=None, repeat=None, expected_status=None):
+        """Call the endpoint, record query count and latency under ``name``
+        and return ``(response, query_count)``.
+
+        Safe methods are repeated ``PERF_REPEAT`` times to get stable percentiles.
+        """
+        if repeat is None:
+            repeat = REPEAT if method == 'get' else 1
+
+        timings = []
+        query_count = 0
+        response = None
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(self.client, method)(url, data, format='json')
+                timings.append(time.perf_counter() - started)
+            query_count = max(query_count, len(queries))
+
+        if expected_status is not None:
+            self.assertEqual(response.status_code, expected_status, getattr(response, 'data', None))
+
+        rows = self._count_rows(response)
+        p50 = percentile(timings, 0.5)
+        _report['endpoints'][name] = {
+            'method': method.upper(),
+            'status': response.status_code,
+            'queries': query_count,
+            'samples': len(timings),
+            'p50_ms': round(p50 * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'mean_ms': round(statistics.mean(timings) * 1000, 3),
+            'rows': rows,
+            'rows_per_sec': round(rows / p50, 1) if rows and p50 else 0,
+            'bytes': len(response.content),
+        }
+        return response, query_count
+
+    def assertMaxQueries(self, name, method, url, max_queries, data=None, expected_status=200):
+        response, query_count = self.measure(name, method, url, data, expected_status=expected_status)
+        self.assertLessEqual(
+            query_count, max_queries,
+            f"{name} ran {query_count} queries, budget is {max_queries}"
+        )
+        return response
+
+    def assertFlatQueries(self, name, method, cases, max_queries, data=None, expected_status=200):
+        """Measure the same endpoint for each ``(label, user, url)`` case, e.g. a
+        user with little data and one with a lot, and assert that every case
+        stays within ``max_queries`` and that the count does not grow with data size.
+        """
+        counts = {}
+        responses = {}
+        for label, user, url in cases:
+            self.authenticate(user)
+            responses[label], counts[label] = self.measure(
+                f"{name}[{label}]", method, url, data, expected_status=expected_status
+            )
+        for label, query_count in counts.items():
+            self.assertLessEqual(
+                query_count, max_queries,
+                f"{name}[{label}] ran {query_count} queries, budget is {max_queries}"
+            )
+        self.assertEqual(len(set(counts.values())), 1, f"{name} query count grows with data size: {counts}")
+        return responses
+
+    @staticmethod
+    def _count_rows(response):
+        data = getattr(response, 'data', None)
+        if isinstance(data, dict) and isinstance(data.get('results'), list):
+            return len(data['results'])
+        if isinstance(data, list):
+            return len(data)
+        return 1 if data else 0
+
+    @classmethod
+    def tearDownClass(cls):
+        write_report()
+        super().tearDownClass()
@@ -17,10 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
+from .metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/users/', include('users.urls')),
     path('api/families/', include('families.urls')),
     path('api/budgets/', include('budgets.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -14,6 +14,7 @@ const BudgetDetail = () => {
   
   const [budget, setBudget] = useState(null);
   const [transactions, setTransactions] = useState([]);
+  const [hasMoreTransactions, setHasMoreTransactions] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [showEditModal, setShowEditModal] = useState(false);
@@ -32,7 +33,7 @@ const BudgetDetail = () => {
   useEffect(() => {
     const fetchBudgetDetails = async () => {
       try {
-        const budgetResponse = await api.get(`/budgets/${budgetId}/`);
+        const budgetResponse = await api.get(`/budgets/${budgetId}/?expand=family,created_by`);
         setBudget(budgetResponse.data);
         setEditBudget({
           name: budgetResponse.data.name,
@@ -45,8 +46,9 @@ const BudgetDetail = () => {
           end_date: budgetResponse.data.end_date
         });
         
-        const transactionsResponse = await api.get(`/budgets/transactions/?budget_id=${budgetId}`);
-        setTransactions(transactionsResponse.data);
+        const transactionsResponse = await api.get(`/budgets/transactions/?budget_id=${budgetId}&page_size=5`);
+        setTransactions(transactionsResponse.data.results);
+        setHasMoreTransactions(Boolean(transactionsResponse.data.next));
         
         setLoading(false);
       } catch (error) {
@@ -76,7 +78,7 @@ const BudgetDetail = () => {
     }
     
     try {
-      const response = await api.put(`/budgets/${budgetId}/`, {
+      const response = await api.put(`/budgets/${budgetId}/?expand=family,created_by`, {
         name: editBudget.name,
         amount: parseFloat(editBudget.amount),
         description: editBudget.description,
@@ -298,10 +300,10 @@ const BudgetDetail = () => {
                       ))}
                     </tbody>
                   </table>
-                  {transactions.length > 5 && (
+                  {hasMoreTransactions && (
                     <div className="text-center mt-3">
                       <Link to={`/transactions?budget=${budgetId}`} className="btn btn-outline-primary">
-                        Показать все {transactions.length} транзакций
+                        Показать все транзакции
                       </Link>
                     </div>
                   )}
@@ -15,55 +15,43 @@ const Dashboard = () => {
   const [budgetData, setBudgetData] = useState(null);
   const [transactions, setTransactions] = useState([]);
 
-  // Загрузка списка семей
+  // Загрузка всех данных дашборда одним запросом
   useEffect(() => {
-    const fetchFamilies = async () => {
+    const fetchDashboard = async () => {
       try {
-        const response = await api.get('/families/');
-        setFamilies(response.data);
+        const params = selectedFamilyId ? `?family=${selectedFamilyId}&transactions=10` : '?transactions=10';
+        const response = await api.get(`/budgets/dashboard/${params}`);
+        const data = response.data;
+        setFamilies(data.families);
         
-        // Если нет выбранной семьи, но есть семьи в списке, выбираем первую
-        if (!selectedFamilyId && response.data.length > 0) {
-          setSelectedFamilyId(response.data[0].id);
-          localStorage.setItem('selectedFamilyId', response.data[0].id);
+        // Если нет выбранной семьи, сервер выбирает первую
+        if (!selectedFamilyId && data.family_id) {
+          setSelectedFamilyId(data.family_id);
+          localStorage.setItem('selectedFamilyId', data.family_id);
+        }
+        
+        if (data.family_id) {
+          setBudgetData({
+            budget_utilization: data.budget_utilization,
+            savings_progress: data.savings_progress
+          });
+          setTransactions(data.recent_transactions);
         }
       } catch (error) {
-        console.error('Error fetching families:', error);
-        setError('Failed to load families. Please try again later.');
+        if (error.response?.status === 404 && selectedFamilyId) {
+          // Выбранная семья больше недоступна
+          localStorage.removeItem('selectedFamilyId');
+          setSelectedFamilyId(null);
+          return;
+        }
+        console.error('Error fetching dashboard:', error);
+        setError('Не удалось загрузить данные дашборда. Пожалуйста, попробуйте позже.');
       } finally {
         setLoading(false);
       }
     };
 
-    fetchFamilies();
-  }, [selectedFamilyId]);
-
-  // Загрузка данных бюджета при выборе семьи
-  useEffect(() => {
-    if (selectedFamilyId) {
-      const fetchBudgetData = async () => {
-        try {
-          const response = await api.get(`/budgets/families/${selectedFamilyId}/analytics/budget/`);
-          setBudgetData(response.data);
-        } catch (error) {
-          console.error('Error fetching budget data:', error);
-          setError('Не удалось загрузить данные бюджета. Пожалуйста, попробуйте позже.');
-        }
-      };
-
-      const fetchTransactions = async () => {
-        try {
-          const response = await api.get(`/budgets/families/${selectedFamilyId}/transactions/`);
-          setTransactions(response.data);
-        } catch (error) {
-          console.error('Error fetching transactions:', error);
-          setError('Не удалось загрузить транзакции. Пожалуйста, попробуйте позже.');
-        }
-      };
-
-      fetchBudgetData();
-      fetchTransactions();
-    }
+    fetchDashboard();
   }, [selectedFamilyId]);
 
   // Обработчик выбора семьи
@@ -389,7 +377,7 @@ const Dashboard = () => {
                                        progressPercentage < 70 ? 'warning' : 'success';
                   
                   return (
-                    <div className="mb-4" key={goal.id}>
+                    <div className="mb-4" key={goal.goal_id}>
                       <div className="d-flex justify-content-between align-items-center mb-1">
                         <h6 className="mb-0">{goal.name}</h6>
                         <span className={`badge bg-${progressColor}`}>{formatPercentage(progressPercentage)}</span>
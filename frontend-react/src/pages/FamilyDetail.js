@@ -23,12 +23,12 @@ const FamilyDetail = () => {
   useEffect(() => {
     const fetchFamilyDetails = async () => {
       try {
-        const familyResponse = await api.get(`/families/${familyId}/`);
+        const familyResponse = await api.get(`/families/${familyId}/?expand=created_by`);
         setFamily(familyResponse.data);
         setEditName(familyResponse.data.name);
         setEditDescription(familyResponse.data.description || '');
         
-        const membersResponse = await api.get(`/families/${familyId}/members/`);
+        const membersResponse = await api.get(`/families/${familyId}/members/?expand=user`);
         setMembers(membersResponse.data);
         
         setLoading(false);
@@ -100,7 +100,7 @@ const FamilyDetail = () => {
     }
     
     try {
-      const response = await api.put(`/families/${familyId}/`, {
+      const response = await api.put(`/families/${familyId}/?expand=created_by`, {
         name: editName,
         description: editDescription
       });
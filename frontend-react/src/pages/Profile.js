@@ -46,7 +46,7 @@ const Profile = () => {
     setInvitationError(null);
     
     try {
-      const response = await api.get('/families/invitations/');
+      const response = await api.get('/families/invitations/?expand=family,invited_by');
       setInvitations(response.data);
     } catch (error) {
       console.error('Error fetching invitations:', error);
@@ -19,6 +19,8 @@ const TransactionList = () => {
   const [families, setFamilies] = useState([]);
   const [budgets, setBudgets] = useState([]);
   const [transactions, setTransactions] = useState([]);
+  const [nextPageUrl, setNextPageUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [showCreateModal, setShowCreateModal] = useState(false);
@@ -30,6 +32,7 @@ const TransactionList = () => {
     transaction_type: 'expense'
   });
   const [activeFilter, setActiveFilter] = useState('all'); // 'all', 'income', 'expense'
+  const [totals, setTotals] = useState({ income: 0, expense: 0 });
   
   // Refs for modal
   const createModalRef = useRef(null);
@@ -93,13 +96,18 @@ const TransactionList = () => {
       setLoading(true);
       
       try {
-        let url = `/budgets/transactions/?family=${selectedFamilyId}`;
+        let url = `/budgets/transactions/?family=${selectedFamilyId}&expand=budget`;
         if (selectedBudgetId) {
-          url += `&budget=${selectedBudgetId}`;
+          url += `&budget_id=${selectedBudgetId}`;
+        }
+        // Income / expense is filtered by the server, so every page is complete
+        if (activeFilter !== 'all') {
+          url += `&budget_type=${activeFilter}`;
         }
         
         const response = await api.get(url);
-        setTransactions(response.data);
+        setTransactions(response.data.results);
+        setNextPageUrl(response.data.next);
         setError(null);
       } catch (error) {
         console.error('Error fetching transactions:', error);
@@ -110,6 +118,37 @@ const TransactionList = () => {
     };
 
     fetchTransactions();
+  }, [selectedFamilyId, selectedBudgetId, activeFilter]);
+
+  // The summary covers every transaction of the family or budget, whatever
+  // the income / expense filter: the list only holds the pages loaded so far,
+  // so the totals come from the server (the budget ledgers)
+  const fetchTotals = async () => {
+    if (!selectedFamilyId) {
+      setTotals({ income: 0, expense: 0 });
+      return;
+    }
+
+    try {
+      if (selectedBudgetId) {
+        const response = await api.get(`/budgets/${selectedBudgetId}/summary/`);
+        const amount = parseFloat(response.data.total_transactions) || 0;
+        const isIncome = response.data.budget.budget_type === 'income';
+        setTotals({ income: isIncome ? amount : 0, expense: isIncome ? 0 : amount });
+      } else {
+        const response = await api.get(`/budgets/families/${selectedFamilyId}/analytics/comparison/`);
+        setTotals({
+          income: parseFloat(response.data.income.actual) || 0,
+          expense: parseFloat(response.data.expense.actual) || 0
+        });
+      }
+    } catch (error) {
+      console.error('Error fetching transaction totals:', error);
+    }
+  };
+
+  useEffect(() => {
+    fetchTotals();
   }, [selectedFamilyId, selectedBudgetId]);
 
   // Initialize modal
@@ -186,7 +225,7 @@ const TransactionList = () => {
     }
 
     try {
-      const response = await api.post('/budgets/transactions/', {
+      const response = await api.post('/budgets/transactions/?expand=budget', {
         description: newTransaction.description,
         amount: parseFloat(newTransaction.amount),
         date: newTransaction.date,
@@ -195,6 +234,7 @@ const TransactionList = () => {
 
       // Add the new transaction to the list
       setTransactions([response.data, ...transactions]);
+      fetchTotals();
       
       // Close the modal
       closeCreateModal();
@@ -210,6 +250,7 @@ const TransactionList = () => {
       try {
         await api.delete(`/budgets/transactions/${transactionId}/`);
         setTransactions(transactions.filter(t => t.id !== transactionId));
+        fetchTotals();
       } catch (error) {
         console.error('Error deleting transaction:', error);
         setError('Не удалось удалить транзакцию. Пожалуйста, попробуйте позже.');
@@ -217,11 +258,25 @@ const TransactionList = () => {
     }
   };
 
-  // Filter transactions
-  const filteredTransactions = transactions.filter(transaction => {
-    if (activeFilter === 'all') return true;
-    return transaction.budget && transaction.budget.budget_type === activeFilter;
-  });
+  // Load the next page of transactions using the cursor from the previous page
+  const loadMoreTransactions = async () => {
+    if (!nextPageUrl) return;
+    
+    setLoadingMore(true);
+    try {
+      const response = await api.get(nextPageUrl);
+      setTransactions(previous => [...previous, ...response.data.results]);
+      setNextPageUrl(response.data.next);
+    } catch (error) {
+      console.error('Error fetching transactions:', error);
+      setError('Не удалось загрузить транзакции. Пожалуйста, попробуйте позже.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Transactions are already filtered by type on the server
+  const filteredTransactions = transactions;
 
   // Format currency
   const formatCurrency = (amount) => {
@@ -431,36 +486,15 @@ const TransactionList = () => {
               <div className="row">
                 <div className="col-md-4 text-center">
                   <h6 className="text-success">Общий доход</h6>
-                  <h4 className="text-success">
-                    {formatCurrency(
-                      transactions
-                        .filter(t => t.budget && t.budget.budget_type === 'income')
-                        .reduce((sum, t) => sum + (parseFloat(t.amount) || 0), 0)
-                    )}
-                  </h4>
+                  <h4 className="text-success">{formatCurrency(totals.income)}</h4>
                 </div>
                 <div className="col-md-4 text-center">
                   <h6 className="text-danger">Общие расходы</h6>
-                  <h4 className="text-danger">
-                    {formatCurrency(
-                      transactions
-                        .filter(t => t.budget && t.budget.budget_type === 'expense')
-                        .reduce((sum, t) => sum + (parseFloat(t.amount) || 0), 0)
-                    )}
-                  </h4>
+                  <h4 className="text-danger">{formatCurrency(totals.expense)}</h4>
                 </div>
                 <div className="col-md-4 text-center">
                   <h6 className="text-primary">Баланс</h6>
-                  <h4 className="text-primary">
-                    {formatCurrency(
-                      transactions
-                        .filter(t => t.budget && t.budget.budget_type === 'income')
-                        .reduce((sum, t) => sum + (parseFloat(t.amount) || 0), 0) -
-                      transactions
-                        .filter(t => t.budget && t.budget.budget_type === 'expense')
-                        .reduce((sum, t) => sum + (parseFloat(t.amount) || 0), 0)
-                    )}
-                  </h4>
+                  <h4 className="text-primary">{formatCurrency(totals.income - totals.expense)}</h4>
                 </div>
               </div>
             </div>
@@ -528,6 +562,17 @@ const TransactionList = () => {
                   ))}
                 </tbody>
               </table>
+              {nextPageUrl && (
+                <div className="text-center mt-3">
+                  <button 
+                    className="btn btn-outline-primary" 
+                    onClick={loadMoreTransactions}
+                    disabled={loadingMore}
+                  >
+                    {loadingMore ? 'Загрузка...' : 'Загрузить ещё'}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
@@ -0,0 +1,35 @@
+"""
+Gunicorn settings, read from the environment so that a deployment can be
+tuned without rebuilding the image. Gunicorn loads this file on its own when
+started from the project root (``gunicorn family_budget_2.wsgi:application``).
+
+Threaded workers (``gthread``) serve several requests per process while one
+waits on the database, and each thread keeps its database connection between
+requests (``DB_CONN_MAX_AGE``). Workers are recycled after ``max_requests``
+requests, with jitter so that they do not all restart at once.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# gthread or sync; for the async analytics views (ASYNC_ANALYTICS) run an
+# ASGI worker such as uvicorn.workers.UvicornWorker with family_budget_2.asgi
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+
+# Worker heartbeats go to memory rather than the container's overlay filesystem
+worker_tmp_dir = os.environ.get('GUNICORN_WORKER_TMP_DIR', '/dev/shm' if os.path.isdir('/dev/shm') else None)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
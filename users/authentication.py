@@ -0,0 +1,111 @@
+"""
+JWT authentication that reads the user from the access token.
+
+Access tokens carry a copy of the user's fields and accepted family roles
+(``add_user_claims``) together with the user's ``token_version``. On read
+requests ``ClaimsJWTAuthentication`` builds ``request.user`` from those claims
+instead of loading it from the database, as long as the token's version is
+the user's current one according to the cache. Saving the user or changing
+one of their memberships bumps ``token_version``, after which the user's
+existing tokens fall back to the database lookup until they are refreshed.
+
+Write requests always load the user from the database, so that views can
+check passwords and save ``request.user``.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+TOKEN_VERSION_KEY = 'token_version:{user_id}'
+
+# User fields copied into access tokens; the claims user has only these loaded
+CLAIM_FIELDS = ('email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+VERSION_CLAIM = 'ver'
+FAMILIES_CLAIM = 'families'
+
+
+def _cache_key(user_id):
+    return TOKEN_VERSION_KEY.format(user_id=user_id)
+
+
+def add_user_claims(token, user):
+    """Copy ``user``'s fields, family roles and token version into ``token``."""
+    from families.access import get_family_roles
+
+    for field in CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    token[VERSION_CLAIM] = user.token_version
+    # JSON object keys are strings: roles travel as [family_id, role] pairs
+    token[FAMILIES_CLAIM] = sorted(get_family_roles(user).items())
+    # The user was just loaded: the token is current
+    remember_token_version(user)
+    return token
+
+
+def remember_token_version(user):
+    cache.set(_cache_key(user.pk), user.token_version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+
+
+def forget_token_versions(*user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def bump_token_versions(*user_ids):
+    """Make the access tokens issued so far to ``user_ids`` stale."""
+    get_user_model().objects.filter(pk__in=user_ids).update(token_version=F('token_version') + 1)
+    forget_token_versions(*user_ids)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that skips the user query on read requests."""
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        if request.method in SAFE_METHODS:
+            user = self.get_claims_user(validated_token)
+            if user is not None:
+                return user, validated_token
+        return self.get_user(validated_token), validated_token
+
+    def get_claims_user(self, validated_token):
+        """Build the user from the token, or return ``None`` when the token's
+        claims may be out of date.
+        """
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        version = validated_token.get(VERSION_CLAIM)
+        # Without a cached version the database has to be asked anyway:
+        # get_user() loads the user and caches their version
+        if user_id is None or version is None or cache.get(_cache_key(user_id)) != version:
+            return None
+        if not validated_token.get('is_active'):
+            return None
+
+        claims = {field: validated_token.get(field) for field in CLAIM_FIELDS}
+        claims.update(id=user_id, token_version=version)
+        # from_db() takes the values in the model's field order
+        fields = [field.attname for field in self.user_model._meta.concrete_fields if field.attname in claims]
+        # A model instance with the other fields deferred: it can be used in
+        # queries and foreign keys, and anything else is loaded on access
+        user = self.user_model.from_db(DEFAULT_DB_ALIAS, fields, [claims[field] for field in fields])
+        user.token_family_roles = {family_id: role for family_id, role in validated_token.get(FAMILIES_CLAIM, [])}
+        return user
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        remember_token_version(user)
+        return user
@@ -34,6 +34,9 @@ class User(AbstractUser):
     email = models.EmailField(unique=True)
     first_name = models.CharField(max_length=150)
     last_name = models.CharField(max_length=150)
+    # Incremented whenever access tokens issued so far stop describing the
+    # user (see users.authentication)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
@@ -1,6 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import add_user_claims
 
 User = get_user_model()
 
@@ -39,4 +43,32 @@ class PasswordChangeSerializer(serializers.Serializer):
     def validate(self, attrs):
         if attrs['new_password'] != attrs['new_password_confirm']:
             raise serializers.ValidationError({"new_password": "Password fields didn't match."})
-        return attrs 
\ No newline at end of file
+        return attrs
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Issues access tokens carrying the user's claims (users.authentication)."""
+
+    @classmethod
+    def get_token(cls, user):
+        # Claims on the refresh token are copied into its access token
+        return add_user_claims(super().get_token(user), user)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Issues access tokens with the user's current claims, rather than the
+    ones copied from the refresh token at login. Refresh tokens are not
+    rotated (``ROTATE_REFRESH_TOKENS`` is off).
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+
+        user = User.objects.filter(**{
+            api_settings.USER_ID_FIELD: refresh.payload.get(api_settings.USER_ID_CLAIM)
+        }).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        add_user_claims(refresh, user)
+        return {'access': str(refresh.access_token)}
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db.models.signals import pre_save, post_save
+from django.dispatch import receiver
+from .authentication import forget_token_versions
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def bump_token_version(sender, instance, update_fields=None, **kwargs):
+    # Access tokens carry a copy of the user's fields (and the password
+    # change makes them suspect): saving the user makes them stale. Saves of
+    # chosen fields, like last_login, only count when they include the version
+    if instance._state.adding:
+        return
+    if update_fields is None or 'token_version' in update_fields:
+        instance.token_version += 1
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_token_version(sender, instance, created, **kwargs):
+    if not created:
+        forget_token_versions(instance.pk)
@@ -1,3 +1,126 @@
-from django.test import TestCase
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from families.models import Family, FamilyMembership
+from family_budget_2.testing import EndpointBenchmarkMixin, create_user
+
+
+class UserEndpointPerformanceTests(EndpointBenchmarkMixin, APITestCase):
+    """Query-count budgets for every route in users/urls.py."""
+
+    password = 'Str0ng-pass!'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user@example.com', 'Regular', password=cls.password)
+
+    def obtain_tokens(self):
+        response = self.client.post('/api/users/token/', {
+            'email': self.user.email, 'password': self.password,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_register(self):
+        self.assertMaxQueries('user-register', 'post', '/api/users/register/', 2, data={
+            'email': 'new@example.com', 'first_name': 'New', 'last_name': 'User',
+            'password': 'An0ther-pass!', 'password_confirm': 'An0ther-pass!',
+        }, expected_status=201)
+
+    def test_token_obtain_and_refresh(self):
+        # The user, then their family roles for the token's claims
+        self.assertMaxQueries('token-obtain-pair', 'post', '/api/users/token/', 2, data={
+            'email': self.user.email, 'password': self.password,
+        })
+        refresh = self.obtain_tokens()['refresh']
+        self.assertMaxQueries('token-refresh', 'post', '/api/users/token/refresh/', 1, data={
+            'refresh': refresh,
+        })
+
+    def test_profile(self):
+        self.authenticate(self.user)
+        self.assertMaxQueries('user-profile', 'get', '/api/users/profile/', 0)
+        self.assertMaxQueries('user-profile-update', 'put', '/api/users/profile/', 3, data={
+            'email': self.user.email, 'first_name': 'Renamed', 'last_name': 'User',
+        })
+
+    def test_change_password(self):
+        self.authenticate(self.user)
+        self.assertMaxQueries('change-password', 'post', '/api/users/change-password/', 2, data={
+            'old_password': self.password, 'new_password': 'N3w-pass-word!',
+            'new_password_confirm': 'N3w-pass-word!',
+        })
+
+    def test_logout(self):
+        self.assertMaxQueries('logout', 'post', '/api/users/logout/', 0)
+
+
+class ClaimsAuthenticationTests(APITestCase):
+    password = 'Str0ng-pass!'
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('claims@example.com', 'Claims', password=self.password)
+        self.family = Family.objects.create(name='Claims family', created_by=self.user)
+        FamilyMembership.objects.create(
+            family=self.family, user=self.user, role='admin', status='accepted', invited_by=self.user
+        )
+
+    def login(self):
+        tokens = self.client.post('/api/users/token/', {
+            'email': self.user.email, 'password': self.password,
+        }, format='json').data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        return tokens
+
+    def test_reads_use_the_token_claims(self):
+        self.login()
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/profile/')
+        self.assertEqual(response.data, {
+            'id': self.user.id, 'email': self.user.email, 'first_name': 'Claims', 'last_name': 'User',
+        })
+        # Family roles come from the token as well
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(f'/api/families/{self.family.id}/').status_code, 200)
+
+    def test_saving_the_user_makes_tokens_stale(self):
+        tokens = self.login()
+        self.client.patch('/api/users/profile/', {'first_name': 'Renamed'}, format='json')
+        # The old token falls back to loading the user
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/users/profile/').data['first_name'], 'Renamed')
+
+        access = self.client.post('/api/users/token/refresh/', {'refresh': tokens['refresh']}, format='json').data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access['access']}")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/users/profile/').data['first_name'], 'Renamed')
+
+        response = self.client.post('/api/users/change-password/', {
+            'old_password': self.password, 'new_password': 'N3w-pass-word!',
+            'new_password_confirm': 'N3w-pass-word!',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/users/profile/').status_code, 200)
+
+    def test_membership_changes_make_tokens_stale(self):
+        self.login()
+        other = Family.objects.create(name='Other family', created_by=self.user)
+        url = f'/api/families/{other.id}/'
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        membership = FamilyMembership.objects.create(
+            family=other, user=self.user, role='member', status='accepted', invited_by=self.user
+        )
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.login()
+        membership.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_inactive_users_are_rejected(self):
+        self.login()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 401)
 
-# Create your tests here.
@@ -5,19 +5,20 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model, logout, login
 from django.contrib.auth import authenticate
+from family_budget_2.metrics import SerializerMetricsMixin
 from .serializers import UserSerializer, UserRegistrationSerializer, PasswordChangeSerializer
 from rest_framework_simplejwt.tokens import AccessToken
 
 User = get_user_model()
 
 
-class UserRegistrationView(generics.CreateAPIView):
+class UserRegistrationView(SerializerMetricsMixin, generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
 
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(SerializerMetricsMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
     